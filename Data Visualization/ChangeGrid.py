@@ -0,0 +1,679 @@
+# Standard library imports
+import os
+import json
+import struct
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+from bokeh.palettes import RdBu
+from PointPyramid import to_mercator, tile_size
+from SurveyCache import get_survey_cache
+from StreamingReader import StreamingReader
+from DataCatalog import get_data_catalog
+from TimeCatalog import default_datetime_col_names, default_time_col_names
+
+# Optional dependencies imports
+# ^ pyarrow is needed to store gridded surveys next to the converted data files, otherwise surveys are gridded once per process.
+try:
+  import pyarrow as pa
+  import pyarrow.feather as feather
+except ImportError:
+  pa, feather = None, None
+
+# Constants
+# Zoom level of the map whose pixels are the grid cells of every gridded survey (about 3 meters wide at the Elwha river mouth).
+default_grid_zoom = 15
+# Number of grid cells around a cell with data that empty cells are interpolated from.
+default_interpolation_radius = 8
+# Minimum number of days between two surveys for them to be in different epochs.
+default_epoch_gap_days = 30
+# Number of gridded tile surfaces that are kept in memory, since neighbouring map tiles and zoom levels are computed from the same surfaces.
+max_cached_surfaces = 64
+# Colors of change surfaces from the most negative change (erosion, red) to the most positive change (deposition, blue).
+change_colors = np.array([[int(color[idx:idx + 2], 16) for idx in (1, 3, 5)] for color in reversed(RdBu[11])], dtype=np.uint8)
+# Opacity of grid cells with a value in change tiles, where cells without a value are transparent.
+change_color_alpha = 255
+# Change that gets the most saturated colors for each type of change surface, in the value's units (per year for trends).
+default_change_ranges = {"difference": 2.0, "trend": 1.0}
+grid_file_extension = ".arrow"
+tile_file_extension = ".png"
+# Number of bytes that rendered tiles can take up in the cache directory before the least recently used ones are removed.
+default_max_stored_tile_bytes = 256 * 1024 * 1024
+# Fraction of the stored tiles' limit that the least recently used tiles are removed down to, so that tiles aren't pruned again after every rendered tile.
+pruned_tile_fraction = 0.8
+
+# change_grids = {(data directory path, categories, column names, grid settings): ChangeGrid} dictionary of change grids shared by everything in this process that displays the same change surfaces
+change_grids = {}
+
+def get_change_grid(data_dir_path: str, cache: "SurveyCache", value_col_names: list[str], latitude_col_names: list[str], longitude_col_names: list[str], categories: list[str] = None, possible_datetime_col_names: list[str] = default_datetime_col_names, possible_time_col_names: list[str] = default_time_col_names, grid_zoom: int = default_grid_zoom, interpolation_radius: int = default_interpolation_radius, epoch_gap_days: float = default_epoch_gap_days) -> "ChangeGrid":
+  """
+  Gets the change grid for a data directory, building it only if it was never built or its data files changed since it was built.
+  A rebuilt change grid reuses the gridded surveys of data files that didn't change, so only added or modified surveys are gridded again.
+
+  Args:
+    data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+    cache (SurveyCache): Cache of converted data files to read surveys through and store gridded surveys next to
+    value_col_names (list[str]): List of column names containing the value that changes over time (e.g. orthometric height), in order of preference
+    latitude_col_names (list[str]): List of column names containing the latitude of each data point
+    longitude_col_names (list[str]): List of column names containing the longitude of each data point
+    categories (list[str]): Optional list of category subfolders whose data files are gridded, default is None for every category
+      ^ data files without a value column (e.g. grain size samples) are skipped
+    possible_datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected, default is the Elwha data's date columns
+    possible_time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected, default is the Elwha data's time columns
+    grid_zoom (int): Optional zoom level of the map whose pixels are the grid cells, default is 15
+    interpolation_radius (int): Optional number of grid cells around a cell with data that empty cells are interpolated from, default is 8
+    epoch_gap_days (float): Optional minimum number of days between two surveys for them to be in different epochs, default is 30
+
+  Returns:
+    ChangeGrid: Up-to-date change grid over all surveys in the data directory
+  """
+  key = (
+    os.path.abspath(data_dir_path), tuple(categories) if categories is not None else None, tuple(value_col_names), tuple(latitude_col_names), tuple(longitude_col_names),
+    tuple(possible_datetime_col_names), tuple(possible_time_col_names), grid_zoom, interpolation_radius, epoch_gap_days
+  )
+  change_grid = change_grids.get(key)
+  if (change_grid is None) or change_grid.is_stale():
+    change_grid = ChangeGrid(
+      data_dir_path, cache, value_col_names, latitude_col_names, longitude_col_names, categories, possible_datetime_col_names, possible_time_col_names,
+      grid_zoom, interpolation_radius, epoch_gap_days, file_grids = change_grid.file_grids if change_grid is not None else None
+    )
+    change_grids[key] = change_grid
+  return change_grid
+
+def bin_values(cell_keys: "numpy.ndarray", values: "numpy.ndarray", counts: "numpy.ndarray" = None) -> tuple:
+  """
+  Adds up the values in each grid cell.
+
+  Args:
+    cell_keys (numpy.ndarray): Grid cell key of each value
+    values (numpy.ndarray): Values to add up
+    counts (numpy.ndarray): Optional number of data points that each value is the sum of, default is None for values of one data point each
+
+  Returns:
+    tuple: (keys, sums, counts) tuple of arrays with the sum of values and number of data points of every grid cell, sorted by key
+  """
+  keys, inverse = np.unique(cell_keys, return_inverse=True)
+  cell_counts = np.bincount(inverse, weights=counts, minlength=len(keys))
+  return keys, np.bincount(inverse, weights=values, minlength=len(keys)), np.rint(cell_counts).astype(np.int64)
+
+def box_sum(grid: "numpy.ndarray", radius: int) -> "numpy.ndarray":
+  """
+  Adds up the values of every grid cell's square neighbourhood with cumulative sums, so that the cost doesn't depend on the neighbourhood's size.
+
+  Args:
+    grid (numpy.ndarray): 2D array of values
+    radius (int): Number of cells on each side of a cell that are in its neighbourhood
+
+  Returns:
+    numpy.ndarray: 2D array with the sum of each cell's (2 * radius + 1) by (2 * radius + 1) neighbourhood, where cells outside the grid count as 0
+  """
+  for axis in (0, 1):
+    padding = [(0, 0), (0, 0)]
+    padding[axis] = (radius + 1, radius)
+    cumulative_sums = np.cumsum(np.pad(grid, padding), axis=axis)
+    length = grid.shape[axis]
+    grid = np.take(cumulative_sums, np.arange(2 * radius + 1, 2 * radius + 1 + length), axis=axis) - np.take(cumulative_sums, np.arange(length), axis=axis)
+  return grid
+
+def encode_png(rgba: "numpy.ndarray") -> bytes:
+  """
+  Encodes an image into a PNG file (https://www.w3.org/TR/png/) without filtering its rows.
+
+  Args:
+    rgba (numpy.ndarray): (height, width, 4) array of 8-bit red, green, blue and alpha values
+
+  Returns:
+    bytes: Encoded PNG file
+  """
+  height, width = rgba.shape[:2]
+  # Every row starts with its filter type (0 = none).
+  rows = np.concatenate((np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)), axis=1)
+  def chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+  # Header fields: width, height, bit depth 8, color type 6 (RGBA), default compression, filtering and no interlacing.
+  header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+  return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)) + chunk(b"IEND", b"")
+
+def get_change_image(values: "numpy.ndarray", value_range: float) -> "numpy.ndarray":
+  """
+  Colors the values of a change surface from red (negative change) over white (no change) to blue (positive change).
+
+  Args:
+    values (numpy.ndarray): 2D array of changes, which is NaN for cells without a change
+    value_range (float): Change that gets the most saturated colors, where larger changes get the same colors
+
+  Returns:
+    numpy.ndarray: (height, width, 4) array of RGBA colors, where cells without a change are transparent
+  """
+  has_value = np.isfinite(values)
+  color_idx = np.rint((np.clip(np.where(has_value, values, 0) / value_range, -1, 1) + 1) / 2 * (len(change_colors) - 1)).astype(np.int64)
+  rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+  rgba[..., :3] = change_colors[color_idx]
+  rgba[..., 3] = np.where(has_value, change_color_alpha, 0)
+  return rgba
+
+def get_grid_path(cache: "SurveyCache", file_path: str, settings_hash: str) -> str:
+  """
+  Gets the path of the stored gridded survey for the current version of a data file.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files that gridded surveys are stored next to
+    file_path (str): Path to the data file
+    settings_hash (str): Short hash of the column names and grid settings that the survey is gridded with
+
+  Returns:
+    str: Path to the data file's stored gridded survey, or None if it can't be stored
+  """
+  if (not cache.enabled) or (feather is None): return None
+  cache_path = cache.get_cache_path(file_path)
+  return "{}.grid_{}{}".format(cache_path[:-len(grid_file_extension)], settings_hash, grid_file_extension)
+
+def get_settings_hash(value_col_names: list[str], latitude_col_names: list[str], longitude_col_names: list[str], grid_zoom: int) -> str:
+  """
+  Gets a short hash of the column names and grid settings that surveys are gridded with, which is part of stored file names since other settings give other grids.
+
+  Args:
+    value_col_names (list[str]): List of column names containing the value that changes over time
+    latitude_col_names (list[str]): List of column names containing the latitude of each data point
+    longitude_col_names (list[str]): List of column names containing the longitude of each data point
+    grid_zoom (int): Zoom level of the map whose pixels are the grid cells
+
+  Returns:
+    str: Hash of the settings
+  """
+  return hashlib.sha1(json.dumps([value_col_names, latitude_col_names, longitude_col_names, grid_zoom]).encode("utf-8")).hexdigest()[:8]
+
+def read_file_grid(cache: "SurveyCache", file_path: str, value_col_names: list[str], latitude_col_names: list[str], longitude_col_names: list[str], grid_zoom: int) -> tuple:
+  """
+  Reads the stored gridded survey of a data file, or grids and stores it if it wasn't stored since the data file was last modified.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files to read the survey through and store the gridded survey next to
+    file_path (str): Path to the data file
+    value_col_names (list[str]): List of column names containing the value that changes over time, in order of preference
+    latitude_col_names (list[str]): List of column names containing the latitude of each data point
+    longitude_col_names (list[str]): List of column names containing the longitude of each data point
+    grid_zoom (int): Zoom level of the map whose pixels are the grid cells
+
+  Returns:
+    tuple: (keys, sums, counts) tuple of arrays with the sorted key, sum of values and number of values of every grid cell with data, or None if the data file has no coordinate or value columns
+  """
+  grid_path = get_grid_path(cache, file_path, get_settings_hash(value_col_names, latitude_col_names, longitude_col_names, grid_zoom))
+  if (grid_path is not None) and os.path.exists(grid_path):
+    table = feather.read_table(grid_path)
+    return tuple(table.column(name).to_numpy() for name in ["key", "sum", "count"])
+  file_grid = grid_survey(cache, file_path, value_col_names, latitude_col_names, longitude_col_names, grid_zoom)
+  if (file_grid is None) or (grid_path is None): return file_grid
+  table = pa.table(dict(zip(["key", "sum", "count"], file_grid)))
+  temp_grid_path = "{}.{}.{}.tmp".format(grid_path, os.getpid(), threading.get_ident())
+  feather.write_feather(table, temp_grid_path, compression="uncompressed")
+  os.replace(temp_grid_path, grid_path)
+  return file_grid
+
+def store_file_grid(file_path: str, cache_dir: str, value_col_names: list[str], latitude_col_names: list[str], longitude_col_names: list[str], grid_zoom: int) -> None:
+  """
+  Grids a survey and stores it next to the converted data file, which runs in a worker process of the data directory's catalog.
+
+  Args:
+    file_path (str): Path to the data file
+    cache_dir (str): Path to the cache directory that the data file was converted into
+    value_col_names (list[str]): List of column names containing the value that changes over time, in order of preference
+    latitude_col_names (list[str]): List of column names containing the latitude of each data point
+    longitude_col_names (list[str]): List of column names containing the longitude of each data point
+    grid_zoom (int): Zoom level of the map whose pixels are the grid cells
+  """
+  read_file_grid(get_survey_cache(cache_dir), file_path, value_col_names, latitude_col_names, longitude_col_names, grid_zoom)
+
+def grid_survey(cache: "SurveyCache", file_path: str, value_col_names: list[str], latitude_col_names: list[str], longitude_col_names: list[str], grid_zoom: int) -> tuple:
+  """
+  Adds up the values of a data file's data points in every grid cell, one chunk of rows at a time.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files to read the survey through
+    file_path (str): Path to the data file
+    value_col_names (list[str]): List of column names containing the value that changes over time, in order of preference
+    latitude_col_names (list[str]): List of column names containing the latitude of each data point
+    longitude_col_names (list[str]): List of column names containing the longitude of each data point
+    grid_zoom (int): Zoom level of the map whose pixels are the grid cells
+
+  Returns:
+    tuple: (keys, sums, counts) tuple of arrays with the sorted key, sum of values and number of values of every grid cell with data, or None if the data file has no coordinate or value columns
+  """
+  cells_per_side = tile_size * 2 ** grid_zoom
+  file_cols = cache.get_columns(file_path)
+  col_names = [next((col for col in possible_col_names if col in file_cols), None) for possible_col_names in [latitude_col_names, longitude_col_names, value_col_names]]
+  if None in col_names: return None
+  chunk_grids = []
+  # Coordinate and value columns are read one chunk at a time, so that gridding a survey never needs its whole text in memory.
+  for chunk in StreamingReader(cache).iter_chunks(file_path, col_names):
+    latitudes, longitudes, values = (pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=np.float64) for col in col_names)
+    has_value = np.isfinite(latitudes) & np.isfinite(longitudes) & np.isfinite(values)
+    x, y = to_mercator(latitudes[has_value], longitudes[has_value])
+    cell_x = np.clip(np.floor(x * cells_per_side), 0, cells_per_side - 1).astype(np.int64)
+    cell_y = np.clip(np.floor(y * cells_per_side), 0, cells_per_side - 1).astype(np.int64)
+    keys, sums, counts = bin_values(cell_x * cells_per_side + cell_y, values[has_value])
+    chunk_grids.append((keys, sums, counts))
+  if len(chunk_grids) == 0: return (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64))
+  # Combine the cells of all chunks, since a grid cell can have data points in several chunks.
+  return bin_values(*(np.concatenate([chunk_grid[array_idx] for chunk_grid in chunk_grids]) for array_idx in range(3)))
+
+# empty_tile = transparent PNG tile returned for tiles without change
+empty_tile = encode_png(np.zeros((tile_size, tile_size, 4), dtype=np.uint8))
+
+class ChangeGrid:
+  def __init__(self, data_dir_path: str, cache: "SurveyCache", value_col_names: list[str], latitude_col_names: list[str], longitude_col_names: list[str], categories: list[str] = None, possible_datetime_col_names: list[str] = default_datetime_col_names, possible_time_col_names: list[str] = default_time_col_names, grid_zoom: int = default_grid_zoom, interpolation_radius: int = default_interpolation_radius, epoch_gap_days: float = default_epoch_gap_days, file_grids: dict = None, max_stored_tile_bytes: int = default_max_stored_tile_bytes) -> None:
+    """
+    Creates a new instance of the ChangeGrid class, which grids every survey onto the pixels of one map zoom level and groups surveys into epochs, so that the change between epochs can be displayed as raster tiles.
+    Surveys are grouped into epochs by the time ranges in the data directory catalog's summaries, and data files without coordinates, timestamps or a value column are skipped without reading them.
+    Surveys are gridded once on the catalog's worker processes and stored next to the converted data files, and the surfaces of an epoch are only computed for the map tiles that are requested.
+    Rendered tiles are stored in the cache directory under a hash of the surveys they're computed from, so adding a survey only renders the tiles of its area again.
+    Tiles of old surveys and settings are never requested again, so the least recently used stored tiles are removed once they take up more than max_stored_tile_bytes.
+
+    Args:
+      data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+      cache (SurveyCache): Cache of converted data files to read surveys through and store gridded surveys and rendered tiles next to
+      value_col_names (list[str]): List of column names containing the value that changes over time (e.g. orthometric height), in order of preference
+      latitude_col_names (list[str]): List of column names containing the latitude of each data point
+      longitude_col_names (list[str]): List of column names containing the longitude of each data point
+      categories (list[str]): Optional list of category subfolders whose data files are gridded, default is None for every category
+      possible_datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected
+      possible_time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected
+      grid_zoom (int): Optional zoom level of the map whose pixels are the grid cells, default is 15
+      interpolation_radius (int): Optional number of grid cells around a cell with data that empty cells are interpolated from, default is 8
+      epoch_gap_days (float): Optional minimum number of days between two surveys for them to be in different epochs, default is 30
+      file_grids (dict): Optional dictionary with the gridded surveys of a previous change grid, which are reused for data files that didn't change, default is None for gridding every survey
+      max_stored_tile_bytes (int): Optional number of bytes that rendered tiles can take up in the cache directory, default is 256 MiB
+    """
+    if file_grids is None: file_grids = {}
+    # root_data_dir_path = path to the root directory containing all category subfolders and their data files
+    self.root_data_dir_path = data_dir_path
+
+    # categories = category subfolders whose data files are gridded, or None for every category
+    self.categories = categories
+
+    # cache = cache of converted data files that surveys are read through and gridded surveys are stored next to
+    self.cache = cache
+
+    # value_col_names, latitude_col_names, longitude_col_names = column names that surveys are gridded with
+    self.value_col_names = value_col_names
+    self.latitude_col_names = latitude_col_names
+    self.longitude_col_names = longitude_col_names
+    # possible_datetime_col_names, possible_time_col_names = column names that the catalog's time ranges are parsed from
+    self.possible_datetime_col_names = possible_datetime_col_names
+    self.possible_time_col_names = possible_time_col_names
+
+    # grid_zoom = zoom level of the map whose pixels are the grid cells
+    self.grid_zoom = grid_zoom
+    # cells_per_side = number of grid cells along each side of the world
+    self.cells_per_side = tile_size * 2 ** grid_zoom
+
+    # interpolation_radius = number of grid cells around a cell with data that empty cells are interpolated from
+    self.interpolation_radius = interpolation_radius
+
+    # settings_hash = short hash of the column names and grid settings, which is part of stored file names since other settings give other grids
+    self.settings_hash = get_settings_hash(value_col_names, latitude_col_names, longitude_col_names, grid_zoom)
+
+    # tiles_dir_path = path to the directory that rendered tiles are stored in, or None if they can't be stored
+    self.tiles_dir_path = os.path.join(cache.cache_dir, "change_tiles") if cache.enabled else None
+    if self.tiles_dir_path is not None: os.makedirs(self.tiles_dir_path, exist_ok=True)
+    # max_stored_tile_bytes = number of bytes that rendered tiles can take up in tiles_dir_path before the least recently used ones are removed
+    self.max_stored_tile_bytes = max_stored_tile_bytes
+    # stored_tile_bytes = number of bytes that rendered tiles take up in tiles_dir_path, including tiles stored by other change grids and processes when it was last counted
+    self.stored_tile_bytes = sum(size for _, size, _ in self.get_stored_tiles())
+    self.stored_tiles_lock = threading.Lock()
+
+    # file_stats = {file path: (modification time in nanoseconds, size)} dictionary used to check if any data file changed after the change grid was built
+    self.file_stats = {}
+
+    # file_grids = {(file path, modification time, size): (keys, sums, counts)} dictionary with the gridded survey of every data file, where keys are sorted grid cell keys
+    self.file_grids = {}
+
+    # file_tiles = {(file path, modification time, size): tiles} dictionary with the set of (column, row) map tiles at grid_zoom whose surfaces depend on each gridded survey
+    self.file_tiles = {}
+
+    grid_args = (value_col_names, latitude_col_names, longitude_col_names, grid_zoom)
+    surveys = []
+    for summary in self.get_data_files():
+      file_path = summary["path"]
+      self.file_stats[file_path] = (summary["mtime_ns"], summary["size"])
+      # Skip data files without timestamps, which can't be placed in an epoch, and data files without coordinates or values.
+      if (summary["time_range"] is None) or (summary["bounds"] is None) or not any(col in summary["columns"] for col in value_col_names): continue
+      file_key = (os.path.abspath(file_path), summary["mtime_ns"], summary["size"])
+      surveys.append(([pd.Timestamp(time) for time in summary["time_range"]], file_key, file_path))
+    # Grid the surveys that weren't gridded before on the catalog's worker processes at the same time, which store them for this process to read.
+    unstored_file_paths = [
+      file_path for _, file_key, file_path in surveys
+      if (file_key not in file_grids) and (get_grid_path(cache, file_path, self.settings_hash) is not None) and not os.path.exists(get_grid_path(cache, file_path, self.settings_hash))
+    ]
+    if len(unstored_file_paths) > 1:
+      self.get_data_catalog().map_files(store_file_grid, [(file_path, cache.cache_dir) + grid_args for file_path in unstored_file_paths])
+    gridded_surveys = []
+    for time_range, file_key, file_path in surveys:
+      file_grid = file_grids.get(file_key)
+      if file_grid is None: file_grid = read_file_grid(cache, file_path, *grid_args)
+      if (file_grid is None) or (len(file_grid[0]) == 0): continue
+      self.file_grids[file_key] = file_grid
+      self.file_tiles[file_key] = self.get_dependent_tiles(file_grid[0])
+      gridded_surveys.append((time_range, file_key))
+
+    # epochs = list of epochs sorted by time, where each epoch is a dictionary with the "start" and "end" (pandas.Timestamp) of its surveys, its mean "time" and the keys of its survey "files"
+    # ^ Surveys belong to the same epoch if they were collected within epoch_gap_days of the epoch's previous survey.
+    self.epochs = []
+    epoch_gap = pd.Timedelta(days=epoch_gap_days)
+    for (start_time, end_time), file_key in sorted(gridded_surveys, key=lambda survey: survey[0][0]):
+      if (len(self.epochs) == 0) or (start_time - self.epochs[-1]["end"] > epoch_gap):
+        self.epochs.append({"start": start_time, "end": end_time, "files": []})
+      epoch = self.epochs[-1]
+      epoch["end"] = max(epoch["end"], end_time)
+      epoch["files"].append(file_key)
+    for epoch in self.epochs:
+      epoch["time"] = epoch["start"] + (epoch["end"] - epoch["start"]) / 2
+
+    # epoch_cells = list of (keys, means) tuples with the sorted grid cell keys of each epoch and the mean value of each cell over all of the epoch's surveys
+    self.epoch_cells = []
+    for epoch in self.epochs:
+      epoch_grids = [self.file_grids[file_key] for file_key in epoch["files"]]
+      keys, sums, counts = bin_values(*(np.concatenate([file_grid[array_idx] for file_grid in epoch_grids]) for array_idx in range(3)))
+      self.epoch_cells.append((keys, sums / counts))
+
+    # tiles = set of (column, row) map tiles at grid_zoom with a surface in any epoch
+    self.tiles = set().union(*self.file_tiles.values())
+
+    # surfaces = {(epoch surveys, tile): surface} dictionary with the most recently used gridded and interpolated tile surfaces
+    self.surfaces = OrderedDict()
+    self.surfaces_lock = threading.Lock()
+
+  def get_data_catalog(self) -> "DataCatalog":
+    """
+    Gets the catalog of the root data directory, whose summaries have the bounds and time range of every data file with the change grid's column names.
+
+    Returns:
+      DataCatalog: Catalog of the root data directory
+    """
+    return get_data_catalog(self.root_data_dir_path, self.cache, self.latitude_col_names, self.longitude_col_names, self.possible_datetime_col_names, self.possible_time_col_names)
+
+  def get_data_files(self) -> list[dict]:
+    """
+    Gets the summaries of all data files in the gridded category subfolders (including nested subfolders) from the data directory's catalog.
+
+    Returns:
+      list[dict]: List of data file summaries, see DataCatalog.get_file_summaries
+    """
+    return self.get_data_catalog().get_file_summaries(self.categories)
+
+  def is_stale(self) -> bool:
+    """
+    Checks if any gridded data file was added, removed or modified after the change grid was built.
+
+    Returns:
+      bool: True if the change grid needs to be rebuilt, False otherwise
+    """
+    return {summary["path"]: (summary["mtime_ns"], summary["size"]) for summary in self.get_data_files()} != self.file_stats
+
+  def get_dependent_tiles(self, keys: "numpy.ndarray") -> set:
+    """
+    Gets the map tiles at grid_zoom whose surfaces depend on grid cells, which includes tiles that are close enough to the cells to interpolate from them.
+
+    Args:
+      keys (numpy.ndarray): Grid cell keys
+
+    Returns:
+      set: Set of (column, row) tuples of map tiles at grid_zoom
+    """
+    cell_x, cell_y = keys // self.cells_per_side, keys % self.cells_per_side
+    tile_keys = []
+    for offset_x in (-self.interpolation_radius, self.interpolation_radius):
+      for offset_y in (-self.interpolation_radius, self.interpolation_radius):
+        tile_x = np.clip(cell_x + offset_x, 0, self.cells_per_side - 1) // tile_size
+        tile_y = np.clip(cell_y + offset_y, 0, self.cells_per_side - 1) // tile_size
+        tile_keys.append(tile_x * self.cells_per_side + tile_y)
+    return {(int(key // self.cells_per_side), int(key % self.cells_per_side)) for key in np.unique(np.concatenate(tile_keys))}
+
+  def get_epoch_labels(self) -> list[str]:
+    """
+    Gets a label for every epoch with the month that its surveys were collected in.
+
+    Returns:
+      list[str]: Label of each epoch in time order, e.g. "Jul 2016"
+    """
+    return [epoch["time"].strftime("%b %Y") for epoch in self.epochs]
+
+  def get_epoch_surface(self, epoch_idx: int, tile_x: int, tile_y: int) -> "numpy.ndarray":
+    """
+    Gets the mean value of every grid cell of a map tile at grid_zoom in an epoch, where empty cells close to cells with data are interpolated.
+    Empty cells get the mean of the cells with data in their neighbourhood (a normalized box filter), so that surveys along different transects can be compared.
+
+    Args:
+      epoch_idx (int): Position of the epoch in epochs
+      tile_x (int): Column of the map tile at grid_zoom
+      tile_y (int): Row of the map tile at grid_zoom
+
+    Returns:
+      numpy.ndarray: (row, column) array with tile_size by tile_size grid cells, which is NaN for cells without data nearby
+    """
+    surface_key = (tuple(self.epochs[epoch_idx]["files"]), tile_x, tile_y)
+    with self.surfaces_lock:
+      if surface_key in self.surfaces:
+        self.surfaces.move_to_end(surface_key)
+        return self.surfaces[surface_key]
+
+    # Fill a grid with the tile's cells and the cells around it that are interpolated from.
+    radius = self.interpolation_radius
+    grid_size = tile_size + 2 * radius
+    min_cell_x, min_cell_y = tile_x * tile_size - radius, tile_y * tile_size - radius
+    keys, means = self.epoch_cells[epoch_idx]
+    # Cells are sorted by column, so the columns of the grid are one contiguous block of cells.
+    column_start, column_end = np.searchsorted(keys, [min_cell_x * self.cells_per_side, (min_cell_x + grid_size) * self.cells_per_side])
+    grid_x = keys[column_start:column_end] // self.cells_per_side - min_cell_x
+    grid_y = keys[column_start:column_end] % self.cells_per_side - min_cell_y
+    in_grid = (grid_y >= 0) & (grid_y < grid_size)
+    values, weights = np.zeros((grid_size, grid_size)), np.zeros((grid_size, grid_size))
+    values[grid_y[in_grid], grid_x[in_grid]] = means[column_start:column_end][in_grid]
+    weights[grid_y[in_grid], grid_x[in_grid]] = 1
+
+    neighbourhood_sums, neighbourhood_weights = box_sum(values, radius), box_sum(weights, radius)
+    interpolated = np.divide(neighbourhood_sums, neighbourhood_weights, out=np.full(values.shape, np.nan), where=neighbourhood_weights > 0)
+    surface = np.where(weights > 0, values, interpolated)[radius:radius + tile_size, radius:radius + tile_size]
+    with self.surfaces_lock:
+      self.surfaces[surface_key] = surface
+      if len(self.surfaces) > max_cached_surfaces: self.surfaces.popitem(last=False)
+    return surface
+
+  def get_product_surface(self, product: tuple, tile_x: int, tile_y: int) -> "numpy.ndarray":
+    """
+    Gets a change surface of a map tile at grid_zoom.
+
+    Args:
+      product (tuple): Change surface to get
+        ^ ("difference", first epoch position, second epoch position) for the change from the first to the second epoch
+        ^ ("trend",) for the least-squares rate of change per year over all epochs
+      tile_x (int): Column of the map tile at grid_zoom
+      tile_y (int): Row of the map tile at grid_zoom
+
+    Returns:
+      numpy.ndarray: (row, column) array with tile_size by tile_size grid cells, which is NaN for cells without a change
+    """
+    if product[0] == "difference":
+      _, first_epoch_idx, second_epoch_idx = product
+      return self.get_epoch_surface(second_epoch_idx, tile_x, tile_y) - self.get_epoch_surface(first_epoch_idx, tile_x, tile_y)
+    if product[0] == "trend":
+      surfaces = np.stack([self.get_epoch_surface(epoch_idx, tile_x, tile_y) for epoch_idx in range(len(self.epochs))])
+      years = np.array([(epoch["time"] - self.epochs[0]["time"]) / pd.Timedelta(days=365.25) for epoch in self.epochs])[:, np.newaxis, np.newaxis]
+      # Fit a line through the epochs with a value in each cell, which needs values from at least two epochs.
+      has_value = np.isfinite(surfaces)
+      value_counts = has_value.sum(axis=0)
+      mean_years = np.divide((years * has_value).sum(axis=0), value_counts, out=np.zeros(value_counts.shape), where=value_counts > 0)
+      mean_values = np.divide(np.where(has_value, surfaces, 0).sum(axis=0), value_counts, out=np.zeros(value_counts.shape), where=value_counts > 0)
+      year_offsets = np.where(has_value, years - mean_years, 0)
+      covariances = (year_offsets * np.where(has_value, surfaces - mean_values, 0)).sum(axis=0)
+      variances = (year_offsets ** 2).sum(axis=0)
+      return np.divide(covariances, variances, out=np.full(variances.shape, np.nan), where=(value_counts >= 2) & (variances > 0))
+    raise ValueError("Unknown change surface: {}".format(product))
+
+  def get_product_epochs(self, product: tuple) -> list[int]:
+    """
+    Gets the epochs that a change surface is computed from.
+
+    Args:
+      product (tuple): Change surface, see get_product_surface
+
+    Returns:
+      list[int]: Positions of the epochs in epochs
+    """
+    if product[0] == "difference": return list(product[1:])
+    return list(range(len(self.epochs)))
+
+  def get_tile_values(self, product: tuple, z: int, x: int, y: int) -> "numpy.ndarray":
+    """
+    Gets the values of a change surface in a map tile at any zoom level.
+    Map tiles closer than grid_zoom repeat the values of their grid cells, and farther map tiles average the grid cells in each of their pixels.
+
+    Args:
+      product (tuple): Change surface, see get_product_surface
+      z (int): Zoom level of the map tile
+      x (int): Column of the map tile
+      y (int): Row of the map tile
+
+    Returns:
+      numpy.ndarray: (row, column) array with tile_size by tile_size pixel values, which is NaN for pixels without a change, or None if the map tile has no change
+    """
+    pixels = np.arange(tile_size)
+    if z >= self.grid_zoom:
+      zoom_difference = z - self.grid_zoom
+      tile_x, tile_y = x >> zoom_difference, y >> zoom_difference
+      if (tile_x, tile_y) not in self.tiles: return None
+      surface = self.get_product_surface(product, tile_x, tile_y)
+      cell_x = ((x * tile_size + pixels) >> zoom_difference) - tile_x * tile_size
+      cell_y = ((y * tile_size + pixels) >> zoom_difference) - tile_y * tile_size
+      return surface[np.ix_(cell_y, cell_x)]
+    zoom_difference = self.grid_zoom - z
+    tiles = [(tile_x, tile_y) for tile_x, tile_y in self.tiles if ((tile_x >> zoom_difference) == x) and ((tile_y >> zoom_difference) == y)]
+    if len(tiles) == 0: return None
+    sums, counts = np.zeros(tile_size * tile_size), np.zeros(tile_size * tile_size)
+    for tile_x, tile_y in tiles:
+      surface = self.get_product_surface(product, tile_x, tile_y)
+      pixel_x = ((tile_x * tile_size + pixels) >> zoom_difference) - x * tile_size
+      pixel_y = ((tile_y * tile_size + pixels) >> zoom_difference) - y * tile_size
+      pixel_idx = (pixel_y[:, np.newaxis] * tile_size + pixel_x[np.newaxis, :])
+      has_value = np.isfinite(surface)
+      sums += np.bincount(pixel_idx[has_value], weights=surface[has_value], minlength=tile_size * tile_size)
+      counts += np.bincount(pixel_idx[has_value], minlength=tile_size * tile_size)
+    return np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0).reshape(tile_size, tile_size)
+
+  def get_tile_signature(self, product: tuple, value_range: float, z: int, x: int, y: int) -> str:
+    """
+    Gets a hash of everything that a rendered change tile is computed from, which only changes if a survey in the tile's area (or the time of one of its epochs) changes.
+
+    Args:
+      product (tuple): Change surface, see get_product_surface
+      value_range (float): Change that gets the most saturated colors
+      z (int): Zoom level of the map tile
+      x (int): Column of the map tile
+      y (int): Row of the map tile
+
+    Returns:
+      str: Hash of the map tile's surveys, epoch times and rendering settings
+    """
+    if z >= self.grid_zoom: tiles = {(x >> (z - self.grid_zoom), y >> (z - self.grid_zoom))}
+    else: tiles = {(tile_x, tile_y) for tile_x, tile_y in self.tiles if ((tile_x >> (self.grid_zoom - z)) == x) and ((tile_y >> (self.grid_zoom - z)) == y)}
+    epochs = [
+      [self.epochs[epoch_idx]["time"].isoformat(), sorted(list(file_key) for file_key in self.epochs[epoch_idx]["files"] if not self.file_tiles[file_key].isdisjoint(tiles))]
+      for epoch_idx in self.get_product_epochs(product)
+    ]
+    signature = [self.settings_hash, self.interpolation_radius, product[0], value_range, z, x, y, epochs]
+    return hashlib.sha1(json.dumps(signature).encode("utf-8")).hexdigest()
+
+  def get_tile(self, product: tuple, value_range: float, z: int, x: int, y: int) -> bytes:
+    """
+    Gets a rendered change tile, which is only rendered again after a survey in its area changes.
+
+    Args:
+      product (tuple): Change surface, see get_product_surface
+      value_range (float): Change that gets the most saturated colors
+      z (int): Zoom level of the map tile
+      x (int): Column of the map tile
+      y (int): Row of the map tile
+
+    Returns:
+      bytes: PNG image of the map tile, which is transparent where there's no change
+    """
+    tile_path = None
+    if self.tiles_dir_path is not None:
+      tile_path = os.path.join(self.tiles_dir_path, self.get_tile_signature(product, value_range, z, x, y) + tile_file_extension)
+      try:
+        with open(tile_path, "rb") as tile_file: tile = tile_file.read()
+        # Mark the tile as recently used, so that less recently used tiles are removed first.
+        os.utime(tile_path)
+        return tile
+      except FileNotFoundError:
+        pass
+    values = self.get_tile_values(product, z, x, y)
+    tile = empty_tile if values is None else encode_png(get_change_image(values, value_range))
+    if tile_path is not None: self.store_tile(tile_path, tile)
+    return tile
+
+  def get_stored_tiles(self) -> list[tuple]:
+    """
+    Gets every rendered tile stored in tiles_dir_path.
+
+    Returns:
+      list[tuple]: List of (last use time, size, path) tuples of the stored tiles, which is empty if tiles can't be stored
+    """
+    if self.tiles_dir_path is None: return []
+    stored_tiles = []
+    with os.scandir(self.tiles_dir_path) as entries:
+      for entry in entries:
+        if not entry.name.endswith(tile_file_extension): continue
+        try:
+          stat = entry.stat()
+        except FileNotFoundError:
+          continue
+        stored_tiles.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    return stored_tiles
+
+  def store_tile(self, tile_path: str, tile: bytes) -> None:
+    """
+    Stores a rendered tile in tiles_dir_path, and removes the least recently used stored tiles if they take up more than max_stored_tile_bytes.
+
+    Args:
+      tile_path (str): Path that the tile is stored at
+      tile (bytes): PNG image of the tile
+    """
+    temp_tile_path = "{}.{}.{}.tmp".format(tile_path, os.getpid(), threading.get_ident())
+    with open(temp_tile_path, "wb") as tile_file: tile_file.write(tile)
+    os.replace(temp_tile_path, tile_path)
+    with self.stored_tiles_lock:
+      self.stored_tile_bytes += len(tile)
+      if self.stored_tile_bytes > self.max_stored_tile_bytes: self.prune_stored_tiles()
+
+  def prune_stored_tiles(self) -> None:
+    """
+    Removes the least recently used stored tiles (including ones stored by other change grids and processes) until they take up at most pruned_tile_fraction of max_stored_tile_bytes.
+    """
+    stored_tiles = sorted(self.get_stored_tiles())
+    self.stored_tile_bytes = sum(size for _, size, _ in stored_tiles)
+    for _, size, tile_path in stored_tiles:
+      if self.stored_tile_bytes <= pruned_tile_fraction * self.max_stored_tile_bytes: break
+      try:
+        os.remove(tile_path)
+      except FileNotFoundError:
+        pass
+      self.stored_tile_bytes -= size
+
+  def get_memory_usage(self) -> int:
+    """
+    Gets the number of bytes that the gridded surveys, epochs and cached tile surfaces take up in memory.
+
+    Returns:
+      int: Size of the gridded surveys, the epochs' cells and the cached surfaces in bytes
+    """
+    return (
+      sum(sum(array.nbytes for array in file_grid) for file_grid in self.file_grids.values())
+      + sum(keys.nbytes + means.nbytes for keys, means in self.epoch_cells)
+      + sum(surface.nbytes for surface in list(self.surfaces.values()))
+    )
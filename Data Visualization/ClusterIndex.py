@@ -0,0 +1,209 @@
+# Standard library imports
+import math
+
+# External dependencies imports
+import numpy as np
+from PointPyramid import to_mercator, tile_size
+
+# Constants
+# Width and height of a cluster's grid cell in screen pixels, which is how close data points need to be on the map to be clustered.
+default_cluster_cell_size = 64
+# Maximum zoom level of the map that data points are clustered at, where closer views display individual data points.
+default_max_cluster_zoom = 16
+
+def to_latitude_longitude(x: "numpy.ndarray", y: "numpy.ndarray") -> tuple:
+  """
+  Converts Web Mercator coordinates back into latitudes and longitudes.
+
+  Args:
+    x (numpy.ndarray): Web Mercator x coordinates between 0 and 1
+    y (numpy.ndarray): Web Mercator y coordinates between 0 and 1
+
+  Returns:
+    tuple: (latitudes, longitudes) tuple of arrays in degrees
+  """
+  longitudes = np.asarray(x, dtype=np.float64) * 360 - 180
+  latitudes = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * np.asarray(y, dtype=np.float64)))))
+  return latitudes, longitudes
+
+def aggregate_cells(keys: "numpy.ndarray", sums: dict, minimums: dict, maximums: dict, points: "numpy.ndarray") -> tuple:
+  """
+  Combines the data points (or child cells) that are in the same grid cell.
+
+  Args:
+    keys (numpy.ndarray): Grid cell key of each data point or child cell
+    sums (dict): Dictionary mapping names (keys) to values that are added up per cell (values), e.g. the number of data points
+    minimums (dict): Dictionary mapping names (keys) to values whose minimum is kept per cell (values)
+    maximums (dict): Dictionary mapping names (keys) to values whose maximum is kept per cell (values)
+    points (numpy.ndarray): Position of a data point in each data point or child cell
+
+  Returns:
+    tuple: (keys, sums, minimums, maximums, points) tuple with the same structure as the arguments, with one sorted entry per grid cell
+  """
+  order = np.argsort(keys, kind="stable")
+  sorted_keys = keys[order]
+  cell_starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))) if len(sorted_keys) > 0 else np.empty(0, dtype=np.int64)
+  def reduce(function, values): return function.reduceat(values[order], cell_starts) if len(cell_starts) > 0 else values[:0]
+  return (
+    sorted_keys[cell_starts],
+    {name: reduce(np.add, values) for name, values in sums.items()},
+    {name: reduce(np.minimum, values) for name, values in minimums.items()},
+    {name: reduce(np.maximum, values) for name, values in maximums.items()},
+    points[order][cell_starts]
+  )
+
+class ClusterIndex:
+  def __init__(self, latitudes: "numpy.ndarray", longitudes: "numpy.ndarray", statistics: dict = {}, max_zoom: int = default_max_cluster_zoom, cell_size: int = default_cluster_cell_size) -> None:
+    """
+    Creates a new instance of the ClusterIndex class, which clusters all data points of a data file for every zoom level of the map once, so that any view can be displayed as a bounded number of clusters.
+    Data points in the same grid cell (cell_size pixels wide at a zoom level) form one cluster, and the clusters of a zoom level are the combined clusters of the next zoom level.
+
+    Args:
+      latitudes (numpy.ndarray): Latitude of each data point
+      longitudes (numpy.ndarray): Longitude of each data point
+      statistics (dict): Optional dictionary mapping labels (keys) to numeric values of each data point (values), whose mean is computed for every cluster, default is {} for no statistics
+        ^ e.g. {"Mean Orthometric Height (meters)": heights}, where missing values are ignored
+      max_zoom (int): Optional maximum zoom level of the map that data points are clustered at, default is 16
+      cell_size (int): Optional width and height of a cluster's grid cell in screen pixels, default is 64 pixels
+    """
+    latitudes, longitudes = np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64)
+    x, y = to_mercator(latitudes, longitudes)
+
+    # total_points = number of clustered data points, which is added to cluster IDs so that they never match a data point's position
+    self.total_points = len(x)
+
+    # max_zoom = maximum zoom level of the map that data points are clustered at
+    self.max_zoom = int(max_zoom)
+
+    # zoom_level_offset = difference between a map zoom level and the grid level with cells of cell_size pixels at that zoom
+    self.zoom_level_offset = int(round(math.log2(tile_size / cell_size)))
+
+    # statistic_labels = labels of the statistics whose mean is computed for every cluster
+    self.statistic_labels = list(statistics.keys())
+
+    # Cluster the data points at the finest level first, since each coarser level's clusters are combinations of the finer level's clusters.
+    max_level = self.max_zoom + self.zoom_level_offset
+    cells_per_side = 2 ** max_level
+    cell_x = np.clip(np.floor(x * cells_per_side), 0, cells_per_side - 1).astype(np.int64)
+    cell_y = np.clip(np.floor(y * cells_per_side), 0, cells_per_side - 1).astype(np.int64)
+    sums = {"count": np.ones(self.total_points, dtype=np.int64), "x": x, "y": y}
+    for label_idx, values in enumerate(statistics.values()):
+      values = np.asarray(values, dtype=np.float64)
+      has_value = np.isfinite(values)
+      sums["sum {}".format(label_idx)] = np.where(has_value, values, 0.0)
+      sums["count {}".format(label_idx)] = has_value.astype(np.int64)
+    minimums, maximums = {"latitude": latitudes, "longitude": longitudes}, {"latitude": latitudes, "longitude": longitudes}
+    level_cells = aggregate_cells(cell_x * cells_per_side + cell_y, sums, minimums, maximums, np.arange(self.total_points, dtype=np.int64))
+    levels = [level_cells]
+    for level in range(max_level - 1, -1, -1):
+      keys, sums, minimums, maximums, points = level_cells
+      child_cells_per_side = 2 ** (level + 1)
+      parent_keys = (keys // child_cells_per_side // 2) * (child_cells_per_side // 2) + (keys % child_cells_per_side) // 2
+      level_cells = aggregate_cells(parent_keys, sums, minimums, maximums, points)
+      levels.append(level_cells)
+    levels.reverse()
+
+    # Store the clusters of all levels in the same arrays, where a cluster's position is its cluster ID (minus total_points).
+    # ^ level_starts = position of each level's first cluster, where the clusters of a level are sorted by their grid cell key
+    self.level_starts = np.cumsum([0] + [len(keys) for keys, _, _, _, _ in levels])
+    # keys = grid cell key of each cluster, which is its cell's column times the number of cells per side plus its row
+    self.keys = np.concatenate([keys for keys, _, _, _, _ in levels])
+    # counts = number of data points in each cluster
+    self.counts = np.concatenate([sums["count"] for _, sums, _, _, _ in levels])
+    # latitudes, longitudes = location of each cluster, which is the mean location of its data points
+    self.latitudes, self.longitudes = to_latitude_longitude(
+      np.concatenate([sums["x"] for _, sums, _, _, _ in levels]) / np.maximum(self.counts, 1),
+      np.concatenate([sums["y"] for _, sums, _, _, _ in levels]) / np.maximum(self.counts, 1)
+    )
+    # bounds = (south, west, north, east) tuple of arrays with the corners of the area containing each cluster's data points, which the map zooms to when a cluster is clicked
+    self.bounds = (
+      np.concatenate([minimums["latitude"] for _, _, minimums, _, _ in levels]),
+      np.concatenate([minimums["longitude"] for _, _, minimums, _, _ in levels]),
+      np.concatenate([maximums["latitude"] for _, _, _, maximums, _ in levels]),
+      np.concatenate([maximums["longitude"] for _, _, _, maximums, _ in levels])
+    )
+    # means = {label: means} dictionary with each statistic's mean over each cluster's data points (NaN if none of them has a value)
+    self.means = {}
+    for label_idx, label in enumerate(self.statistic_labels):
+      value_sums = np.concatenate([sums["sum {}".format(label_idx)] for _, sums, _, _, _ in levels])
+      value_counts = np.concatenate([sums["count {}".format(label_idx)] for _, sums, _, _, _ in levels])
+      self.means[label] = np.divide(value_sums, value_counts, out=np.full(len(value_sums), np.nan), where=value_counts > 0)
+    # points = position of one data point in each cluster, which is the cluster's only data point if it has one data point
+    self.points = np.concatenate([points for _, _, _, _, points in levels])
+
+  def get_level(self, zoom: float) -> int:
+    """
+    Gets the grid level with clusters for a zoom level of the map.
+
+    Args:
+      zoom (float): Zoom level of the map
+
+    Returns:
+      int: Grid level, or None if the zoom level is too close for clusters
+    """
+    if math.floor(zoom) > self.max_zoom: return None
+    return int(max(math.floor(zoom), 0)) + self.zoom_level_offset
+
+  def query(self, bounds: tuple, zoom: float, max_points: int) -> "numpy.ndarray":
+    """
+    Gets the clusters that represent the given view of the map, unless the view has few enough data points to display all of them.
+
+    Args:
+      bounds (tuple): ((south, west), (north, east)) tuple with the latitudes and longitudes of the view's corners, or None for the whole survey
+      zoom (float): Zoom level of the map
+      max_points (int): Maximum number of data points that are displayed without clustering them
+
+    Returns:
+      numpy.ndarray: Sorted IDs of the clusters in the view, where clusters with one data point are that data point's position and other IDs are at least total_points
+        ^ None if the zoom level is too close for clusters or the view has at most max_points data points
+    """
+    level = self.get_level(zoom)
+    if level is None: return None
+    level_start, level_end = self.level_starts[level], self.level_starts[level + 1]
+    if not bounds:
+      clusters = np.arange(level_start, level_end)
+    else:
+      # Clusters are sorted by column, so the columns of cells in view are one contiguous block of clusters.
+      ((south, west), (north, east)) = bounds
+      (min_x, max_x), (max_y, min_y) = to_mercator(np.array([south, north]), np.array([west, east]))
+      cells_per_side = 2 ** level
+      min_cell_x, max_cell_x = int(np.clip(math.floor(min_x * cells_per_side), 0, cells_per_side - 1)), int(np.clip(math.floor(max_x * cells_per_side), 0, cells_per_side - 1))
+      min_cell_y, max_cell_y = int(np.clip(math.floor(min_y * cells_per_side), 0, cells_per_side - 1)), int(np.clip(math.floor(max_y * cells_per_side), 0, cells_per_side - 1))
+      level_keys = self.keys[level_start:level_end]
+      column_start, column_end = np.searchsorted(level_keys, [min_cell_x * cells_per_side, (max_cell_x + 1) * cells_per_side])
+      cell_y = level_keys[column_start:column_end] % cells_per_side
+      clusters = level_start + column_start + np.flatnonzero((cell_y >= min_cell_y) & (cell_y <= max_cell_y))
+    # Display individual data points if all of them fit in the point budget.
+    if self.counts[clusters].sum() <= max_points: return None
+    return np.sort(np.where(self.counts[clusters] == 1, self.points[clusters], self.total_points + clusters))
+
+  def get_clusters(self, cluster_ids: "numpy.ndarray") -> dict:
+    """
+    Gets the location, size, bounds and statistics of clusters.
+
+    Args:
+      cluster_ids (numpy.ndarray): IDs of clusters returned by query that are at least total_points
+
+    Returns:
+      dict: Dictionary with the "latitudes", "longitudes", "counts", "bounds" ((south, west, north, east) tuple of arrays) and "means" ({label: means}) of the clusters
+    """
+    clusters = np.asarray(cluster_ids, dtype=np.int64) - self.total_points
+    return {
+      "latitudes": self.latitudes[clusters],
+      "longitudes": self.longitudes[clusters],
+      "counts": self.counts[clusters],
+      "bounds": tuple(corner[clusters] for corner in self.bounds),
+      "means": {label: means[clusters] for label, means in self.means.items()}
+    }
+
+  def get_memory_usage(self) -> int:
+    """
+    Gets the number of bytes that the clusters of every level take up in memory.
+
+    Returns:
+      int: Size of the clusters' keys, sizes, locations, bounds, statistics and data point positions in bytes
+    """
+    return (
+      self.level_starts.nbytes + self.keys.nbytes + self.counts.nbytes + self.latitudes.nbytes + self.longitudes.nbytes + self.points.nbytes
+      + sum(corner.nbytes for corner in self.bounds) + sum(means.nbytes for means in self.means.values())
+    )
@@ -0,0 +1,422 @@
+# Standard library imports
+import os
+import json
+import atexit
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+from SurveyCache import get_survey_cache
+from StreamingReader import StreamingReader
+from ShapePyramid import is_shape_file
+from TimeCatalog import read_file_times, default_datetime_col_names, default_time_col_names
+
+# Constants
+# Columns with the latitude and longitude of a data point, in order of preference.
+default_latitude_col_names = ["latitude", "Latitude", "Latitude (deg. N)"]
+default_longitude_col_names = ["longitude", "Longitude", "Longitude (deg. E)"]
+# Number of threads that list directories at once, which mostly wait for the file system.
+default_scan_workers = min(32, (os.cpu_count() or 1) + 4)
+# Number of processes that parse new or changed data files at once.
+default_ingest_workers = os.cpu_count() or 1
+# Minimum number of seconds between two listings of the category subfolders, unless a refresh is requested.
+default_rescan_interval = 10
+# Version of the manifest's format, where manifests of other versions are ignored.
+manifest_version = 2
+manifest_file_extension = ".json"
+
+# data_catalogs = {(data directory path, cache directory path, column names): DataCatalog} dictionary of catalogs shared by every session in this process that displays the same data directory
+data_catalogs = {}
+data_catalogs_lock = threading.Lock()
+
+def get_data_catalog(data_dir_path: str, cache: "SurveyCache", latitude_col_names: list[str] = default_latitude_col_names, longitude_col_names: list[str] = default_longitude_col_names, datetime_col_names: list[str] = default_datetime_col_names, time_col_names: list[str] = default_time_col_names, max_workers: int = default_ingest_workers, refresh: bool = False) -> "DataCatalog":
+  """
+  Gets the catalog of a data directory, which is created the first time it's needed in this process and updated with the data files that were added, modified or removed since it was last listed.
+
+  Args:
+    data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+    cache (SurveyCache): Cache of converted data files that new data files are converted into and the manifest is stored in
+    latitude_col_names (list[str]): Optional list of column names containing the latitude of each data point, default is the Elwha data's latitude columns
+    longitude_col_names (list[str]): Optional list of column names containing the longitude of each data point, default is the Elwha data's longitude columns
+    datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected, default is the Elwha data's date columns
+    time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected, default is the Elwha data's time columns
+    max_workers (int): Optional number of processes that parse new or changed data files at once, default is the number of CPU cores
+    refresh (bool): Optional boolean whether to list the category subfolders again even if they were listed less than default_rescan_interval seconds ago, default is False
+
+  Returns:
+    DataCatalog: Catalog of the data directory as of its last listing
+  """
+  key = (os.path.abspath(data_dir_path), os.path.abspath(cache.cache_dir), tuple(latitude_col_names), tuple(longitude_col_names), tuple(datetime_col_names), tuple(time_col_names))
+  with data_catalogs_lock:
+    catalog = data_catalogs.get(key)
+    if catalog is None:
+      catalog = DataCatalog(data_dir_path, cache, latitude_col_names, longitude_col_names, datetime_col_names, time_col_names, max_workers)
+      data_catalogs[key] = catalog
+      return catalog
+  catalog.update(refresh)
+  return catalog
+
+@atexit.register
+def stop_data_catalogs() -> None:
+  """
+  Stops the threads and worker processes of every catalog before the interpreter exits, since executors that are stopped while modules are unloaded raise errors.
+  """
+  with data_catalogs_lock: catalogs = list(data_catalogs.values())
+  for catalog in catalogs:
+    catalog.scan_executor.shutdown(wait=False)
+    with catalog.process_executor_lock: process_executor, catalog.process_executor = catalog.process_executor, None
+    if process_executor is not None: process_executor.shutdown(wait=True, cancel_futures=True)
+
+def scan_directory(dir_path: str) -> tuple:
+  """
+  Lists the files and subdirectories of a directory, skipping hidden ones (e.g. the cache).
+
+  Args:
+    dir_path (str): Path to the directory
+
+  Returns:
+    tuple: (files, subdirectory paths) tuple, where files is a list of (file path, modification time in nanoseconds, size) tuples
+  """
+  files, subdir_paths = [], []
+  with os.scandir(dir_path) as entries:
+    for entry in entries:
+      if entry.name.startswith("."): continue
+      if entry.is_dir():
+        subdir_paths.append(entry.path)
+      elif entry.is_file():
+        stat = entry.stat()
+        files.append((entry.path, stat.st_mtime_ns, stat.st_size))
+  return files, subdir_paths
+
+def scan_tree(dir_path: str, executor: "concurrent.futures.Executor") -> list[tuple]:
+  """
+  Lists every file in a directory and its nested subdirectories, where subdirectories are listed in parallel as soon as they're found.
+
+  Args:
+    dir_path (str): Path to the directory
+    executor (concurrent.futures.Executor): Threads that list directories
+
+  Returns:
+    list[tuple]: List of (file path, modification time in nanoseconds, size) tuples of every file
+  """
+  files = []
+  pending_scans = {executor.submit(scan_directory, dir_path)}
+  while len(pending_scans) > 0:
+    finished_scans, pending_scans = wait(pending_scans, return_when=FIRST_COMPLETED)
+    for scan in finished_scans:
+      dir_files, subdir_paths = scan.result()
+      files += dir_files
+      pending_scans |= {executor.submit(scan_directory, subdir_path) for subdir_path in subdir_paths}
+  return files
+
+def ingest_data_file(file_path: str, cache_dir: str, latitude_col_names: list[str], longitude_col_names: list[str], datetime_col_names: list[str], time_col_names: list[str]) -> dict:
+  """
+  Converts a data file into the cache's columnar format and summarizes it, which runs in a worker process.
+  The data file's timestamps are parsed and stored next to the converted data file, so that time catalogs with the same column names only read them.
+
+  Args:
+    file_path (str): Path to the data file
+    cache_dir (str): Path to the cache directory that the data file is converted into
+    latitude_col_names (list[str]): List of column names containing the latitude of each data point
+    longitude_col_names (list[str]): List of column names containing the longitude of each data point
+    datetime_col_names (list[str]): List of column names containing the date or time that the data was collected
+    time_col_names (list[str]): List of column names containing only the time of day that the data was collected
+
+  Returns:
+    dict: Dictionary with the data file's "columns" ({column name: type}), number of "rows", "bounds" ([south, west, north, east] or None without coordinates),
+      "time_range" ([first, last] ISO timestamps or None without timestamps) and "error" (None if the data file could be parsed)
+  """
+  summary = {"columns": {}, "rows": None, "bounds": None, "time_range": None, "error": None}
+  try:
+    cache = get_survey_cache(cache_dir)
+    if cache.enabled:
+      table = cache.get_table(file_path)
+      summary["columns"] = {field.name: str(field.type) for field in table.schema}
+    else:
+      summary["columns"] = {col: str(dtype) for col, dtype in cache.read_csv_sample(file_path).dtypes.items()}
+    file_cols = list(summary["columns"].keys())
+    latitude_col_name = next((col for col in latitude_col_names if col in file_cols), None)
+    longitude_col_name = next((col for col in longitude_col_names if col in file_cols), None)
+    has_coordinates = (latitude_col_name is not None) and (longitude_col_name is not None)
+    # Files without coordinate columns are still read to count their rows.
+    chunk_col_names = [latitude_col_name, longitude_col_name] if has_coordinates else file_cols[:1]
+
+    rows, bounds = 0, None
+    for chunk in StreamingReader(cache).iter_chunks(file_path, chunk_col_names):
+      rows += len(chunk.index)
+      if not has_coordinates: continue
+      latitudes = pd.to_numeric(chunk[latitude_col_name], errors="coerce").to_numpy(dtype=np.float64)
+      longitudes = pd.to_numeric(chunk[longitude_col_name], errors="coerce").to_numpy(dtype=np.float64)
+      has_location = np.isfinite(latitudes) & np.isfinite(longitudes)
+      if has_location.any():
+        chunk_bounds = [latitudes[has_location].min(), longitudes[has_location].min(), latitudes[has_location].max(), longitudes[has_location].max()]
+        bounds = chunk_bounds if bounds is None else [min(bounds[0], chunk_bounds[0]), min(bounds[1], chunk_bounds[1]), max(bounds[2], chunk_bounds[2]), max(bounds[3], chunk_bounds[3])]
+    summary["rows"] = rows
+    if bounds is not None: summary["bounds"] = [float(bound) for bound in bounds]
+    times = read_file_times(cache, file_path, datetime_col_names, time_col_names)[0]
+    if times is not None:
+      times = times[~np.isnat(times)]
+      if len(times) > 0: summary["time_range"] = [pd.Timestamp(times.min()).isoformat(), pd.Timestamp(times.max()).isoformat()]
+  except Exception as error:
+    summary["error"] = "{}: {}".format(type(error).__name__, error)
+  return summary
+
+class DataCatalog:
+  def __init__(self, data_dir_path: str, cache: "SurveyCache", latitude_col_names: list[str] = default_latitude_col_names, longitude_col_names: list[str] = default_longitude_col_names, datetime_col_names: list[str] = default_datetime_col_names, time_col_names: list[str] = default_time_col_names, max_workers: int = default_ingest_workers, rescan_interval: float = default_rescan_interval) -> None:
+    """
+    Creates a new instance of the DataCatalog class, which lists the data files of every category subfolder (including nested subfolders) and summarizes each data file once.
+    Directories are listed by parallel threads, and new or changed data files are converted and summarized by a pool of worker processes in the background.
+    Summaries are stored in a manifest in the cache directory, so a data file is only summarized again after it changes.
+    The same worker processes run the per-file work of the data directory's indexes (see map_files), which skip data files by their summaries.
+
+    Args:
+      data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+      cache (SurveyCache): Cache of converted data files that new data files are converted into and the manifest is stored in
+      latitude_col_names (list[str]): Optional list of column names containing the latitude of each data point
+      longitude_col_names (list[str]): Optional list of column names containing the longitude of each data point
+      datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected
+      time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected
+      max_workers (int): Optional number of processes that parse new or changed data files at once, default is the number of CPU cores
+        ^ if max_workers is 1, data files are parsed in this process when their summaries are first needed, so that parsing them doesn't slow down anything else
+      rescan_interval (float): Optional minimum number of seconds between two listings of the category subfolders, unless a refresh is requested, default is 10 seconds
+    """
+    # root_data_dir_path = path to the root directory containing all category subfolders and their data files
+    self.root_data_dir_path = data_dir_path
+
+    # cache = cache of converted data files that new data files are converted into
+    self.cache = cache
+
+    # latitude_col_names, longitude_col_names, datetime_col_names, time_col_names = column names that data files are summarized with
+    self.latitude_col_names = latitude_col_names
+    self.longitude_col_names = longitude_col_names
+    self.datetime_col_names = datetime_col_names
+    self.time_col_names = time_col_names
+
+    # max_workers = number of processes that parse new or changed data files at once
+    self.max_workers = max_workers
+
+    # rescan_interval = minimum number of seconds between two listings of the category subfolders
+    self.rescan_interval = rescan_interval
+    # last_scan_time = time.monotonic() value of the last listing, or None if the category subfolders were never listed
+    self.last_scan_time = None
+    # scan_lock = lock held while the category subfolders are listed, so that sessions asking for an update at the same time only list them once
+    self.scan_lock = threading.Lock()
+    # scan_executor = threads that list directories, which are reused by every listing
+    self.scan_executor = ThreadPoolExecutor(max_workers=default_scan_workers, thread_name_prefix="DataCatalog")
+
+    # process_executor = worker processes that parse data files, which are only started the first time several data files are parsed at once and reused afterwards
+    # ^ None if they weren't started yet or they can't be started (see use_processes)
+    self.process_executor = None
+    self.process_executor_lock = threading.Lock()
+    # use_processes = whether data files are parsed by worker processes, which is False after worker processes couldn't be started (e.g. a script without an `if __name__ == "__main__":` guard)
+    self.use_processes = max_workers > 1
+
+    # manifest_path = path to the manifest with the summary of every data file, whose name depends on the data directory and column names since other column names give other summaries
+    manifest_hash = hashlib.sha1(json.dumps([os.path.abspath(data_dir_path), latitude_col_names, longitude_col_names, datetime_col_names, time_col_names]).encode("utf-8")).hexdigest()[:16]
+    self.manifest_path = "{}/catalog_{}{}".format(cache.cache_dir, manifest_hash, manifest_file_extension)
+
+    # entries = {relative path: entry} dictionary with every file in the category subfolders, where a file's relative path is its category followed by its path inside the category subfolder
+    # ^ each entry is a dictionary with the file's "category", "file" (path inside the category subfolder), "path", "mtime_ns", "size", "ingested" (whether it was summarized) and its summary (see ingest_data_file)
+    self.entries = self.read_manifest()
+
+    # lock = lock protecting the entries, which are updated by every session and by the threads collecting summaries
+    self.lock = threading.RLock()
+
+    # ingest_threads = threads collecting the summaries of data files that are being parsed
+    self.ingest_threads = []
+
+    # pending_entries = entries of new or changed data files that are parsed when their summaries are first needed, if there's only one worker
+    self.pending_entries = []
+    # pending_lock = lock held while pending data files are parsed, so that other threads wait for their summaries without blocking the catalog's entries
+    self.pending_lock = threading.Lock()
+
+    self.update(refresh=True)
+
+  def read_manifest(self) -> dict:
+    """
+    Reads the summaries of data files that were stored by any process, which are reused for data files that didn't change since.
+
+    Returns:
+      dict: Dictionary mapping relative paths of summarized data files (keys) to their entries (values), which is empty if there's no manifest
+    """
+    try:
+      with open(self.manifest_path, "r", encoding="utf-8") as manifest_file: manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+      return {}
+    if manifest.get("version") != manifest_version: return {}
+    return {
+      relative_path: dict(entry, path=self.root_data_dir_path + "/" + relative_path, ingested=True)
+      for relative_path, entry in manifest["files"].items()
+    }
+
+  def write_manifest(self) -> None:
+    """
+    Stores the summaries of all summarized data files in the manifest.
+    ^ Data files that couldn't be parsed aren't stored, so that they're parsed again by the next process in case the error was temporary (e.g. the file was still being written).
+    """
+    files = {
+      relative_path: {key: value for key, value in entry.items() if key not in ["path", "ingested"]}
+      for relative_path, entry in self.entries.items() if entry["ingested"] and (entry.get("error") is None)
+    }
+    os.makedirs(self.cache.cache_dir, exist_ok=True)
+    # Write to a temporary file first so that other processes never read a partially written manifest.
+    temp_manifest_path = "{}.{}.{}.tmp".format(self.manifest_path, os.getpid(), threading.get_ident())
+    with open(temp_manifest_path, "w", encoding="utf-8") as manifest_file: json.dump({"version": manifest_version, "files": files}, manifest_file)
+    os.replace(temp_manifest_path, self.manifest_path)
+
+  def update(self, refresh: bool = False) -> None:
+    """
+    Lists the category subfolders again if they weren't listed within the last rescan_interval seconds, and starts summarizing the data files that were added or modified since.
+
+    Args:
+      refresh (bool): Optional boolean whether to list the category subfolders even if they were listed within the last rescan_interval seconds, default is False
+    """
+    with self.scan_lock:
+      if (not refresh) and (self.last_scan_time is not None) and (time.monotonic() - self.last_scan_time < self.rescan_interval): return
+      scanned_files = scan_tree(self.root_data_dir_path, self.scan_executor)
+      self.last_scan_time = time.monotonic()
+    with self.lock:
+      entries, new_entries = {}, []
+      for file_path, mtime_ns, size in scanned_files:
+        relative_path = os.path.relpath(file_path, self.root_data_dir_path).replace(os.sep, "/")
+        # Files directly in the root directory aren't in a category.
+        if "/" not in relative_path: continue
+        entry = self.entries.get(relative_path)
+        if (entry is None) or (entry["mtime_ns"] != mtime_ns) or (entry["size"] != size):
+          category, file = relative_path.split("/", 1)
+          entry = {"category": category, "file": file, "path": file_path, "mtime_ns": mtime_ns, "size": size, "ingested": False}
+          # Line and polygon files (e.g. reference shorelines) don't have rows of data points to summarize.
+          if is_shape_file(file): entry["ingested"] = True
+          else: new_entries.append(entry)
+        entries[relative_path] = entry
+      removed_files = set(self.entries.keys()) - set(entries.keys())
+      self.entries = entries
+      if (len(new_entries) > 0) and (self.max_workers <= 1):
+        self.pending_entries = [entry for entry in self.pending_entries if entries.get(entry["category"] + "/" + entry["file"]) is entry] + new_entries
+      elif len(new_entries) > 0:
+        ingest_thread = threading.Thread(target=self.ingest_entries, args=(new_entries,), daemon=True)
+        self.ingest_threads = [thread for thread in self.ingest_threads if thread.is_alive()] + [ingest_thread]
+        ingest_thread.start()
+      elif len(removed_files) > 0:
+        self.write_manifest()
+
+  def get_process_executor(self) -> ProcessPoolExecutor:
+    """
+    Gets the worker processes that parse data files, which are started the first time they're needed.
+
+    Returns:
+      ProcessPoolExecutor: Worker processes shared by every task of the catalog
+    """
+    with self.process_executor_lock:
+      if self.process_executor is None:
+        # Worker processes are spawned instead of forked, since forking a process with running threads (e.g. a Panel server) can deadlock.
+        self.process_executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+      return self.process_executor
+
+  def stop_processes(self) -> None:
+    """
+    Stops the worker processes after they couldn't run a task, and parses data files in this process from then on.
+    """
+    with self.process_executor_lock:
+      self.use_processes = False
+      process_executor, self.process_executor = self.process_executor, None
+    if process_executor is not None: process_executor.shutdown(wait=False, cancel_futures=True)
+
+  def map_files(self, function: "function", file_args: list[tuple]) -> list:
+    """
+    Runs a function once per data file on the catalog's worker processes, or in this process if there's only one worker, only one data file or worker processes can't be started.
+    The function must be defined at the top level of a module, since worker processes import it by name.
+
+    Args:
+      function (function): Function that is called with each data file's arguments
+      file_args (list[tuple]): List of argument tuples, one per data file
+
+    Returns:
+      list: Return value of the function for each data file, in the same order as file_args
+    """
+    if self.use_processes and (len(file_args) > 1):
+      try:
+        return list(self.get_process_executor().map(function, *zip(*file_args)))
+      except Exception:
+        # Worker processes can't be started or died (e.g. a script without an `if __name__ == "__main__":` guard starts itself again in every worker process), so run the function in this process instead.
+        self.stop_processes()
+    return [function(*args) for args in file_args]
+
+  def ingest_entries(self, entries: list[dict]) -> None:
+    """
+    Converts and summarizes new or changed data files on the catalog's worker processes (or in this process if there's only one of them), and stores their summaries in the manifest.
+    Entries are always marked as summarized, where data files that couldn't be summarized get an error and are excluded from data files until the next process parses them again.
+
+    Args:
+      entries (list[dict]): Entries of the data files
+    """
+    ingest_args = (self.cache.cache_dir, self.latitude_col_names, self.longitude_col_names, self.datetime_col_names, self.time_col_names)
+    summaries, ingest_error = [], None
+    try:
+      summaries = self.map_files(ingest_data_file, [(entry["path"],) + ingest_args for entry in entries])
+    except Exception as error:
+      ingest_error = "{}: {}".format(type(error).__name__, error)
+    finally:
+      with self.lock:
+        for entry_idx, entry in enumerate(entries):
+          summary = summaries[entry_idx] if entry_idx < len(summaries) else {"columns": {}, "rows": None, "bounds": None, "time_range": None, "error": ingest_error or "Not summarized"}
+          entry.update(summary, ingested=True)
+        self.write_manifest()
+
+  def wait(self) -> None:
+    """
+    Waits until every data file that was added or modified has been summarized.
+    """
+    with self.lock: ingest_threads = list(self.ingest_threads)
+    for thread in ingest_threads: thread.join()
+    with self.pending_lock:
+      with self.lock: pending_entries, self.pending_entries = self.pending_entries, []
+      if len(pending_entries) > 0: self.ingest_entries(pending_entries)
+
+  def get_category_files(self) -> dict:
+    """
+    Gets the files in every category subfolder, without waiting for new data files to be summarized.
+
+    Returns:
+      dict: Dictionary mapping names of data categories (keys) to sorted lists of their files' paths inside the category subfolder (values), sorted by category
+        ^ a file's path inside its category subfolder is its name if it isn't in a nested subfolder
+    """
+    category_files = {}
+    with self.lock: entries = list(self.entries.values())
+    for entry in sorted(entries, key=lambda entry: (entry["category"], entry["file"])):
+      category_files.setdefault(entry["category"], []).append(entry["file"])
+    return category_files
+
+  def get_file_path(self, category: str, file: str) -> str:
+    """
+    Gets the path of a file in a category subfolder.
+
+    Args:
+      category (str): Name of the file's category
+      file (str): Path of the file inside the category subfolder
+
+    Returns:
+      str: Path to the file
+    """
+    return self.root_data_dir_path + "/" + category + "/" + file
+
+  def get_file_summaries(self, categories: list[str] = None) -> list[dict]:
+    """
+    Gets the summaries of all data files in the category subfolders that could be parsed, after waiting for new data files to be summarized.
+
+    Args:
+      categories (list[str]): Optional list of categories whose data files are returned, default is None for every category
+
+    Returns:
+      list[dict]: List of dictionaries with each data file's "category", "file" (path inside the category subfolder), "path", "mtime_ns", "size" and summary (see ingest_data_file), sorted by category and file
+        ^ line and polygon files (e.g. reference shorelines) aren't data files, since they don't have rows of data points
+    """
+    self.wait()
+    with self.lock: entries = [dict(entry) for entry in self.entries.values() if ("columns" in entry) and (entry.get("error") is None)]
+    if categories is not None: entries = [entry for entry in entries if entry["category"] in categories]
+    return sorted(entries, key=lambda entry: (entry["category"], entry["file"]))
@@ -3,29 +3,61 @@ import os
 import random
 
 # External dependencies imports
-import pandas as pd
-from bokeh.models import ColumnDataSource, DatetimeTickFormatter
+import numpy as np
+from bokeh.events import RangesUpdate
+from bokeh.models import ColumnDataSource, DatetimeTickFormatter, LogColorMapper
 from bokeh.plotting import figure
 from bokeh.models.tools import HoverTool
-from bokeh.tile_providers import get_provider, ESRI_IMAGERY
+from SpatialIndex import get_spatial_index
+from TimeCatalog import get_time_catalog
+from SurveyCache import get_survey_cache
+from StreamingReader import StreamingReader
+from Instrumentation import Instrumentation, get_column_data_bytes
+
+# Constants
+default_search_radius = 5.0
+# Original datasets with more rows than this are aggregated into an image on the server instead of sending every row to the browser.
+default_raster_threshold = 20000
+# Aggregated original datasets switch back to individual data points with tooltips once at most this many rows are in view.
+default_max_glyph_points = 5000
+# Maximum number of rows of an original dataset that are kept in memory, where larger datasets are represented by a uniform random sample of their rows.
+default_max_original_dataset_rows = 1000000
+# Width and height (in screen pixels) of each pixel of an aggregated original dataset's image, which keeps the image small to send.
+raster_pixel_size = 2
+# Markers that data categories are randomly assigned in the time-series graph.
+time_series_markers = ["circle", "circle_cross", "circle_dot", "circle_x", "circle_y", "diamond", "diamond_cross", "diamond_dot", "hex", "hex_dot", "inverted_triangle", "plus", "square", "square_cross", "square_dot", "square_pin", "square_x", "star", "star_dot", "triangle", "triangle_dot", "triangle_pin"]
 
 class DataPlotter:
-  def __init__(self, data_dir_path: str, category_colors: dict) -> None:
+  def __init__(self, data_dir_path: str, category_colors: dict, cache: "SurveyCache" = None, instrumentation: "Instrumentation" = None, raster_threshold: int = default_raster_threshold, max_glyph_points: int = default_max_glyph_points, reader: "StreamingReader" = None, max_original_dataset_rows: int = default_max_original_dataset_rows, loader: "LayerLoader" = None) -> None:
     """
     Creates a new instance of the DataPlotter class.
 
     Args:
       data_dir_path (str): Path to the root directory containing all category subfolders and their data files that need to be plotted
       category_colors (dict): Dictionary mapping names of data categories (keys) to their corresponding color (values)
+      cache (SurveyCache): Optional cache of converted data files to read data through, default is None for a cache in a hidden ".cache" folder in data_dir_path
+      instrumentation (Instrumentation): Optional instrumentation that records the stages, bytes and rows of every plot, default is None for no instrumentation
+      raster_threshold (int): Optional number of rows that an original dataset needs to have more of to be aggregated into an image on the server, default is 20000
+      max_glyph_points (int): Optional maximum number of rows in view for an aggregated original dataset to display individual data points with tooltips, default is 5000
+      reader (StreamingReader): Optional reader that reads data files one chunk at a time, default is None for a reader of the cache with the default memory budget
+      max_original_dataset_rows (int): Optional maximum number of rows of an original dataset that are kept in memory, default is 1000000
+        ^ larger original datasets are aggregated from a uniform random sample of their rows, and zoomed in views read the rows in view again
+      loader (LayerLoader): Optional loader that reads the rows in view of zoomed in original datasets in a background thread, default is None for reading them when the plot is panned or zoomed
     """
     # Create placeholder plots with no data so that it can be updated in a Panel modal later.
     self.time_series = figure(title = "Time-Series", x_axis_type = "datetime")
     self.time_series.xaxis.formatter = DatetimeTickFormatter(microseconds=["%b %Y"], milliseconds=["%b %Y"], seconds=["%b %Y"], minsec=["%b %Y"], months=["%b %Y"])
+    self.time_series_hover_tool = HoverTool(formatters={"@x": "datetime"})
+    self.time_series.add_tools(self.time_series_hover_tool)
 
+    # Tile providers are only imported when a plotter is created, since they aren't needed until the map plot is.
+    from bokeh.tile_providers import get_provider, ESRI_IMAGERY
     self.original_dataset = figure(title = "Original Dataset")
     self.original_dataset_hover_tool = HoverTool()
     self.original_dataset.add_tile(get_provider(ESRI_IMAGERY))
     self.original_dataset.add_tools(self.original_dataset_hover_tool)
+    # Aggregate the original dataset again for the new view whenever the plot is panned or zoomed.
+    self.original_dataset.on_event(RangesUpdate, self.update_original_dataset_view)
     
     # results = list of created plots to display
     self.results = [self.time_series, self.original_dataset]
@@ -36,6 +68,31 @@ class DataPlotter:
     # category_colors = dictionary mapping names of data categories (keys) to their corresponding color (values)
     self.category_colors = category_colors
 
+    # cache = cache of converted data files, which avoids parsing the same data file for every plot
+    self.cache = cache if cache is not None else get_survey_cache(data_dir_path + "/.cache")
+
+    # reader = reader that samples, filters and summarizes data files one chunk at a time, so that plotting a data file never needs the whole file in memory
+    self.reader = reader if reader is not None else StreamingReader(self.cache)
+    # max_original_dataset_rows = maximum number of rows of an original dataset that are kept in memory
+    self.max_original_dataset_rows = max_original_dataset_rows
+
+    # instrumentation = instrumentation that records plots if it's enabled
+    self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+
+    # raster_threshold = number of rows that an original dataset needs to have more of to be aggregated into an image
+    self.raster_threshold = raster_threshold
+    # max_glyph_points = maximum number of rows in view for an aggregated original dataset to display individual data points
+    self.max_glyph_points = max_glyph_points
+    # time_series_renderers = {(category1, file1): renderer1, ...} dictionary mapping data files to their scatter glyph in the time-series graph, which is reused for every plotted data point
+    self.time_series_renderers = {}
+    # time_series_markers = {category1: marker1, ...} dictionary mapping names of data categories to the marker of their data points in the time-series graph
+    self.time_series_markers = {}
+
+    # loader = loader that reads the rows in view of zoomed in original datasets in the background, or None to read them right away
+    self.loader = loader
+    # original_dataset_view = dictionary with the coordinates, rows and data sources of the aggregated original dataset, or None if the original dataset isn't aggregated
+    self.original_dataset_view = None
+
   def set_hover_tooltip(self, hover_tool: "bokeh.models.tools.HoverTool", dataframe_cols: list[str], tooltip_layout: dict) -> None:
     """
     Sets tooltips that appear when hovering over a data point to reflect the given tooltip layout if specified.
@@ -71,7 +128,7 @@ class DataPlotter:
     dataframe.rename(columns = col_names, inplace = True)
     return col_names
 
-  def plot_time_series(self, latitude: float, longitude: float, possible_lat_col_names, possible_long_col_names, possible_datetime_col_names: list[str], possible_y_axis_col_names: list[str], y_axis_label: str, x_axis_label: str = "Time") -> None:
+  def plot_time_series(self, latitude: float, longitude: float, possible_lat_col_names, possible_long_col_names, possible_datetime_col_names: list[str], possible_y_axis_col_names: list[str], y_axis_label: str, x_axis_label: str = "Time", search_radius: float = default_search_radius) -> None:
     """
     Plots data at the given file path as a time-series graph.
 
@@ -84,78 +141,156 @@ class DataPlotter:
       possible_y_axis_col_names (list[str]): List of column names containing the data values for the y-axis (because data from different files might have different column names)
       y_axis_label (str): Name for the plot's y-axis
       x_axis_label (str): Optional name for the plot's x-axis
+      search_radius (float): Optional distance in meters from the given latitude and longitude that data points can be in to appear in the time series plot, default is 5 meters
     """
-    # Clear the scatter plot and data tooltips (keep default tools).
-    self.time_series.renderers = []
-    self.time_series.toolbar.tools = self.time_series.toolbar.tools[:6]
-    self.time_series.legend.items = []
-    # # When the modal is closed, reset the visibility of glyphs using the legend.
-    # self.time_series.legend.click_policy = "none"
-    
-    # Set x and y axis labels.
+    with self.instrumentation.callback("plot time series"):
+      time_series_data = self.load_time_series(
+        latitude = latitude,
+        longitude = longitude,
+        possible_lat_col_names = possible_lat_col_names,
+        possible_long_col_names = possible_long_col_names,
+        possible_datetime_col_names = possible_datetime_col_names,
+        possible_y_axis_col_names = possible_y_axis_col_names,
+        search_radius = search_radius
+      )
+      self.draw_time_series(time_series_data, y_axis_label, x_axis_label)
+
+  def load_time_series(self, latitude: float, longitude: float, possible_lat_col_names, possible_long_col_names, possible_datetime_col_names: list[str], possible_y_axis_col_names: list[str], search_radius: float = default_search_radius) -> dict:
+    """
+    Reads all data for a time-series graph without modifying any plot, so it can run outside the thread that updates plots.
+
+    Args:
+      latitude (float): Latitude of all data points that appear in the time series plot
+      longitude (float): Longitude of all data points that appear in the time series plot
+      possible_lat_col_names (list[str]): List of column names containing the latitude of the collected data (because data from different files might have different column names)
+      possible_long_col_names (list[str]): List of column names containing the longitude of the collected data (because data from different files might have different column names)
+      possible_datetime_col_names (list[str]): List of column names containing the date or time that the data was collected (because data from different files might have different column names)
+      possible_y_axis_col_names (list[str]): List of column names containing the data values for the y-axis (because data from different files might have different column names)
+      search_radius (float): Optional distance in meters from the given latitude and longitude that data points can be in to appear in the time series plot, default is 5 meters
+
+    Returns:
+      dict: Dictionary with the given latitude and longitude, and a list with the category, name and plotted columns (x, y, latitude and longitude) of every data file with data points to plot
+    """
+    # Find all data points within the search radius of the given lat-long coordinates using the data directory's spatial index, which is only built on the first search.
+    with self.instrumentation.span("search spatial index"):
+      spatial_index = get_spatial_index(self.root_data_dir_path, possible_lat_col_names, possible_long_col_names, self.cache)
+      nearby_data_rows = spatial_index.query(latitude, longitude, search_radius)
+    self.instrumentation.add_rows("nearby", sum(len(rows) for rows in nearby_data_rows.values()))
+    # Use the timestamps that were parsed when the data files were first cataloged, instead of parsing dates on every plot.
+    with self.instrumentation.span("load time catalog"):
+      time_catalog = get_time_catalog(self.root_data_dir_path, self.cache, possible_datetime_col_names)
+
+    files_data = []
+    # Only read files that have data points near the given lat-long coordinates, which the spatial index found in the data directory's catalog (including nested category subfolders).
+    for (category, file), rows in sorted(nearby_data_rows.items()):
+      file_path = self.root_data_dir_path + "/" + category + "/" + file
+      file_cols = self.cache.get_columns(file_path)
+      # Plot data that contain one of the specified y-axis columns and timestamps.
+      existing_y_axis_col_names = [col_name for col_name in possible_y_axis_col_names if col_name in file_cols]
+      times = time_catalog.get_times(category, file)
+      # Keep non-empty filtered data.
+      if (len(existing_y_axis_col_names) > 0) and (times is not None) and (len(rows) > 0):
+        lat_col_name = [col_name for col_name in possible_lat_col_names if col_name in file_cols][0]
+        long_col_name = [col_name for col_name in possible_long_col_names if col_name in file_cols][0]
+        # Only read the columns that the plot and its tooltips need, and keep data within the search radius of the given lat-long coordinates.
+        # ^ Only the nearby rows are read, instead of whole columns of the data file.
+        with self.instrumentation.span("read " + file):
+          dataframe = self.cache.read_rows(file_path, rows, columns=[existing_y_axis_col_names[0], lat_col_name, long_col_name])
+        self.instrumentation.add_rows("read", len(dataframe.index))
+        files_data.append({
+          "category": category,
+          "file": file,
+          "data": {
+            "x": times[rows],
+            "y": dataframe[existing_y_axis_col_names[0]].to_numpy(),
+            "latitude": dataframe[lat_col_name].to_numpy(),
+            "longitude": dataframe[long_col_name].to_numpy()
+          }
+        })
+    return {"latitude": latitude, "longitude": longitude, "files": files_data}
+
+  def get_time_series_renderer(self, category: str, file: str) -> "bokeh.models.GlyphRenderer":
+    """
+    Gets the time-series graph's scatter glyph for a data file, which is only created the first time that the file has data points to plot.
+    Reusing glyphs means that plotting another data point's time series only sends new column data to the browser instead of a new plot.
+
+    Args:
+      category (str): Name of the data file's category
+      file (str): Name of the data file
+
+    Returns:
+      bokeh.models.GlyphRenderer: Scatter glyph whose data source has "x", "y", "latitude" and "longitude" columns
+    """
+    if (category, file) not in self.time_series_renderers:
+      # Every category keeps the same marker between plots.
+      if category not in self.time_series_markers: self.time_series_markers[category] = random.choice(time_series_markers)
+      data_source = ColumnDataSource(self.get_empty_time_series_data())
+      self.time_series_renderers[(category, file)] = self.time_series.scatter(
+        x = "x",
+        y = "y",
+        source = data_source,
+        name = file,
+        legend_label = category,
+        color = self.category_colors[category],
+        size = 12, fill_alpha = 0.4,
+        marker = self.time_series_markers[category]
+      )
+      # Customize plot's legend after adding data to scatter plot implicitly creates legend.
+      self.time_series.legend.location = "bottom_right"
+      self.time_series.legend.click_policy = "hide"     # clicking on a category in the legend hides its data
+    return self.time_series_renderers[(category, file)]
+
+  def get_empty_time_series_data(self) -> dict:
+    """
+    Gets the columns of a time-series data source without any data points.
+
+    Returns:
+      dict: Dictionary mapping the "x", "y", "latitude" and "longitude" column names (keys) to empty arrays (values)
+    """
+    return {"x": np.array([], dtype="datetime64[ns]"), "y": np.array([]), "latitude": np.array([]), "longitude": np.array([])}
+
+  def draw_time_series(self, time_series_data: dict, y_axis_label: str, x_axis_label: str = "Time") -> None:
+    """
+    Updates the time-series graph with data that was read by load_time_series.
+    Glyphs of data files that were plotted before are reused, so only the data sources that changed are sent to the browser.
+
+    Args:
+      time_series_data (dict): Data returned by load_time_series
+      y_axis_label (str): Name for the plot's y-axis
+      x_axis_label (str): Optional name for the plot's x-axis
+    """
+    # Set x and y axis labels and tooltips, which Bokeh only sends to the browser if they changed.
     self.time_series.xaxis.axis_label = x_axis_label
     self.time_series.yaxis.axis_label = y_axis_label
-    
-    # Get all data for different categories of data, which should be subfolders in the given data_path.
-    data_categories = [file for file in os.listdir(self.root_data_dir_path) if os.path.isdir(self.root_data_dir_path + "/" + file)]
+    self.time_series_hover_tool.tooltips = [("Survey", "$name"), ("Date & Time", "@x{%F %T}"), ("Latitude", "@latitude"), ("Longitude", "@longitude"), (y_axis_label, "@y")]
 
     # Update the time-series scatter plot with the data from self.root_data_dir_path.
-    markers = ["circle", "circle_cross", "circle_dot", "circle_x", "circle_y", "diamond", "diamond_cross", "diamond_dot", "hex", "hex_dot", "inverted_triangle", "plus", "square", "square_cross", "square_dot", "square_pin", "square_x", "star", "star_dot", "triangle", "triangle_dot", "triangle_pin"]
     max_decimals = 4
-    rounded_lat, rounded_long = round(latitude, max_decimals), round(longitude, max_decimals)
+    rounded_lat, rounded_long = round(time_series_data["latitude"], max_decimals), round(time_series_data["longitude"], max_decimals)
     self.time_series.title.text = "Time-Series for Data Collected at {} (Latitude), {} (Longitude)".format(rounded_lat, rounded_long)
-    for category in data_categories:
-      data_category_marker = random.choice(markers)
-      data_category_path = self.root_data_dir_path + "/" + category
-      data_category_files = os.listdir(data_category_path)
-      for file in data_category_files:
-        dataframe = pd.read_csv(data_category_path + "/" + file)
-        # Plot data that contain one of the specified y-axis columns.
-        existing_y_axis_col_names = [col_name for col_name in possible_y_axis_col_names if col_name in dataframe.columns]
-        if len(existing_y_axis_col_names) > 0:
-          # Filter for data with the same latitude and longitude as the given lat-long coordinates when rounded.
-          [latitude_col_name] = [col_name for col_name in possible_lat_col_names if col_name in dataframe.columns]
-          [longitude_col_name] = [col_name for col_name in possible_long_col_names if col_name in dataframe.columns]
-          dataframe = dataframe.loc[(round(dataframe[latitude_col_name], max_decimals) == rounded_lat) & (round(dataframe[longitude_col_name], max_decimals) == rounded_long)]
-          
-          # Display non-empty filtered dataframes.
-          if len(dataframe.index) > 0:
-            # Convert the filtered dataframe into ColumnDataSource, which is compatible for plotting.
-            [datetime_col_name] = [col_name for col_name in possible_datetime_col_names if col_name in dataframe.columns]
-            y_axis_col_name = existing_y_axis_col_names[0]
-            # Save original dataframe columns before a new datetime objects column is added for the plot's x-axis.
-            dataframe_cols = dataframe.columns
-            x_axis_col_name = "datetime_objs"
-            dataframe[x_axis_col_name] = pd.to_datetime(dataframe[datetime_col_name])
-            col_dict = self.get_valid_col_names(
-              cols = dataframe_cols,
-              dataframe = dataframe
-            )
-            data_source = ColumnDataSource(dataframe)
-            
-            # Plot the filtered data.
-            file_scatter_plot = self.time_series.scatter(
-              x = x_axis_col_name,
-              y = col_dict[y_axis_col_name],
-              source = data_source,
-              legend_label = category,
-              color = self.category_colors[category],
-              size = 12, fill_alpha = 0.4,
-              marker = data_category_marker
-            )
-    
-            # Add the corresponding tooltip for the file's data points on hover.
-            file_hover_tool = HoverTool(renderers=[file_scatter_plot])
-            self.set_hover_tooltip(
-              hover_tool = file_hover_tool,
-              dataframe_cols = dataframe_cols,
-              tooltip_layout = col_dict
-            )
-            self.time_series.add_tools(file_hover_tool)
-    
-    # Customize plot's legend after adding data to scatter plot implicitly creates legend.
-    self.time_series.legend.location = "bottom_right"
-    self.time_series.legend.click_policy = "hide"     # clicking on a category in the legend hides its data
+    plotted_files = set()
+    for file_data in time_series_data["files"]:
+      category, file, data = file_data["category"], file_data["file"], file_data["data"]
+      plotted_files.add((category, file))
+      with self.instrumentation.span("update ColumnDataSource"):
+        file_scatter_plot = self.get_time_series_renderer(category, file)
+        # Show data that were hidden using the legend for the previous data point again.
+        file_scatter_plot.visible = True
+        data_source = file_scatter_plot.data_source
+        # Nearby data points often plot the same data, which doesn't need to be sent again.
+        data_changed = (data_source.data.keys() != data.keys()) or any(not np.array_equal(data_source.data[col_name], values) for col_name, values in data.items())
+        if data_changed: data_source.data = data
+      self.instrumentation.add_rows("plotted", len(data["x"]))
+      if data_changed: self.instrumentation.add_bytes("ColumnDataSource " + file, lambda: get_column_data_bytes(data))
+
+    # Empty the glyphs of data files without data near the given lat-long coordinates.
+    for (category, file), file_scatter_plot in self.time_series_renderers.items():
+      if ((category, file) not in plotted_files) and (len(file_scatter_plot.data_source.data["x"]) > 0):
+        file_scatter_plot.data_source.data = self.get_empty_time_series_data()
+    # Only list categories with plotted data in the legend.
+    plotted_categories = set(category for category, _ in plotted_files)
+    for legend in self.time_series.legend:
+      for legend_item in legend.items: legend_item.visible = legend_item.label["value"] in plotted_categories
   
   def plot_original_dataset(self, data_path: str, x_axis_col_name: str, y_axis_col_name: str, x_axis_label: str = "Latitude", y_axis_label: str = "Longitude", data_point_color: str = "blue") -> None:
     """
@@ -169,36 +304,231 @@ class DataPlotter:
       y_axis_label (str): Optional name for the plot's y-axis, default is "Longitude"
       data_point_color (str): Optional color for the plot's data points, default is "blue"
     """
-    # Clear the scatter plot.
-    self.original_dataset.renderers = []
+    with self.instrumentation.callback("plot original dataset", file=os.path.basename(data_path)):
+      self.draw_original_dataset(self.load_original_dataset(data_path), x_axis_col_name, y_axis_col_name, x_axis_label, y_axis_label, data_point_color)
 
-    # Update the scatter plot with the given data.
-    path_components = data_path.split("/")
-    self.original_dataset.title.text = "Original Dataset of Sampled Data Point: {}".format(path_components[-1])
-    dataframe = pd.read_csv(data_path)
+  def load_original_dataset(self, data_path: str) -> dict:
+    """
+    Reads the original dataset from the given data path without modifying any plot, so it can run outside the thread that updates plots.
+
+    Args:
+      data_path (str): Path to a directory containing data that needs to be plotted
+
+    Returns:
+      dict: Dictionary with the data path, the dataframe with valid column names, its original column names, a dictionary mapping original column names to valid ones, and the total number of rows
+        ^ the dataframe is a uniform random sample of the rows if the dataset has more than max_original_dataset_rows rows
+    """
+    # Read the data file one chunk at a time, and keep a sample of its rows if there are more than fit in memory.
+    with self.instrumentation.span("read original dataset"):
+      scan = self.reader.scan(data_path, sample_size=self.max_original_dataset_rows)
+    dataframe = scan["data"]
+    self.instrumentation.add_rows("original dataset", scan["total_rows"])
+    if scan["sampled"]: self.instrumentation.add_rows("sampled", len(dataframe.index))
     cols = dataframe.columns
     col_dict = self.get_valid_col_names(
       cols = cols,
       dataframe = dataframe
     )
-    new_source = ColumnDataSource(dataframe)
+    return {"data_path": data_path, "dataframe": dataframe, "dataframe_cols": cols, "col_dict": col_dict, "total_rows": scan["total_rows"]}
+
+  def draw_original_dataset(self, dataset: dict, x_axis_col_name: str, y_axis_col_name: str, x_axis_label: str = "Latitude", y_axis_label: str = "Longitude", data_point_color: str = "blue") -> None:
+    """
+    Updates the map plot with a dataset that was read by load_original_dataset.
+
+    Args:
+      dataset (dict): Data returned by load_original_dataset
+      x_axis_col_name (str): Name of the column containing the latitude or some other data value that the user prefers for the x-axis
+      y_axis_col_name (str): Name of the column containing the longitude or some other data value that the user prefers for the y-axis
+      x_axis_label (str): Optional name for the plot's x-axis, default is "Latitude"
+      y_axis_label (str): Optional name for the plot's y-axis, default is "Longitude"
+      data_point_color (str): Optional color for the plot's data points, default is "blue"
+    """
+    # Clear the scatter plot.
+    self.original_dataset.renderers = []
+    self.original_dataset_view = None
+    self.original_dataset_hover_tool.renderers = "auto"
+
+    # Update the scatter plot with the given data.
+    path_components = dataset["data_path"].split("/")
+    self.original_dataset.title.text = "Original Dataset of Sampled Data Point: {}".format(path_components[-1])
+    col_dict = dataset["col_dict"]
     self.original_dataset.xaxis.axis_label = x_axis_label
     self.original_dataset.yaxis.axis_label = y_axis_label
-    self.original_dataset.scatter(
-      x = col_dict[x_axis_col_name],
-      y = col_dict[y_axis_col_name],
-      source = new_source,
-      color = data_point_color
-    )
+    dataframe = dataset["dataframe"]
+    if dataset["total_rows"] > self.raster_threshold:
+      self.draw_aggregated_original_dataset(dataset, x_axis_col_name, y_axis_col_name, data_point_color)
+    else:
+      with self.instrumentation.span("create ColumnDataSource"):
+        new_source = ColumnDataSource(dataframe)
+      self.instrumentation.add_bytes("ColumnDataSource original dataset", lambda: get_column_data_bytes(new_source.data))
+      self.original_dataset.scatter(
+        x = col_dict[x_axis_col_name],
+        y = col_dict[y_axis_col_name],
+        source = new_source,
+        color = data_point_color
+      )
 
     # Set tooltips for the plot's data points on hover.
     self.set_hover_tooltip(
       hover_tool = self.original_dataset_hover_tool,
-      dataframe_cols = cols,
+      dataframe_cols = dataset["dataframe_cols"],
       tooltip_layout = col_dict
     )
   
-  def plot_data_point_details(self, data: dict, category_latitude_cols: dict, category_longitude_cols: dict, category_datetime_cols: dict, category_y_axis_cols: dict, category_y_axis_label: dict) -> None:
+  def draw_aggregated_original_dataset(self, dataset: dict, x_axis_col_name: str, y_axis_col_name: str, data_point_color: str) -> None:
+    """
+    Plots a large original dataset as an image of how many data points are in each pixel, which is aggregated on the server for the current view of the plot.
+    Individual data points (with tooltips) are only plotted when the view is zoomed in far enough to contain at most max_glyph_points rows.
+
+    Args:
+      dataset (dict): Data returned by load_original_dataset
+      x_axis_col_name (str): Original name of the column containing the plot's x-axis values
+      y_axis_col_name (str): Original name of the column containing the plot's y-axis values
+      data_point_color (str): Color of the plot's individual data points
+    """
+    dataframe, col_dict = dataset["dataframe"], dataset["col_dict"]
+    x_col_name, y_col_name = col_dict[x_axis_col_name], col_dict[y_axis_col_name]
+    x, y = dataframe[x_col_name].to_numpy(dtype=np.float64), dataframe[y_col_name].to_numpy(dtype=np.float64)
+    has_coordinates = np.isfinite(x) & np.isfinite(y)
+    image_source = ColumnDataSource({"image": [], "x": [], "y": [], "dw": [], "dh": []})
+    glyph_source = ColumnDataSource({col_name: [] for col_name in ColumnDataSource.from_df(dataframe.iloc[:0]).keys()})
+    self.original_dataset.image(
+      image = "image", x = "x", y = "y", dw = "dw", dh = "dh", source = image_source,
+      # Pixels without data points are transparent.
+      color_mapper = LogColorMapper(palette = "Viridis256", nan_color = "rgba(0, 0, 0, 0)")
+    )
+    glyph_renderer = self.original_dataset.scatter(x = x_col_name, y = y_col_name, source = glyph_source, color = data_point_color)
+    # Only individual data points have tooltips, since the image's pixels don't belong to a single row.
+    self.original_dataset_hover_tool.renderers = [glyph_renderer]
+    self.original_dataset_view = {
+      "dataframe": dataframe[has_coordinates],
+      "x": x[has_coordinates],
+      "y": y[has_coordinates],
+      "image_source": image_source,
+      "glyph_source": glyph_source,
+      # Each sampled row stands for this many rows of the original dataset.
+      "row_weight": dataset["total_rows"] / max(1, len(dataframe.index)),
+      # Sampled datasets read the rows in view again once few enough of them are in view, so that zoomed in views show every row.
+      "data_path": dataset["data_path"] if len(dataframe.index) < dataset["total_rows"] else None,
+      "x_axis_col_name": x_axis_col_name,
+      "y_axis_col_name": y_axis_col_name,
+      "col_dict": col_dict
+    }
+    # Start with a view of the whole dataset.
+    if has_coordinates.any():
+      self.original_dataset.x_range.start, self.original_dataset.x_range.end = float(self.original_dataset_view["x"].min()), float(self.original_dataset_view["x"].max())
+      self.original_dataset.y_range.start, self.original_dataset.y_range.end = float(self.original_dataset_view["y"].min()), float(self.original_dataset_view["y"].max())
+    self.update_original_dataset_view()
+
+  def update_original_dataset_view(self, event: "bokeh.events.RangesUpdate" = None) -> None:
+    """
+    Displays the aggregated original dataset for the current view of the plot, as an image or as individual data points if few enough rows are in view.
+
+    Args:
+      event (bokeh.events.RangesUpdate): Optional information on the new view after the plot was panned or zoomed, default is None for the plot's current ranges
+    """
+    view = self.original_dataset_view
+    if view is None: return
+    if event is not None: (x_start, x_end, y_start, y_end) = (event.x0, event.x1, event.y0, event.y1)
+    else: (x_start, x_end, y_start, y_end) = (self.original_dataset.x_range.start, self.original_dataset.x_range.end, self.original_dataset.y_range.start, self.original_dataset.y_range.end)
+    if None in (x_start, x_end, y_start, y_end) or len(view["x"]) == 0: return
+    x_start, x_end = min(x_start, x_end), max(x_start, x_end)
+    y_start, y_end = min(y_start, y_end), max(y_start, y_end)
+    in_view = (view["x"] >= x_start) & (view["x"] <= x_end) & (view["y"] >= y_start) & (view["y"] <= y_end)
+    total_in_view = int(round(np.count_nonzero(in_view) * view["row_weight"]))
+    self.instrumentation.add_rows("in view", total_in_view)
+    if total_in_view <= self.max_glyph_points:
+      rows_in_view = view["dataframe"][in_view]
+      if view["data_path"] is not None:
+        bounds = ((x_start, y_start), (x_end, y_end))
+        view["requested_bounds"] = bounds
+        read_rows = view.get("read_rows")
+        if (read_rows is not None) and (read_rows[0] == bounds): rows_in_view = read_rows[1]
+        elif self.loader is None: rows_in_view = self.read_requested_rows_in_view(view)[1]
+        else:
+          # Show the sampled rows in view until every row in view was read from the data file in the background.
+          self.loader.run_query("Original dataset", lambda: self.read_requested_rows_in_view(view), lambda result: self.draw_requested_rows_in_view(view, result))
+      self.draw_rows_in_view(view, rows_in_view)
+      return
+    # Rows in view that are still being read aren't displayed once the plot is zoomed out.
+    view["requested_bounds"] = None
+    # Count the data points in each pixel of the plot.
+    with self.instrumentation.span("rasterize"):
+      counts, _, _ = np.histogram2d(
+        view["y"][in_view], view["x"][in_view],
+        bins = (max(1, self.original_dataset.height // raster_pixel_size), max(1, self.original_dataset.width // raster_pixel_size)),
+        range = ((y_start, y_end), (x_start, x_end))
+      )
+      image = np.where(counts > 0, counts * view["row_weight"], np.nan).astype(np.float32)
+      view["image_source"].data = {"image": [image], "x": [x_start], "y": [y_start], "dw": [x_end - x_start], "dh": [y_end - y_start]}
+      view["glyph_source"].data = {col_name: [] for col_name in view["glyph_source"].data.keys()}
+    self.instrumentation.add_bytes("image original dataset", lambda: image.nbytes)
+
+  def read_rows_in_view(self, view: dict, bounds: tuple) -> "pandas.DataFrame":
+    """
+    Reads every row in view from an aggregated original dataset's data file, since its sample only has some of them.
+
+    Args:
+      view (dict): Aggregated original dataset from original_dataset_view
+      bounds (tuple): ((x_start, y_start), (x_end, y_end)) corners of the view
+
+    Returns:
+      pandas.DataFrame: Rows in view, with the same column names as the sample
+    """
+    with self.instrumentation.span("read rows in view"):
+      return self.reader.scan(
+        view["data_path"],
+        sample_size = self.max_glyph_points,
+        latitude_col_name = view["x_axis_col_name"],
+        longitude_col_name = view["y_axis_col_name"],
+        bounds = bounds
+      )["data"].rename(columns = view["col_dict"])
+
+  def read_requested_rows_in_view(self, view: dict) -> tuple:
+    """
+    Reads the rows in the latest requested view of an aggregated original dataset, which runs in the loader's background thread.
+    Views that were requested while the data file was being read are coalesced, since only the latest one is read and earlier ones reuse its rows.
+
+    Args:
+      view (dict): Aggregated original dataset from original_dataset_view
+
+    Returns:
+      tuple: (bounds, rows) the read view's corners and rows in view, or (None, None) if the plot was zoomed out since
+    """
+    bounds = view["requested_bounds"]
+    if bounds is None: return (None, None)
+    read_rows = view.get("read_rows")
+    if (read_rows is None) or (read_rows[0] != bounds):
+      read_rows = (bounds, self.read_rows_in_view(view, bounds))
+      view["read_rows"] = read_rows
+    return read_rows
+
+  def draw_requested_rows_in_view(self, view: dict, result: tuple) -> None:
+    """
+    Displays the rows in view that were read in the background, unless the plot shows another dataset or view since.
+
+    Args:
+      view (dict): Aggregated original dataset from original_dataset_view
+      result (tuple): (bounds, rows) returned by read_requested_rows_in_view
+    """
+    bounds, rows_in_view = result
+    if (bounds is None) or (view is not self.original_dataset_view) or (bounds != view.get("requested_bounds")): return
+    self.draw_rows_in_view(view, rows_in_view)
+
+  def draw_rows_in_view(self, view: dict, rows_in_view: "pandas.DataFrame") -> None:
+    """
+    Displays the rows in view of an aggregated original dataset as individual data points.
+
+    Args:
+      view (dict): Aggregated original dataset from original_dataset_view
+      rows_in_view (pandas.DataFrame): Rows to display
+    """
+    with self.instrumentation.span("create ColumnDataSource"):
+      view["glyph_source"].data = ColumnDataSource.from_df(rows_in_view)
+      view["image_source"].data = {"image": [], "x": [], "y": [], "dw": [], "dh": []}
+    self.instrumentation.add_bytes("ColumnDataSource original dataset", lambda: get_column_data_bytes(view["glyph_source"].data))
+
+  def plot_data_point_details(self, data: dict, category_latitude_cols: dict, category_longitude_cols: dict, category_datetime_cols: dict, category_y_axis_cols: dict, category_y_axis_label: dict, search_radius: float = default_search_radius) -> None:
     """
     Creates a time-series plot for all data collected at the same latitude and longitude of the selected data point.
     Also creates another plot with all the geojson data that the selected data point was sampled from.
@@ -210,6 +540,26 @@ class DataPlotter:
       category_datetime_cols (dict): Dictionary mapping data categories (keys) to lists of column names (values) containing the date or time of the collected data (because data from different files might have different column names)
       category_y_axis_cols (dict): Dictionary mapping data categories (keys) to lists of column names (values) containing the time-series plot's y-axis values of the collected data (because data from different files might have different column names)
       category_y_axis_label (dict): Dictionary mapping data categories (keys) to labels (values) that appear on the y-axis of the time-series plot
+      search_radius (float): Optional distance in meters from the selected data point that other data points can be in to appear in the time-series plot, default is 5 meters
+    """
+    with self.instrumentation.callback("plot details", file=os.path.basename(data["path"])):
+      self.draw_data_point_details(self.load_data_point_details(data, category_latitude_cols, category_longitude_cols, category_datetime_cols, category_y_axis_cols, category_y_axis_label, search_radius))
+
+  def load_data_point_details(self, data: dict, category_latitude_cols: dict, category_longitude_cols: dict, category_datetime_cols: dict, category_y_axis_cols: dict, category_y_axis_label: dict, search_radius: float = default_search_radius) -> dict:
+    """
+    Reads all data for the plots of plot_data_point_details without modifying any plot, so it can run outside the thread that updates plots.
+
+    Args:
+      data (dict): Dictionary with details (file path, feature with popup info, etc.) about the hovered/clicked GeoJSON feature
+      category_latitude_cols (dict): Dictionary mapping data categories (keys) to lists of column names (values) containing the latitude of the collected data
+      category_longitude_cols (dict): Dictionary mapping data categories (keys) to lists of column names (values) containing the longitude of the collected data
+      category_datetime_cols (dict): Dictionary mapping data categories (keys) to lists of column names (values) containing the date or time of the collected data
+      category_y_axis_cols (dict): Dictionary mapping data categories (keys) to lists of column names (values) containing the time-series plot's y-axis values of the collected data
+      category_y_axis_label (dict): Dictionary mapping data categories (keys) to labels (values) that appear on the y-axis of the time-series plot
+      search_radius (float): Optional distance in meters from the selected data point that other data points can be in to appear in the time-series plot, default is 5 meters
+
+    Returns:
+      dict: Dictionary with the data read for both plots and the plots' labels and colors
     """
     # Gets the name of an existing dataframe column from the provided list of all possible column names.
     def get_existing_col_name(possible_col_names, dataframe_cols):
@@ -217,27 +567,44 @@ class DataPlotter:
         if col_name in dataframe_cols: return col_name
       return None
 
-    [selected_feature_long, selected_feature_lat] = data["feature"]["geometry"]["coordinates"]
-    path = data["path"]
-    [(category, data_color)] = [(data_category, color) for data_category, color in self.category_colors.items() if data_category in path]
-    latitude_cols, longitude_cols = category_latitude_cols[category], category_longitude_cols[category]
-    dataframe_cols = data["feature"]["properties"].keys()
+    with self.instrumentation.callback("load details", file=os.path.basename(data["path"])):
+      [selected_feature_long, selected_feature_lat] = data["feature"]["geometry"]["coordinates"]
+      path = data["path"]
+      [(category, data_color)] = [(data_category, color) for data_category, color in self.category_colors.items() if data_category in path]
+      latitude_cols, longitude_cols = category_latitude_cols[category], category_longitude_cols[category]
+      dataframe_cols = self.cache.get_columns(path)
     
-    # Plot time-series for all collected data at the hovered/clicked data point's latitude-longitude coordinates.
-    self.plot_time_series(
-      latitude = selected_feature_lat,
-      longitude = selected_feature_long,
-      possible_lat_col_names = latitude_cols,
-      possible_long_col_names = longitude_cols,
-      possible_datetime_col_names = category_datetime_cols[category],
-      possible_y_axis_col_names = category_y_axis_cols[category],
-      y_axis_label = category_y_axis_label[category]
-    )
-    
-    # Plot original dataset that the hovered/clicked data point was sampled from.
-    self.plot_original_dataset(
-      data_path = path,
-      x_axis_col_name = get_existing_col_name(latitude_cols, dataframe_cols),
-      y_axis_col_name = get_existing_col_name(longitude_cols, dataframe_cols),
-      data_point_color = data_color
-    )
\ No newline at end of file
+      return {
+        # Time-series for all collected data at the hovered/clicked data point's latitude-longitude coordinates.
+        "time_series": self.load_time_series(
+          latitude = selected_feature_lat,
+          longitude = selected_feature_long,
+          possible_lat_col_names = latitude_cols,
+          possible_long_col_names = longitude_cols,
+          possible_datetime_col_names = category_datetime_cols[category],
+          possible_y_axis_col_names = category_y_axis_cols[category],
+          search_radius = search_radius
+        ),
+        "y_axis_label": category_y_axis_label[category],
+        # Original dataset that the hovered/clicked data point was sampled from.
+        "original_dataset": self.load_original_dataset(path),
+        "x_axis_col_name": get_existing_col_name(latitude_cols, dataframe_cols),
+        "y_axis_col_name": get_existing_col_name(longitude_cols, dataframe_cols),
+        "data_color": data_color
+      }
+
+  def draw_data_point_details(self, details: dict) -> None:
+    """
+    Updates the time-series plot and the original dataset's plot with data that was read by load_data_point_details.
+
+    Args:
+      details (dict): Data returned by load_data_point_details
+    """
+    with self.instrumentation.callback("draw details", file=os.path.basename(details["original_dataset"]["data_path"])):
+      self.draw_time_series(details["time_series"], y_axis_label=details["y_axis_label"])
+      self.draw_original_dataset(
+        dataset = details["original_dataset"],
+        x_axis_col_name = details["x_axis_col_name"],
+        y_axis_col_name = details["y_axis_col_name"],
+        data_point_color = details["data_color"]
+      )
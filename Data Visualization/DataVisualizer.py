@@ -1,28 +1,93 @@
 # Standard library imports
 import os
-import json
-from collections import defaultdict
+import time
+import uuid
+from collections import defaultdict, OrderedDict
 import math
+import json
+import threading
+import weakref
+from contextlib import nullcontext
 
 # External dependencies imports
+import numpy as np
 import pandas as pd
-import geopandas
-from ipyleaflet import Map, basemaps, basemap_to_tiles, GeoJSON, Popup, LayersControl, FullScreenControl, LegendControl
+from ipyleaflet import Map, basemaps, basemap_to_tiles, GeoJSON, VectorTileLayer, TileLayer, Popup, LayersControl, FullScreenControl, LegendControl
 from ipywidgets import Layout, HTML, VBox
 from bokeh.palettes import Bokeh
-from DataPlotter import DataPlotter
+from SurveyCache import get_survey_cache
+from StreamingReader import StreamingReader, default_memory_budget
+from PointPyramid import PointPyramid
+from ClusterIndex import ClusterIndex, default_max_cluster_zoom
+from ShapePyramid import ShapePyramid, is_shape_file, read_shape_file, get_shape_file_columns, get_shape_file_key
+from LayerSource import LayerSource
+from GeoJSONBuilder import build_point_features, build_cluster_features, build_shape_features, get_feature_location, get_geojson_memory_usage
+from TileServer import get_tile_server, tile_layer_name
+from PopupTemplate import PopupTemplate
+from LayerLoader import LayerLoader
+from TimeCatalog import get_time_catalog, default_datetime_col_names, default_time_col_names
+from ChangeGrid import get_change_grid, change_colors, default_change_ranges
+from DataCatalog import get_data_catalog
+from Instrumentation import Instrumentation, get_json_bytes
 
 # Constants
 default_geojson_hover_color = "#2196f3"
 empty_geojson_name = "no_data"
+default_max_points_per_layer = 200
+# Maximum number of vertices that a line or polygon layer displays in the current view of the map.
+default_max_vertices_per_layer = 5000
+# Maximum number of data points that a layer keeps in memory, where larger data files are represented by a uniform random sample of their data points.
+default_max_points_per_source = 1000000
+# Maximum distance in screen pixels between the mouse and a data point on a vector tile layer for the data point to be hovered/clicked.
+vector_tile_hover_distance = 8
+default_hover_interval = 0.1
+# Maximum number of bytes that loaded but hidden layers can take up before the least recently hidden ones are removed from memory.
+default_hidden_layer_memory_budget = 256 * 1024 * 1024
+
+# shared_layer_sources = {(data file path, modification time, size, layer arguments): source, ...} dictionary to store the layer sources that were loaded by any session in this process, so that every session reuses them instead of reading the data file again
+# ^ sources are weakly referenced, so a source is removed from memory once no session has it loaded anymore
+shared_layer_sources = weakref.WeakValueDictionary()
+shared_layer_sources_lock = threading.Lock()
+
+def get_shared_layer_source(key: tuple) -> LayerSource:
+  """
+  Gets the layer source that any session in this process loaded with the given key.
+
+  Args:
+    key (tuple): (data file path, modification time, size, layer arguments...) tuple of the layer source
+
+  Returns:
+    LayerSource: Shared layer source, or None if no session has it loaded
+  """
+  with shared_layer_sources_lock: return shared_layer_sources.get(key)
+
+def share_layer_source(key: tuple, source: LayerSource) -> LayerSource:
+  """
+  Shares a newly loaded layer source with every session in this process, unless another session finished loading the same layer first.
+
+  Args:
+    key (tuple): (data file path, modification time, size, layer arguments...) tuple of the layer source
+    source (LayerSource): Newly loaded layer source
+
+  Returns:
+    LayerSource: Layer source that every session uses for the key
+  """
+  with shared_layer_sources_lock:
+    # Stop sharing sources of older versions of the data file.
+    for outdated_key in [other_key for other_key in shared_layer_sources if (other_key[0] == key[0]) and (other_key[1:3] != key[1:3])]:
+      shared_layer_sources.pop(outdated_key)
+    # Use the source of another session that finished loading the same layer first.
+    return shared_layer_sources.setdefault(key, source)
 
 class DataVisualizer:
-  def __init__(self, data_dir_path: str, map_center: tuple = (0, 0), category_styles: dict = {}, data_details_button: "ipywidgets.Button" = None, basemap_options: dict = {"Default": basemaps.OpenStreetMap.Mapnik}, legend_name: str = "") -> None:
+  def __init__(self, data_dir_path: str, map_center: tuple = (0, 0), category_styles: dict = {}, data_details_button: "ipywidgets.Button" = None, basemap_options: dict = {"Default": basemaps.OpenStreetMap.Mapnik}, legend_name: str = "", cache_dir: str = None, max_points_per_layer: int = default_max_points_per_layer, layer_backend: str = "geojson", hover_interval: float = default_hover_interval, schedule: "function" = None, lazy: bool = False, instrumentation: "Instrumentation" = None, hidden_layer_memory_budget: int = default_hidden_layer_memory_budget, hide_mode: str = "visibility", hold: "function" = None, max_points_per_source: int = default_max_points_per_source, read_memory_budget: int = default_memory_budget, cluster_points: bool = False, cluster_statistics: dict = {}, max_cluster_zoom: int = default_max_cluster_zoom, max_vertices_per_layer: int = default_max_vertices_per_layer) -> None:
     """
     Creates a new instance of the DataVisualizer class with its instance variables.
 
     Args:
       data_dir_path (str): Path to the directory containing all the data category subfolders and their data files
+        ^ data files can be in nested subfolders of a category subfolder, whose layers are named after their path inside the category subfolder
+        ^ GeoJSON files (e.g. reference shorelines) in the category subfolders are displayed as line and polygon layers
       map_center (tuple): Optional (Latitude, Longitude) tuple specifying the center of the map
       category_styles (dict): Optional dictionary mapping names of data categories (keys) to their optional styling on a GeoJSON layer (values)
         ^ e.g. {
@@ -39,7 +104,63 @@ class DataVisualizer:
       data_details_button ("ipywidgets.Button"): Optional button displayed in the popup of a hovered/clicked data point
       basemap_options (dict): Optional dictionary mapping basemap names (keys) to basemap layers (values)
       legend_name (str): Optional name for the map legend, default empty string means that no title will be displayed in the legend
+      cache_dir (str): Optional path to the directory storing data files converted into a columnar format, default is None for a hidden ".cache" folder in data_dir_path
+      max_points_per_layer (int): Optional maximum number of data points that a GeoJSON layer displays in the current view of the map, default is 200
+      layer_backend (str): Optional type of layer that displays data files on the map, default is "geojson"
+        ^ "geojson" sends a layer's data points in the current view as GeoJSON over the websocket (at most max_points_per_layer points per layer)
+        ^ "vector_tiles" serves all data points of a layer as binary vector tiles from a local endpoint, so that whole datasets can be displayed
+      hover_interval (float): Optional minimum number of seconds between popup updates caused by hovering over data points, default is 0.1 seconds
+        ^ hover events that come sooner are ignored, so sweeping the mouse across many data points doesn't flood the server and browser with popup updates
+      schedule (function): Optional function that gets called with a function that updates the map or plots after data was loaded in the background, and calls it on the thread that owns them
+        ^ e.g. Panel apps should pass a function that calls pn.state.curdoc.add_next_tick_callback, default is None for calling the function right away
+      lazy (bool): Optional boolean that determines whether plots are only created when they're first used, default is False
+        ^ makes the map appear sooner in every new session, while map layers are still added before the map is rendered since layers added to a map rendered by Panel aren't displayed
+      instrumentation (Instrumentation): Optional instrumentation that records the stages, bytes and rows of every map and plot callback, default is None for no instrumentation
+      hidden_layer_memory_budget (int): Optional maximum number of bytes that loaded layers can take up while they're hidden, default is 256 MiB
+        ^ the least recently hidden layers are removed from memory once the budget is exceeded, and are loaded again when they're displayed
+      hide_mode (str): Optional way that GeoJSON layers are hidden, default is "visibility"
+        ^ "visibility" only turns off a hidden layer's visibility flag, so its data stays in the browser and displaying it again sends nothing unless the view changed
+        ^ "data" replaces a hidden layer's data with no data points, which frees the browser's memory but sends the layer's data again when it's displayed
+      hold (function): Optional function that returns a context manager combining all widget updates made inside it into one message, which is used when many layers are displayed or hidden at once
+        ^ e.g. Panel apps should pass pn.io.hold, default is None for sending every widget update right away
+      max_points_per_source (int): Optional maximum number of data points that a layer keeps in memory, default is 1000000
+        ^ layers of data files with more data points are built from a uniform random sample of them
+      read_memory_budget (int): Optional maximum number of bytes that reading a data file for a layer or plot keeps in memory, default is 256 MiB
+        ^ data files are read one chunk at a time, so larger data files take longer to read instead of needing more memory
+      cluster_points (bool): Optional boolean that determines whether GeoJSON layers display clusters of data points in views with more than max_points_per_layer data points, default is False for displaying a sample of them
+        ^ clicking a cluster zooms into its data points, and hovering over it displays its number of data points and statistics
+      cluster_statistics (dict): Optional dictionary mapping labels (keys) to lists of possible names of numeric columns (values), whose mean is displayed for every cluster, default is {} for no statistics
+        ^ e.g. {"Mean Orthometric Height (meters)": ["Ortho_Ht_m", "ortho_ht_m"], "Mean Percent Sand": ["Percent Sand"]}
+      max_cluster_zoom (int): Optional maximum zoom level of the map that data points are clustered at, default is 16
+      max_vertices_per_layer (int): Optional maximum number of vertices that a line or polygon layer displays in the current view of the map, default is 5000
+        ^ lines and polygons are simplified more in views that would have more vertices, and line and polygon layers are always GeoJSON layers
     """
+    # instrumentation = instrumentation shared with the plotter and loader, which records map and plot callbacks if it's enabled
+    self.instrumentation = instrumentation if instrumentation is not None else Instrumentation(enabled=False)
+
+    # startup_timings = {stage: seconds, ...} dictionary to store how long each stage of creating the DataVisualizer took, which tracks the time it takes for the map to appear
+    self.startup_timings = {}
+    startup_start_time = stage_start_time = time.perf_counter()
+
+    # cache = cache of converted data files shared with the plotter and every other session in this process, so that every data file is only parsed once
+    if cache_dir is None: cache_dir = data_dir_path + "/.cache"
+    self.cache = get_survey_cache(cache_dir)
+
+    # reader = reader shared with the plotter that samples, filters and summarizes data files one chunk at a time
+    self.reader = StreamingReader(self.cache, memory_budget=read_memory_budget)
+    # max_points_per_source = maximum number of data points that a layer keeps in memory
+    self.max_points_per_source = max_points_per_source
+
+    # cluster_points = whether GeoJSON layers display clusters of data points in views with too many data points
+    self.cluster_points = cluster_points and (layer_backend != "vector_tiles")
+    # cluster_statistics = dictionary mapping labels to possible names of the columns whose mean is displayed for every cluster
+    self.cluster_statistics = cluster_statistics
+    # max_cluster_zoom = maximum zoom level of the map that data points are clustered at
+    self.max_cluster_zoom = max_cluster_zoom
+
+    # lazy = whether plots are only created when they're first used
+    self.lazy = lazy
+
     # map = map containing data that user wants to visualize
     self.map = Map(
       center = map_center,
@@ -48,6 +169,24 @@ class DataVisualizer:
   
     self.map.add_control(FullScreenControl())
     self.map.add_control(LayersControl(position="topright"))
+    # Update displayed GeoJSON layers with the data points for the new view whenever the map is panned or zoomed.
+    self.map.observe(self.update_displayed_geojsons, names="bounds")
+
+    # layer_backend = type of layer that displays data files on the map ("geojson" or "vector_tiles")
+    self.layer_backend = layer_backend
+
+    # hide_mode = way that GeoJSON layers are hidden ("visibility" or "data")
+    self.hide_mode = hide_mode
+
+    # hold = function returning a context manager that combines widget updates into one message
+    self.hold = hold if hold is not None else nullcontext
+    # tile_source_prefix = unique prefix for the names of this DataVisualizer's datasets and rasters on the tile server
+    self.tile_source_prefix = uuid.uuid4().hex
+    if layer_backend == "vector_tiles":
+      # tile_server = server for the vector tiles of all layers, which is shared with other DataVisualizers in this process
+      self.tile_server = get_tile_server()
+      # Vector tile layers don't send mouse events for their data points, so find the hovered/clicked data point from mouse events on the map.
+      self.map.on_interaction(self.handle_map_interaction)
 
     # popup = popup that displays information about a data point
     popup_children = (HTML(),)
@@ -62,10 +201,52 @@ class DataVisualizer:
     # selected_geojson_data = dictionary with details (file path, feature with popup info, etc.) about the hovered/clicked GeoJSON feature
     self.selected_geojson_data = {}
 
-    # geojsons = {name1: GeoJSON1, name2: GeoJSON2, ...} dictionary to store all data that was read from data files
+    # popup_templates = {file path: (popup content, (modification time, size), popup template), ...} dictionary to store the compiled popup content of every data file with hovered/clicked data points
+    # ^ templates (and their rendered popups) are compiled again once their data file changes, since the reloaded layer's data points have other IDs and possibly other columns
+    self.popup_templates = {}
+
+    # hover_interval = minimum number of seconds between popup updates caused by hovering over data points
+    self.hover_interval = hover_interval
+    # last_hover_time = time of the last popup update caused by hovering over a data point
+    self.last_hover_time = 0.0
+    # pending_hover = function that handles the latest hover event that arrived less than hover_interval seconds after the last popup update, or None if there isn't one
+    # ^ it's handled once the interval has passed, so the popup always ends up showing the last hovered data point
+    self.pending_hover = None
+    # hover_timer = timer that handles pending_hover once the interval has passed, or None if no hover event is pending
+    self.hover_timer = None
+    # hover_lock = lock for the pending hover event, which is handled from the timer's thread
+    self.hover_lock = threading.Lock()
+
+    # geojsons = {name1: GeoJSON1, name2: GeoJSON2, ...} dictionary to store the GeoJSON of every displayed GeoJSON layer, which is only built for the data points in the current view
     self.geojsons = {
       empty_geojson_name: {"type": "FeatureCollection", "features": []}
     }
+    # geojson_bytes = {name1: bytes1, name2: bytes2, ...} dictionary to store the estimated size of every GeoJSON layer's GeoJSON, which is only measured when it's needed and measured again after the GeoJSON changes
+    # ^ layers hidden by their visibility flag keep their GeoJSON in memory (it's also the layer widget's data), so it counts towards the memory budget of hidden layers
+    self.geojson_bytes = {}
+
+    # max_points_per_layer = maximum number of data points that a GeoJSON layer displays in the current view of the map
+    self.max_points_per_layer = max_points_per_layer
+
+    # max_vertices_per_layer = maximum number of vertices that a line or polygon layer displays in the current view of the map
+    self.max_vertices_per_layer = max_vertices_per_layer
+
+    # layer_sources = {name1: source1, name2: source2, ...} dictionary to store the LayerSource (coordinates, popup properties and level-of-detail pyramid) of every loaded layer
+    # ^ sources are shared with other sessions that created a layer for the same data file (see shared_layer_sources), so they must never be modified
+    self.layer_sources = {}
+
+    # displayed_points = {name1: points1, name2: points2, ...} dictionary to store positions of the data points currently displayed by each visible GeoJSON layer
+    # ^ line and polygon layers store the key of their displayed view instead
+    self.displayed_points = {}
+
+    # hidden_layers = {name1: None, name2: None, ...} ordered dictionary of loaded layers that are hidden, where the least recently hidden layer is first
+    self.hidden_layers = OrderedDict()
+
+    # hidden_layer_memory_budget = maximum number of bytes that hidden layers can take up before the least recently hidden ones are removed from memory
+    self.hidden_layer_memory_budget = hidden_layer_memory_budget
+
+    # change_overlays = {name1: (tile layer1, legend1, source name1), ...} dictionary to store the raster tile layer, legend and tile server source of every change surface overlay that was added to the map
+    self.change_overlays = {}
     
     # all_layers = {name1: layer1, name2: layer2, ...} dictionary to store all possible layers that could be on the map
     # ^ e.g. {
@@ -77,49 +258,59 @@ class DataVisualizer:
     # }
     self.all_layers = defaultdict(lambda: None)
 
+    self.startup_timings["map"] = time.perf_counter() - stage_start_time
+    stage_start_time = time.perf_counter()
+
     # basemaps = list containing all basemap names that the user could choose from
     self.basemaps = basemap_options.keys()
+    # basemap_options = dictionary mapping basemap names (keys) to basemap layers (values)
+    self.basemap_options = basemap_options
     # Add all basemaps to the map first in order to update the visibility of their tile layers even after the map is rendered.
-    for name, basemap in basemap_options.items():
-      tile_layer = basemap_to_tiles(basemap)
-      tile_layer.show_loading, tile_layer.name = True, name
-      tile_layer.visible = False
-      self.map.add_layer(tile_layer)
-      self.all_layers[name] = tile_layer
+    # ^ Hidden tile layers don't request any tiles, so adding them doesn't slow down the map in lazy mode either.
+    for name in self.basemaps: self.get_basemap_layer(name)
+    self.startup_timings["basemaps"] = time.perf_counter() - stage_start_time
+    stage_start_time = time.perf_counter()
     
-    # Add placeholder layers for all data files to the map (initially no features) since new map layers currently can't be added once map is rendered on Panel app.
-    # ^ Will modify GeoJSON layer's `data` attribute when its data needs to be displayed.
+    # data_catalog = catalog of the data files in every category subfolder (including nested subfolders), which is shared with every session in this process
+    # ^ Directories are listed in parallel, and new or changed data files are summarized by worker processes in the background, so creating the catalog doesn't wait for data files to be parsed.
+    # ^ Every new session lists the category subfolders again, so that it displays data files that were added since the last session.
+    self.data_catalog = get_data_catalog(data_dir_path, self.cache, refresh=True)
+    data_catalog = self.data_catalog.get_category_files()
+    # layer_categories = {name1: category1, name2: category2, ...} dictionary mapping names of all data file layers to their data categories
+    # ^ a data file's name is its path inside its category subfolder, which is its file name unless it's in a nested subfolder
+    self.layer_categories = {file: category for category, category_files in data_catalog.items() for file in category_files}
+    # layer_paths = {name1: path1, name2: path2, ...} dictionary mapping names of all data file layers to the paths of their data files
+    self.layer_paths = {file: self.data_catalog.get_file_path(category, file) for file, category in self.layer_categories.items()}
+    self.startup_timings["catalog"] = time.perf_counter() - stage_start_time
+    stage_start_time = time.perf_counter()
+
+    # category_layer_styles = {category1: styles1, category2: styles2, ...} dictionary mapping data categories to the styling attributes of their layers
+    # ^ Data categories are assigned to a default color from the Bokeh palette, and any custom styles are applied on top of it.
+    self.category_layer_styles = {}
     legend_colors, palette_colors = {}, Bokeh[8]
-    data_categories = [file for file in os.listdir(data_dir_path) if os.path.isdir(data_dir_path + "/" + file)]
-    category_idx, total_palette_colors = 0, len(palette_colors)
-    for category in data_categories:
-      category_path = data_dir_path + "/" + category
-      category_files = [file for file in os.listdir(category_path)]
-      # Assign category to a default color.
-      default_category_color = palette_colors[category_idx % total_palette_colors]
+    for category_idx, category in enumerate(data_catalog.keys()):
+      default_category_color = palette_colors[category_idx % len(palette_colors)]
       legend_colors[category] = default_category_color
-      for file in category_files:
-        placeholder_geojson = GeoJSON(data = self.geojsons[empty_geojson_name], name = file)
-        # Initially set GeoJSON layer to a color from the Bokeh palette.
-        placeholder_geojson.point_style = {"color": default_category_color, "opacity": 0.5, "fillColor": default_category_color, "fillOpacity": 0.3, "radius": 8, "weight": 1, "dashArray": 2}
-        placeholder_geojson.hover_style = {"color": default_geojson_hover_color, "fillColor": default_geojson_hover_color, "weight": 3}
-        # Set any custom styles.
-        geojson_style_attributes = ["style", "point_style", "hover_style"]
-        if category in category_styles:
-          category_custom_style = category_styles[category]
-          for style_attr, style_val in category_custom_style.items():
-            if style_attr in geojson_style_attributes:
-              if style_attr == "style":
-                placeholder_geojson.style = style_val
-                if "color" in style_val: legend_colors[category] = style_val["color"]
-              elif style_attr == "point_style":
-                placeholder_geojson.point_style = style_val
-                if "color" in style_val: legend_colors[category] = style_val["color"]
-              elif style_attr == "hover_style":
-                placeholder_geojson.hover_style = style_val
-        # Add the placeholder GeoJSON layer to the map.
-        self.map.add_layer(placeholder_geojson)
-      category_idx += 1
+      layer_styles = {
+        "point_style": {"color": default_category_color, "opacity": 0.5, "fillColor": default_category_color, "fillOpacity": 0.3, "radius": 8, "weight": 1, "dashArray": 2},
+        "hover_style": {"color": default_geojson_hover_color, "fillColor": default_geojson_hover_color, "weight": 3}
+      }
+      # Set any custom styles.
+      geojson_style_attributes = ["style", "point_style", "hover_style"]
+      for style_attr, style_val in category_styles.get(category, {}).items():
+        if style_attr in geojson_style_attributes:
+          layer_styles[style_attr] = style_val
+          if (style_attr in ["style", "point_style"]) and ("color" in style_val): legend_colors[category] = style_val["color"]
+      self.category_layer_styles[category] = layer_styles
+
+    # placeholder_layers = {name1: layer1, name2: layer2, ...} dictionary to store the placeholder layer of every data file that was added to the map
+    self.placeholder_layers = {}
+    # Add placeholder layers for all data files to the map (initially no features) since new map layers currently can't be added once map is rendered on Panel app.
+    # ^ Will modify GeoJSON layer's `data` attribute when its data needs to be displayed.
+    # ^ Placeholder layers are added in lazy mode too, since only their data is loaded when it's first displayed.
+    for name in self.layer_categories.keys(): self.get_placeholder_layer(name)
+    self.startup_timings["layers"] = time.perf_counter() - stage_start_time
+    stage_start_time = time.perf_counter()
     
     # Add a map legend if the GeoJSON data layers have different styling.
     if len(legend_colors) > 1:
@@ -130,53 +321,280 @@ class DataVisualizer:
           position = "bottomright"
         )
       )
+
+    # data_dir_path = path to the directory containing all the data category subfolders and their data files
+    self.data_dir_path = data_dir_path
+
+    # legend_colors = dictionary mapping names of data categories (keys) to their color on the map and in plots (values)
+    self.legend_colors = legend_colors
     
+    # loader = instance of the LayerLoader class, which reads data for layers and plots in background threads
+    self.loader = LayerLoader(visualizer=self, schedule=schedule)
+
     # plotter = instance of the DataPlotter class, which creates plots with given data
-    self.plotter = DataPlotter(data_dir_path=data_dir_path, category_colors=legend_colors)
+    # ^ In lazy mode, the plotter is only created by get_plotter when plots are first needed.
+    self.plotter = None
+    if not lazy: self.get_plotter()
+    self.startup_timings["plotter"] = time.perf_counter() - stage_start_time
+    self.startup_timings["total"] = time.perf_counter() - startup_start_time
+
+  def get_plotter(self) -> "DataPlotter":
+    """
+    Gets the plotter, which is only created the first time it's needed in lazy mode.
+
+    Returns:
+      DataPlotter: Plotter that creates plots with the data files' data
+    """
+    if self.plotter is None:
+      # Importing the plotter loads Bokeh's plotting modules, so it's only imported when plots are needed.
+      from DataPlotter import DataPlotter
+      self.plotter = DataPlotter(data_dir_path=self.data_dir_path, category_colors=self.legend_colors, cache=self.cache, reader=self.reader, instrumentation=self.instrumentation, loader=self.loader)
+    return self.plotter
 
-  def get_existing_property(self, possible_prop_names_and_units: dict, feature_info: dict) -> str:
+  def get_data_in_date_range(self, start_date: "datetime.datetime", end_date: "datetime.datetime", possible_datetime_col_names: list[str] = default_datetime_col_names, possible_time_col_names: list[str] = default_time_col_names) -> dict:
     """
-    Gets the value and optional unit of an existing property from a GeoJSON feature.
+    Finds the data collected within a date range using the data directory's time catalog, which is only built the first time and after data files change.
 
     Args:
-      possible_prop_names_and_units (dict): Dictionary mapping possible names for the existing property (keys) to optional units corresponding to the property (values)
-      feature_info (dict): Dictionary mapping all properties for a GeoJSON feature to their values
+      start_date (datetime.datetime): Start of the date range (inclusive)
+      end_date (datetime.datetime): End of the date range (inclusive)
+      possible_datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected, default is the Elwha data's date columns
+      possible_time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected, default is the Elwha data's time columns
 
     Returns:
-      str: Value of the existing property and its optional unit
+      dict: Dictionary mapping names of data categories (keys) to dictionaries that map names of their data files with data in the date range to arrays of those data points' rows (values)
     """
-    for prop_name, prop_unit in possible_prop_names_and_units.items():
-      if prop_name in feature_info:
-        return str(feature_info[prop_name]) + " " + prop_unit
-    return "N/A"
+    with self.instrumentation.span("query time catalog"):
+      time_catalog = get_time_catalog(self.data_dir_path, self.cache, possible_datetime_col_names, possible_time_col_names)
+      data_in_date_range = defaultdict(dict)
+      for (category, file), rows in time_catalog.query(start_date, end_date).items():
+        data_in_date_range[category][file] = rows
+    return dict(data_in_date_range)
 
-  def get_label_vals(self, values: list[any], feature_info: dict) -> str:
+  def get_change_grid(self, value_col_names: list[str], latitude_col_names: list[str], longitude_col_names: list[str], categories: list[str] = None, possible_datetime_col_names: list[str] = default_datetime_col_names, possible_time_col_names: list[str] = default_time_col_names) -> "ChangeGrid":
     """
-    Gets label values that are displayed in the popup.
+    Gets the data directory's surveys gridded into epochs, which only grids surveys that were added or modified since the change grid was last built.
 
     Args:
-      values (list[any]): List containing dataframe column names or units that match the popup label
-        ^ units or any other text are placed in lists []
-        ^ values that have different column names in different files are listed in dictionaries {}, where keys are possible column names and values are units for the value (empty string "" if you don't want to include units)
-        ^ column names for the needed data are strings ""
-      feature_info (dict): Dictionary mapping all properties for a GeoJSON feature to their values
+      value_col_names (list[str]): List of column names containing the value that changes over time (e.g. orthometric height), in order of preference
+      latitude_col_names (list[str]): List of column names containing the latitude of each data point
+      longitude_col_names (list[str]): List of column names containing the longitude of each data point
+      categories (list[str]): Optional list of data categories whose data files are gridded, default is None for every category
+      possible_datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected, default is the Elwha data's date columns
+      possible_time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected, default is the Elwha data's time columns
 
     Returns:
-      str: Values for a label in the popup
-    """
-    label_values = ""
-    for val in values:
-      val_type = type(val)
-      # If the value is a list, simply add the list value(s) to the returned result because it contains a unit or some literal text.
-      if val_type is list:
-        label_values += "".join(val)
-      # Else if the value is a dictionary, which contains all the possible feature properties and corresponding units for a label, so find and add the value of the existing property.
-      elif val_type is dict:
-        label_values += self.get_existing_property(val, feature_info)
-      # Else the value is a string, which contains the name of an existing dataframe column, so append feature_info[val]. 
-      else:
-        label_values += str(feature_info[val])
-    return label_values
+      ChangeGrid: Up-to-date change grid, whose epochs can be compared with display_change_overlay
+    """
+    with self.instrumentation.span("build change grid"):
+      return get_change_grid(self.data_dir_path, self.cache, value_col_names, latitude_col_names, longitude_col_names, categories, possible_datetime_col_names, possible_time_col_names)
+
+  def display_change_overlay(self, change_grid: "ChangeGrid", product: tuple, name: str = "Elevation Change", value_range: float = None, units: str = "m", opacity: float = 0.7) -> TileLayer:
+    """
+    Displays a change surface as raster tiles over the map, replacing the change surface that was displayed with the same name.
+    Tiles are rendered by the tile server when the map requests them, and rendered tiles are reused until a survey in their area changes.
+
+    Args:
+      change_grid (ChangeGrid): Change grid returned by get_change_grid
+      product (tuple): Change surface to display
+        ^ ("difference", first epoch position, second epoch position) for the change from the first to the second epoch in change_grid.epochs
+        ^ ("trend",) for the least-squares rate of change per year over all epochs
+      name (str): Optional name of the overlay in the map's layer control, default is "Elevation Change"
+      value_range (float): Optional change that gets the most saturated colors, default is None for 2 units for differences and 1 unit per year for trends
+      units (str): Optional units of the changing value, which are displayed in the legend, default is "m"
+      opacity (float): Optional opacity of the overlay, default is 0.7
+
+    Returns:
+      ipyleaflet.TileLayer: Visible tile layer of the overlay
+    """
+    if value_range is None: value_range = default_change_ranges[product[0]]
+    if product[0] == "trend": units = units + "/year"
+    tile_server = get_tile_server()
+    # Tile URLs include the change surface, so that the browser doesn't reuse tiles of the previously displayed change surface.
+    source_name = "{}-change-{}-{}-{}".format(self.tile_source_prefix, name, "-".join(str(part) for part in product), value_range)
+    tile_server.add_raster_source(source_name, lambda z, x, y: change_grid.get_tile(product, value_range, z, x, y))
+
+    # Legend entries from the most negative to the most positive change.
+    legend_values = np.linspace(-value_range, value_range, 5)
+    legend_colors = {
+      "{:+g} {}".format(value, units) if value != 0 else "No change": "#{:02x}{:02x}{:02x}".format(*change_colors[int(round((value / value_range + 1) / 2 * (len(change_colors) - 1)))])
+      for value in legend_values
+    }
+    epoch_labels = change_grid.get_epoch_labels()
+    legend_name = "{} ({} to {})".format(name, epoch_labels[product[1]], epoch_labels[product[2]]) if product[0] == "difference" else "{} ({} to {})".format(name, epoch_labels[0], epoch_labels[-1])
+
+    if name in self.change_overlays:
+      tile_layer, legend, previous_source_name = self.change_overlays[name]
+      tile_layer.url, tile_layer.opacity, tile_layer.visible = tile_server.get_raster_tile_url(source_name), opacity, True
+      legend.name, legend.legend = legend_name, legend_colors
+      if legend not in self.map.controls: self.map.add_control(legend)
+      if previous_source_name != source_name: tile_server.remove_raster_source(previous_source_name)
+    else:
+      tile_layer = TileLayer(url=tile_server.get_raster_tile_url(source_name), name=name, opacity=opacity, max_zoom=int(self.map.max_zoom), attribution="")
+      legend = LegendControl(name=legend_name, legend=legend_colors, position="bottomleft")
+      self.map.add_layer(tile_layer)
+      self.map.add_control(legend)
+    self.change_overlays[name] = (tile_layer, legend, source_name)
+    return tile_layer
+
+  def hide_change_overlay(self, name: str = "Elevation Change") -> None:
+    """
+    Hides a change surface overlay and its legend.
+
+    Args:
+      name (str): Optional name of the overlay, default is "Elevation Change"
+    """
+    if name not in self.change_overlays: return
+    tile_layer, legend, _ = self.change_overlays[name]
+    tile_layer.visible = False
+    if legend in self.map.controls: self.map.remove_control(legend)
+
+  def close(self) -> None:
+    """
+    Stops the background threads of the DataVisualizer and removes its datasets and rasters from the shared tile server, which should be called once its map isn't displayed anymore.
+    ^ e.g. Panel apps should call it when their session is destroyed, since every session creates its own DataVisualizer.
+    """
+    self.loader.shutdown()
+    with self.hover_lock:
+      if self.hover_timer is not None: self.hover_timer.cancel()
+      self.hover_timer, self.pending_hover = None, None
+    tile_server = get_tile_server()
+    for _, _, source_name in self.change_overlays.values(): tile_server.remove_raster_source(source_name)
+    for name, layer in list(self.all_layers.items()):
+      if isinstance(layer, VectorTileLayer): tile_server.remove_source(self.get_tile_source_name(name))
+
+  def get_basemap_layer(self, name: str) -> "ipyleaflet.TileLayer":
+    """
+    Gets the tile layer of a basemap, which is added to the map the first time it's needed (when the DataVisualizer is created).
+
+    Args:
+      name (str): Name of the basemap
+
+    Returns:
+      ipyleaflet.TileLayer: Hidden or visible tile layer of the basemap
+    """
+    if self.all_layers[name] is None:
+      tile_layer = basemap_to_tiles(self.basemap_options[name])
+      tile_layer.show_loading, tile_layer.name = True, name
+      tile_layer.visible = False
+      self.map.add_layer(tile_layer)
+      self.all_layers[name] = tile_layer
+    return self.all_layers[name]
+
+  def get_placeholder_layer(self, name: str) -> "ipyleaflet.Layer":
+    """
+    Gets the placeholder layer of a data file, which is added to the map the first time it's needed (when the DataVisualizer is created).
+
+    Args:
+      name (str): Name of the data file
+
+    Returns:
+      ipyleaflet.Layer: GeoJSON layer (or vector tile layer) with the data file's styling, or None if there's no such data file
+    """
+    if (name not in self.placeholder_layers) and (name in self.layer_categories):
+      placeholder_geojson = GeoJSON(data = self.geojsons[empty_geojson_name], name = name)
+      for style_attr, style_val in self.category_layer_styles[self.layer_categories[name]].items():
+        setattr(placeholder_geojson, style_attr, style_val)
+      # Lines and polygons have the color of their category's data points, unless the category has a custom style.
+      if is_shape_file(name) and not placeholder_geojson.style:
+        category_color = placeholder_geojson.point_style.get("color")
+        placeholder_geojson.style = {"color": category_color, "opacity": 0.8, "fillColor": category_color, "fillOpacity": 0.2, "weight": 2}
+      # Line and polygon layers are always GeoJSON layers, since vector tiles only contain data points.
+      placeholder_layer = self.create_vector_tile_placeholder(placeholder_geojson) if (self.layer_backend == "vector_tiles") and not is_shape_file(name) else placeholder_geojson
+      # Add mouse event handlers, which look up the layer's source when they're called since it's only added once it's loaded (and again after it was removed from memory).
+      if isinstance(placeholder_layer, GeoJSON):
+        placeholder_layer.on_click(lambda feature, **kwargs: self.show_layer_popup_info(name, feature))
+        placeholder_layer.on_hover(lambda feature, **kwargs: self.throttle_hover(lambda: self.show_layer_popup_info(name, feature, is_hover=True)))
+      self.map.add_layer(placeholder_layer)
+      self.placeholder_layers[name] = placeholder_layer
+    return self.placeholder_layers.get(name)
+
+  def show_layer_popup_info(self, layer_name: str, feature: "geojson.Feature", is_hover: bool = False) -> None:
+    """
+    Displays information about a loaded layer's data point in the popup.
+
+    Args:
+      layer_name (str): Name of the layer containing the data point
+      feature (geojson.Feature): Feature of the data point
+      is_hover (bool): Optional boolean that determines whether the data point was hovered over instead of clicked, default is False
+    """
+    # A hover event that's still pending would replace the popup of a clicked data point.
+    if not is_hover: self.pending_hover = None
+    source = self.layer_sources.get(layer_name)
+    if source is None: return
+    if feature["properties"].get("cluster"):
+      # Clicking a cluster zooms into its data points, and hovering over it displays a summary of them.
+      if is_hover: self.display_cluster_info(feature)
+      else: self.zoom_to_cluster(feature)
+      return
+    self.display_popup_info(
+      popup_content = source.popup_content,
+      feature = feature,
+      data_file_path = source.data_path
+    )
+
+  def create_vector_tile_placeholder(self, placeholder_geojson: "ipyleaflet.GeoJSON") -> VectorTileLayer:
+    """
+    Creates a hidden vector tile layer with the same name and styling as a placeholder GeoJSON layer.
+
+    Args:
+      placeholder_geojson (ipyleaflet.GeoJSON): Placeholder GeoJSON layer with no data
+
+    Returns:
+      ipyleaflet.VectorTileLayer: Placeholder vector tile layer, which has no tiles until its data file is added to the tile server
+    """
+    point_style = dict(placeholder_geojson.point_style or placeholder_geojson.style, fill=True)
+    return VectorTileLayer(
+      url = self.tile_server.get_tile_url(self.get_tile_source_name(placeholder_geojson.name)),
+      name = placeholder_geojson.name,
+      vector_tile_layer_styles = {tile_layer_name: point_style},
+      visible = False
+    )
+
+  def get_tile_source_name(self, layer_name: str) -> str:
+    """
+    Gets the name of a layer's dataset on the tile server.
+
+    Args:
+      layer_name (str): Name of a vector tile layer
+
+    Returns:
+      str: Name of the layer's dataset
+    """
+    return self.tile_source_prefix + "-" + layer_name
+
+  def get_popup_col_names(self, popup_content: dict, dataframe_cols: list[str]) -> list[str]:
+    """
+    Gets the names of all existing dataframe columns that are displayed in the popup.
+
+    Args:
+      popup_content (dict): Dictionary mapping labels that appear on the popup (keys) to lists containing dataframe column names or units that match the label (values)
+      dataframe_cols (list[str]): List of column names existing in the dataframe
+
+    Returns:
+      list[str]: List of column names that the popup content needs, in the order they first appear in the popup content
+    """
+    popup_col_names = []
+    for values in popup_content.values():
+      for val in values:
+        # Lists contain units or some literal text, so only strings (column names) and dictionaries (possible column names) can refer to columns.
+        possible_col_names = val.keys() if type(val) is dict else ([val] if type(val) is str else [])
+        for col_name in possible_col_names:
+          if (col_name in dataframe_cols) and (col_name not in popup_col_names): popup_col_names.append(col_name)
+    return popup_col_names
+
+  def get_feature_properties(self, feature: "geojson.Feature", data_file_path: str) -> dict:
+    """
+    Gets all properties of a GeoJSON feature's data point, including the ones that aren't displayed in the popup and therefore weren't sent to the map.
+
+    Args:
+      feature (geojson.Feature): GeoJSON feature of a data point
+      data_file_path (str): Path to the file containing the GeoJSON feature
+
+    Returns:
+      dict: Dictionary mapping all column names of the data file (keys) to the data point's values (values)
+    """
+    return self.cache.read_rows(data_file_path, [feature["id"]]).iloc[0].to_dict()
 
   def get_dataframe_col(self, possible_col_names: list[str], dataframe: "pandas.DataFrame") -> pd.DataFrame:
     """
@@ -210,17 +628,101 @@ class DataVisualizer:
     self.selected_geojson_data["path"] = data_file_path
     self.selected_geojson_data["feature"] = feature
 
-    # Create HTML for popup.
-    self.popup.location = list(reversed(feature["geometry"]["coordinates"]))
-    popup_html = self.popup.child.children[0]
-    popup_html.value = ""
-    for label, values in popup_content.items():
-      popup_html.value += "<b>{}</b> {}<br>".format(label, self.get_label_vals(values, feature["properties"]))
-    self.popup.open_popup(location=self.popup.location)
+    with self.instrumentation.callback("popup", file=os.path.basename(data_file_path)):
+      # Create HTML for popup with the data file's compiled popup content, and only assign it once so that it's sent to the browser once.
+      self.popup.location = get_feature_location(feature)
+      popup_html = self.popup.child.children[0]
+      for popup_child in self.popup.child.children[1:]: popup_child.layout.display = None
+      with self.instrumentation.span("render popup"):
+        popup_html_value = self.get_popup_template(popup_content, data_file_path).render(feature)
+      with self.instrumentation.span("send popup"):
+        popup_html.value = popup_html_value
+        self.popup.open_popup(location=self.popup.location)
+      self.instrumentation.add_bytes("popup", lambda: len(popup_html_value.encode("utf-8")))
+
+  def display_cluster_info(self, feature: "geojson.Feature") -> None:
+    """
+    Opens the popup at the location of the hovered cluster, with its number of data points and statistics.
+
+    Args:
+      feature (geojson.Feature): GeoJSON feature for the cluster that had a mouse event
+    """
+    properties = feature["properties"]
+    popup_html_value = "<b>Data points</b> {:,}<br>".format(properties["count"])
+    for label, mean in properties.items():
+      if label in ("cluster", "count", "bounds", "style"): continue
+      popup_html_value += "<b>{}</b> {}<br>".format(label, "N/A" if mean is None else "{:.2f}".format(mean))
+    with self.instrumentation.callback("cluster popup"):
+      self.popup.location = list(reversed(feature["geometry"]["coordinates"]))
+      # Clusters aren't data points, so hide the button for the details of a data point.
+      for popup_child in self.popup.child.children[1:]: popup_child.layout.display = "none"
+      self.popup.child.children[0].value = popup_html_value
+      self.popup.open_popup(location=self.popup.location)
+      self.instrumentation.add_bytes("popup", lambda: len(popup_html_value.encode("utf-8")))
+
+  def throttle_hover(self, handle_hover: "function") -> None:
+    """
+    Handles a hover event right away if the popup wasn't updated by another hover event in the last hover_interval seconds.
+    Otherwise only the latest hover event is kept, and it's handled (through schedule) once the interval has passed.
+    Hover events are throttled before the hovered data point is looked up, so hover events that are replaced by later ones don't do any work.
+
+    Args:
+      handle_hover (function): Function without arguments that updates the popup for the hover event
+    """
+    with self.hover_lock:
+      wait_time = self.last_hover_time + self.hover_interval - time.monotonic()
+      if wait_time > 0:
+        self.pending_hover = handle_hover
+        if self.hover_timer is None:
+          self.hover_timer = threading.Timer(wait_time, self.finish_hover_interval)
+          self.hover_timer.daemon = True
+          self.hover_timer.start()
+        return
+      self.last_hover_time = time.monotonic()
+      self.pending_hover = None
+    handle_hover()
+
+  def finish_hover_interval(self) -> None:
+    """
+    Handles the latest hover event that arrived while the popup couldn't be updated, once hover_interval seconds have passed.
+    """
+    with self.hover_lock:
+      handle_hover, self.pending_hover, self.hover_timer = self.pending_hover, None, None
+    if handle_hover is not None: self.loader.schedule(lambda: self.throttle_hover(handle_hover))
+
+  def zoom_to_cluster(self, feature: "geojson.Feature") -> None:
+    """
+    Zooms the map into the area containing a clicked cluster's data points, which displays smaller clusters or the data points themselves.
+    ^ The area is stored in the cluster's feature, so no data file is read.
+
+    Args:
+      feature (geojson.Feature): GeoJSON feature for the clicked cluster
+    """
+    self.popup.close_popup()
+    self.map.fit_bounds(feature["properties"]["bounds"])
+
+  def get_popup_template(self, popup_content: dict, data_file_path: str) -> PopupTemplate:
+    """
+    Gets the compiled popup content of a data file, which is only compiled the first time it's needed and after the data file changes.
+
+    Args:
+      popup_content (dict): Dictionary mapping labels that appear on the popup (keys) to lists containing dataframe column names or units that match the label (values)
+      data_file_path (str): Path to the data file
+
+    Returns:
+      PopupTemplate: Compiled popup content
+    """
+    stat = os.stat(data_file_path)
+    file_version = (stat.st_mtime_ns, stat.st_size)
+    popup_template = self.popup_templates.get(data_file_path)
+    if (popup_template is None) or (popup_template[0] is not popup_content) or (popup_template[1] != file_version):
+      file_cols = get_shape_file_columns(data_file_path) if is_shape_file(data_file_path) else self.cache.get_columns(data_file_path)
+      self.popup_templates[data_file_path] = (popup_content, file_version, PopupTemplate(popup_content, file_cols))
+    return self.popup_templates[data_file_path][2]
   
   def create_geojson(self, data_path: str, name: str, popup_content: dict, longitude_col_names: list[str], latitude_col_names: list[str]) -> None:
     """
-    Creates and displays a GeoJSON layer containing data points (at most 200 points per layer) on the map.
+    Creates and displays a GeoJSON layer containing the data points that represent the current view of the map (at most max_points_per_layer points per layer).
 
     Args:
       data_path (str): Path to the file that contains the layer's data points
@@ -229,70 +731,424 @@ class DataVisualizer:
       longitude_col_names (list[str]): Possible names of the column containing the longitude of each data point
       latitude_col_names (list[str]): Possible names of the column containing the latitude of each data point
     """
-    self.popup.close_popup()
-    for layer in self.map.layers:
-      if layer.name == name:
-        # Convert the data file into a GeoJSON.
-        dataframe = pd.read_csv(data_path)
-        # Get a random sample of 200 data points because large datasets lead to low performance and overcrowded data points.
-        max_data_points = 200
-        if len(dataframe.index) > max_data_points:
-          dataframe = dataframe.sample(max_data_points)
-        geodataframe = geopandas.GeoDataFrame(
-          dataframe,
-          geometry = geopandas.points_from_xy(
-            self.get_dataframe_col(longitude_col_names, dataframe),
-            self.get_dataframe_col(latitude_col_names, dataframe),
-            crs = "EPSG:4326"
-          )
-        )
-        geojson_str = geodataframe.to_json()
-        geojson = json.loads(geojson_str)
-        # Assign the new GeoJSON data to its corresponding layer in order to display it on the map.
-        layer.data = geojson
-        # Add mouse event handlers.
-        layer.on_click(
-          lambda feature, **kwargs: self.display_popup_info(
-            popup_content = popup_content,
-            feature = feature,
-            data_file_path = data_path
-          )
-        )
-        layer.on_hover(
-          lambda feature, **kwargs: self.display_popup_info(
-            popup_content = popup_content,
-            feature = feature,
-            data_file_path = data_path
-          )
-        )
-        # Add GeoJSON layer to map and save it.
-        self.all_layers[name] = layer
-        self.geojsons[name] = geojson
-        break
+    with self.instrumentation.callback("create layer", layer=name):
+      self.add_layer_source(name, self.load_layer_source(data_path, popup_content, longitude_col_names, latitude_col_names))
+
+  def load_layer_source(self, data_path: str, popup_content: dict, longitude_col_names: list[str], latitude_col_names: list[str], on_progress: "function" = None) -> LayerSource:
+    """
+    Reads a layer's data points and builds their level-of-detail pyramid without modifying the map, so it can run outside the thread that updates widgets.
+    Layers that any session in this process already loaded from the same version of the data file are reused instead of being read again.
+
+    Args:
+      data_path (str): Path to the file that contains the layer's data points
+      popup_content (dict): Content displayed in a popup when hovering or clicking on a data point
+      longitude_col_names (list[str]): Possible names of the column containing the longitude of each data point
+      latitude_col_names (list[str]): Possible names of the column containing the latitude of each data point
+      on_progress (function): Optional function that gets called with the fraction (between 0 and 1) of the layer that has been loaded
+        ^ raising an exception in this function stops loading the layer
+
+    Returns:
+      LayerSource: Layer's data path, popup content, popup properties, coordinates and level-of-detail pyramid, which is shared with other sessions and must not be modified
+    """
+    if on_progress is None: on_progress = lambda fraction: None
+    on_progress(0.0)
+    # Line and polygon files (e.g. reference shorelines) don't have coordinate columns, and are simplified instead of sampled.
+    if is_shape_file(data_path): return self.load_shape_source(data_path, popup_content, on_progress)
+    # Reuse the source of another session that loaded the same version of the data file with the same arguments.
+    stat = os.stat(data_path)
+    key = (os.path.abspath(data_path), stat.st_mtime_ns, stat.st_size, json.dumps(popup_content, sort_keys=True), tuple(longitude_col_names), tuple(latitude_col_names), self.map.max_zoom, self.max_points_per_source, self.cluster_points and (json.dumps(self.cluster_statistics, sort_keys=True), self.max_cluster_zoom))
+    source = get_shared_layer_source(key)
+    if source is not None:
+      on_progress(1.0)
+      return source
+    # Read all data points with coordinates from the data file, but only load the columns needed for the map and popup.
+    # ^ Reading the columns converts the data file into the columnar format the first time it's read.
+    with self.instrumentation.span("read columns"):
+      file_cols = self.cache.get_columns(data_path)
+      popup_col_names = self.get_popup_col_names(popup_content, file_cols)
+      longitude_col_name = next((col_name for col_name in longitude_col_names if col_name in file_cols), None)
+      latitude_col_name = next((col_name for col_name in latitude_col_names if col_name in file_cols), None)
+      # Statistics of clusters use the first existing column of each label, and labels without one have no statistics.
+      statistic_col_names = {label: next((col_name for col_name in possible_col_names if col_name in file_cols), None) for label, possible_col_names in self.cluster_statistics.items()} if self.cluster_points else {}
+    on_progress(0.25)
+    # Read the data file one chunk at a time, and keep a uniform random sample of its data points if there are more than fit in a layer.
+    with self.instrumentation.span("read data"):
+      scan = self.reader.scan(
+        data_path,
+        columns = popup_col_names + [col_name for col_name in statistic_col_names.values() if col_name is not None],
+        sample_size = self.max_points_per_source,
+        latitude_col_name = latitude_col_name,
+        longitude_col_name = longitude_col_name,
+        on_progress = lambda fraction: on_progress(0.25 + 0.5 * fraction)
+      )
+    dataframe = scan["data"]
+    self.instrumentation.add_rows("file", scan["total_rows"])
+    self.instrumentation.add_rows("with coordinates", scan["matched_rows"])
+    if scan["sampled"]: self.instrumentation.add_rows("sampled", len(dataframe.index))
+    longitudes, latitudes = dataframe[longitude_col_name].to_numpy(dtype=np.float64), dataframe[latitude_col_name].to_numpy(dtype=np.float64)
+    on_progress(0.75)
+    # Build a level-of-detail pyramid so that large datasets don't lead to low performance and overcrowded data points.
+    with self.instrumentation.span("build pyramid"):
+      source = LayerSource(
+        data_path = data_path,
+        popup_content = popup_content,
+        popup_properties = dataframe[popup_col_names],
+        longitudes = longitudes,
+        latitudes = latitudes,
+        pyramid = PointPyramid(latitudes, longitudes, max_zoom=self.map.max_zoom),
+        clusters = self.get_cluster_index(dataframe, latitudes, longitudes, statistic_col_names) if self.cluster_points else None
+      )
+    source = share_layer_source(key, source)
+    on_progress(1.0)
+    return source
+
+  def load_shape_source(self, data_path: str, popup_content: dict, on_progress: "function") -> LayerSource:
+    """
+    Reads a layer's line and polygon features and simplifies them for every zoom level without modifying the map, so it can run outside the thread that updates widgets.
+    Layers that any session in this process already loaded from the same version of the data file are reused instead of being read again.
+
+    Args:
+      data_path (str): Path to the GeoJSON file that contains the layer's features
+      popup_content (dict): Content displayed in a popup when hovering or clicking on a feature
+      on_progress (function): Function that gets called with the fraction (between 0 and 1) of the layer that has been loaded
+
+    Returns:
+      LayerSource: Layer's data path, popup content, popup properties and simplified features, which is shared with other sessions and must not be modified
+    """
+    key = get_shape_file_key(data_path) + (json.dumps(popup_content, sort_keys=True),)
+    source = get_shared_layer_source(key)
+    if source is not None:
+      on_progress(1.0)
+      return source
+    # Only keep the properties displayed in the popup, since the other properties of every feature would take up memory without being used.
+    with self.instrumentation.span("read data"):
+      shape_file = read_shape_file(data_path, lambda file_cols: self.get_popup_col_names(popup_content, file_cols))
+    self.instrumentation.add_rows("file", len(shape_file["geometries"]))
+    on_progress(0.5)
+    with self.instrumentation.span("build pyramid"):
+      source = LayerSource(
+        data_path = data_path,
+        popup_content = popup_content,
+        popup_properties = shape_file["properties"],
+        longitudes = np.empty(0),
+        latitudes = np.empty(0),
+        pyramid = None,
+        shapes = ShapePyramid(shape_file["geometries"])
+      )
+    source = share_layer_source(key, source)
+    on_progress(1.0)
+    return source
+
+  def get_cluster_index(self, dataframe: "pandas.DataFrame", latitudes: "numpy.ndarray", longitudes: "numpy.ndarray", statistic_col_names: dict) -> ClusterIndex:
+    """
+    Clusters a layer's data points for every zoom level.
+
+    Args:
+      dataframe (pandas.DataFrame): Dataframe with the layer's data points
+      latitudes (numpy.ndarray): Latitude of each data point
+      longitudes (numpy.ndarray): Longitude of each data point
+      statistic_col_names (dict): Dictionary mapping labels of cluster statistics (keys) to the names of their columns in the dataframe, or None for columns that the data file doesn't have (values)
+
+    Returns:
+      ClusterIndex: Clusters of the data points
+    """
+    with self.instrumentation.span("build clusters"):
+      return ClusterIndex(
+        latitudes = latitudes,
+        longitudes = longitudes,
+        statistics = {
+          label: pd.to_numeric(dataframe[col_name], errors="coerce").to_numpy(dtype=np.float64) if col_name is not None else np.full(len(dataframe.index), np.nan)
+          for label, col_name in statistic_col_names.items()
+        },
+        max_zoom = self.max_cluster_zoom
+      )
+
+  def add_layer_source(self, name: str, source: LayerSource, display: bool = True) -> None:
+    """
+    Adds a layer's loaded data points to its placeholder layer on the map.
+
+    Args:
+      name (str): Name of the layer
+      source (LayerSource): Source returned by load_layer_source
+      display (bool): Optional boolean that determines whether the layer's data points are displayed right away, default is True
+        ^ layers that aren't displayed right away can be displayed later with display_geojson
+    """
+    if display: self.popup.close_popup()
+    layer = self.get_placeholder_layer(name)
+    if layer is None: return
+    self.layer_sources[name] = source
+    self.all_layers[name] = layer
+    # Serve all data points of a vector tile layer from the tile server, and make the browser request new tiles for the layer's data.
+    if isinstance(layer, VectorTileLayer):
+      self.tile_server.add_source(self.get_tile_source_name(name), source.pyramid, source.popup_properties.index.to_numpy())
+      layer.url = self.tile_server.get_tile_url(self.get_tile_source_name(name)) + "?version={}".format(uuid.uuid4().hex[:8])
+      layer.visible = display
+    # Display the GeoJSON layer's data points for the current view.
+    elif display:
+      self.update_geojson_view(name)
+      layer.visible = True
+    # Layers that aren't displayed count towards the memory budget of hidden layers.
+    if not display:
+      self.hidden_layers[name] = None
+      self.remove_hidden_layers()
+
+  def remove_hidden_layers(self) -> None:
+    """
+    Removes the least recently hidden layers from memory until the remaining hidden layers fit in the memory budget.
+    Removed layers keep their (empty) placeholder layer on the map, and are loaded again the next time they're selected.
+    """
+    hidden_layer_bytes = {name: self.layer_sources[name].get_memory_usage() + self.get_geojson_bytes(name) for name in self.hidden_layers}
+    total_bytes = sum(hidden_layer_bytes.values())
+    while (total_bytes > self.hidden_layer_memory_budget) and (len(self.hidden_layers) > 0):
+      name, _ = self.hidden_layers.popitem(last=False)
+      total_bytes -= hidden_layer_bytes[name]
+      self.layer_sources.pop(name)
+      # Layers hidden by their visibility flag still have data in the browser.
+      if name in self.displayed_points: self.all_layers[name].data = self.geojsons[empty_geojson_name]
+      self.geojsons.pop(name, None)
+      self.geojson_bytes.pop(name, None)
+      self.displayed_points.pop(name, None)
+      if isinstance(self.all_layers[name], VectorTileLayer): self.tile_server.remove_source(self.get_tile_source_name(name))
+
+  def get_geojson_bytes(self, layer_name: str) -> int:
+    """
+    Gets the estimated size of a layer's GeoJSON, which is only measured the first time after the GeoJSON changed.
+
+    Args:
+      layer_name (str): Name of a loaded layer
+
+    Returns:
+      int: Estimated size of the layer's GeoJSON in bytes, or 0 if the layer doesn't keep any GeoJSON (e.g. vector tile layers)
+    """
+    if layer_name not in self.geojsons: return 0
+    if layer_name not in self.geojson_bytes: self.geojson_bytes[layer_name] = get_geojson_memory_usage(self.geojsons[layer_name])
+    return self.geojson_bytes[layer_name]
+
+  def get_layer_memory_usage(self) -> pd.DataFrame:
+    """
+    Gets how much memory every loaded layer takes up, e.g. for a diagnostics pane.
+
+    Returns:
+      pandas.DataFrame: One row per loaded layer with its name, whether it's hidden, the bytes taken up by its source and GeoJSON, the estimated bytes of its GeoJSON alone and the number of features in its GeoJSON, where the largest layer is first
+    """
+    memory_rows = [
+      {
+        "Layer": name,
+        "Hidden": name in self.hidden_layers,
+        "Bytes": source.get_memory_usage() + self.get_geojson_bytes(name),
+        "GeoJSON bytes": self.get_geojson_bytes(name),
+        "GeoJSON features": len(self.geojsons[name]["features"]) if name in self.geojsons else 0
+      }
+      for name, source in self.layer_sources.items()
+    ]
+    memory_usage = pd.DataFrame(memory_rows, columns=["Layer", "Hidden", "Bytes", "GeoJSON bytes", "GeoJSON features"])
+    return memory_usage.sort_values("Bytes", ascending=False, ignore_index=True)
+
+  def update_geojson_view(self, layer_name: str) -> None:
+    """
+    Displays the data points (or clusters of data points) that represent the current view of the map on a GeoJSON layer.
+    The layer's data is only replaced if the view needs different data points than the ones already displayed.
+
+    Args:
+      layer_name (str): Name of a created GeoJSON layer
+    """
+    source = self.layer_sources[layer_name]
+    if source.shapes is not None: return self.update_shape_view(layer_name)
+    points = None
+    if source.clusters is not None:
+      # Views with too many data points display clusters, where clusters with one data point are displayed as that data point.
+      with self.instrumentation.span("query clusters"):
+        points = source.clusters.query(self.map.bounds, self.map.zoom, self.max_points_per_layer)
+    if points is None:
+      with self.instrumentation.span("query pyramid"):
+        points = source.pyramid.query(self.map.bounds, self.map.zoom, self.max_points_per_layer)
+    if (layer_name in self.displayed_points) and np.array_equal(self.displayed_points[layer_name], points): return
+    self.instrumentation.add_rows("layer", len(source.longitudes))
+    self.instrumentation.add_rows("displayed", len(points))
+    # Only include the properties displayed in the popup, and use each data point's row in the data file as its feature ID to look up the rest when needed.
+    with self.instrumentation.span("build GeoJSON"):
+      cluster_ids = points[points >= source.clusters.total_points] if source.clusters is not None else points[:0]
+      data_points = points[:len(points) - len(cluster_ids)]
+      popup_properties = source.popup_properties.iloc[data_points]
+      geojson = build_point_features(
+        longitudes = source.longitudes[data_points],
+        latitudes = source.latitudes[data_points],
+        ids = popup_properties.index.tolist(),
+        properties = popup_properties
+      )
+      if len(cluster_ids) > 0:
+        clusters = source.clusters.get_clusters(cluster_ids)
+        geojson["features"] += build_cluster_features(
+          longitudes = clusters["longitudes"],
+          latitudes = clusters["latitudes"],
+          ids = ["cluster-{}".format(cluster_id) for cluster_id in cluster_ids.tolist()],
+          counts = clusters["counts"],
+          bounds = clusters["bounds"],
+          means = clusters["means"]
+        )["features"]
+    # Assign the new GeoJSON data to its corresponding layer in order to display it on the map.
+    with self.instrumentation.span("send layer data"):
+      self.all_layers[layer_name].data = geojson
+    self.instrumentation.add_bytes("layer.data", lambda: get_json_bytes(geojson))
+    self.geojsons[layer_name] = geojson
+    self.geojson_bytes.pop(layer_name, None)
+    self.displayed_points[layer_name] = points
+
+  def update_shape_view(self, layer_name: str) -> None:
+    """
+    Displays the simplified lines and polygons that represent the current view of the map on a GeoJSON layer, with at most max_vertices_per_layer vertices.
+    The layer's data is only replaced if the view needs different vertices than the ones already displayed.
+
+    Args:
+      layer_name (str): Name of a created line or polygon layer
+    """
+    source = self.layer_sources[layer_name]
+    with self.instrumentation.span("query shapes"):
+      shapes = source.shapes.query(self.map.bounds, self.map.zoom, self.max_vertices_per_layer)
+    if (layer_name in self.displayed_points) and np.array_equal(self.displayed_points[layer_name], shapes["key"]): return
+    self.instrumentation.add_rows("layer", source.shapes.total_features)
+    self.instrumentation.add_rows("displayed", len(shapes["features"]))
+    self.instrumentation.add_rows("vertices", len(shapes["longitudes"]))
+    # Use each feature's position in the data file as its feature ID, like the rows of data points.
+    with self.instrumentation.span("build GeoJSON"):
+      geojson = build_shape_features(
+        geometry_types = [source.shapes.geometry_types[feature] for feature in shapes["features"].tolist()],
+        ids = shapes["features"].tolist(),
+        properties = source.popup_properties.iloc[shapes["features"]],
+        part_features = shapes["part_features"],
+        part_groups = shapes["part_groups"],
+        part_starts = shapes["part_starts"],
+        longitudes = shapes["longitudes"],
+        latitudes = shapes["latitudes"]
+      )
+    with self.instrumentation.span("send layer data"):
+      self.all_layers[layer_name].data = geojson
+    self.instrumentation.add_bytes("layer.data", lambda: get_json_bytes(geojson))
+    self.geojsons[layer_name] = geojson
+    self.geojson_bytes.pop(layer_name, None)
+    self.displayed_points[layer_name] = shapes["key"]
+
+  def update_displayed_geojsons(self, change: dict) -> None:
+    """
+    Updates all displayed GeoJSON layers with the data points that represent the new view of the map.
+    Layers hidden by their visibility flag keep the data points of the view they were hidden in until they're displayed again.
+
+    Args:
+      change (dict): information on a change of the map's bounds after it was panned or zoomed
+    """
+    visible_layer_names = [layer_name for layer_name in self.displayed_points if self.all_layers[layer_name].visible]
+    if len(visible_layer_names) == 0: return
+    with self.instrumentation.callback("change view", zoom=self.map.zoom):
+      for layer_name in visible_layer_names:
+        self.update_geojson_view(layer_name)
   
-  def display_geojson(self, layer_name: str) -> None:
+  def display_geojson(self, layer_name: str, close_popup: bool = True) -> None:
     """
     Displays data for a GeoJSON layer on the map.
 
     Args:
       layer_name (str): Name of a layer to display data on the map
+      close_popup (bool): Optional boolean that determines whether the popup is closed, default is True
     """
-    self.popup.close_popup()
-    if layer_name in self.geojsons:
-      layer = self.all_layers[layer_name]
-      layer.data = self.geojsons[layer_name]
+    with self.instrumentation.callback("display layer", layer=layer_name):
+      if close_popup: self.popup.close_popup()
+      if layer_name in self.layer_sources:
+        self.hidden_layers.pop(layer_name, None)
+        # Data of layers hidden by their visibility flag is only sent again if the view changed since they were hidden.
+        if not isinstance(self.all_layers[layer_name], VectorTileLayer): self.update_geojson_view(layer_name)
+        self.all_layers[layer_name].visible = True
 
-  def hide_geojson(self, layer_name: str) -> None:
+  def hide_geojson(self, layer_name: str, close_popup: bool = True) -> None:
     """
     Hides data for a GeoJSON layer on the map.
+    The layer's loaded data points stay in memory until hidden layers exceed their memory budget.
 
     Args:
       layer_name (str): Name of a layer to hide data on the map
+      close_popup (bool): Optional boolean that determines whether the popup is closed, default is True
     """
-    self.popup.close_popup()
+    if close_popup: self.popup.close_popup()
     if layer_name in self.all_layers:
       layer = self.all_layers[layer_name]
-      layer.data = self.geojsons[empty_geojson_name]
+      # Only record hiding layers that display data points, since unselected layers are hidden again whenever the selected data changes.
+      # ^ Vector tile layers keep their tiles in the browser while hidden.
+      if isinstance(layer, VectorTileLayer) or (self.hide_mode == "visibility"):
+        if layer.visible:
+          with self.instrumentation.callback("hide layer", layer=layer_name):
+            layer.visible = False
+      elif layer_name in self.displayed_points:
+        with self.instrumentation.callback("hide layer", layer=layer_name):
+          layer.data = self.geojsons[empty_geojson_name]
+          self.displayed_points.pop(layer_name, None)
+          self.geojsons.pop(layer_name, None)
+          self.geojson_bytes.pop(layer_name, None)
+    if (layer_name in self.layer_sources) and (layer_name not in self.hidden_layers):
+      self.hidden_layers[layer_name] = None
+      self.remove_hidden_layers()
+
+  def set_layers_visibility(self, layer_visibility: dict) -> None:
+    """
+    Displays and hides many layers at once, e.g. when a whole data category or date range is selected or unselected.
+    The popup is only closed once, and all layer updates are combined into one message if a hold function was given.
+
+    Args:
+      layer_visibility (dict): Dictionary mapping names of layers (keys) to whether they should be displayed (values)
+    """
+    with self.instrumentation.callback("toggle layers", layers=len(layer_visibility)):
+      with self.hold():
+        self.popup.close_popup()
+        for layer_name, visible in layer_visibility.items():
+          if visible: self.display_geojson(layer_name, close_popup=False)
+          else: self.hide_geojson(layer_name, close_popup=False)
+
+  def get_nearest_tile_point(self, coordinates: list[float]) -> tuple:
+    """
+    Finds the data point closest to the given location on all visible vector tile layers.
+
+    Args:
+      coordinates (list[float]): [latitude, longitude] list of the location
+
+    Returns:
+      tuple: (layer name, data point position) tuple of the closest data point, or None if no data point is within a few pixels of the location
+    """
+    nearest_point, nearest_distance = None, vector_tile_hover_distance / (256 * 2 ** self.map.zoom)
+    for layer_name, source in self.layer_sources.items():
+      if not (isinstance(self.all_layers[layer_name], VectorTileLayer) and self.all_layers[layer_name].visible): continue
+      # Only the data points in the pyramid's cells around the location are checked.
+      nearest_in_layer = source.pyramid.get_nearest_point(coordinates[0], coordinates[1], nearest_distance)
+      if nearest_in_layer is not None:
+        nearest_point, nearest_distance = (layer_name, nearest_in_layer[0]), nearest_in_layer[1]
+    return nearest_point
+
+  def handle_map_interaction(self, **kwargs) -> None:
+    """
+    Opens the popup for the data point under the mouse when the mouse moves over or clicks on a vector tile layer's data point.
+
+    Args:
+      **kwargs: information on a mouse event on the map, including its type and coordinates
+    """
+    if kwargs.get("type") == "click": self.show_tile_point_info(kwargs["coordinates"])
+    elif kwargs.get("type") == "mousemove": self.throttle_hover(lambda: self.show_tile_point_info(kwargs["coordinates"], is_hover=True))
+
+  def show_tile_point_info(self, coordinates: list[float], is_hover: bool = False) -> None:
+    """
+    Displays information about the vector tile layers' data point closest to a location in the popup.
+
+    Args:
+      coordinates (list[float]): [latitude, longitude] list of the location
+      is_hover (bool): Optional boolean that determines whether the mouse moved over the location instead of clicking on it, default is False
+    """
+    nearest_point = self.get_nearest_tile_point(coordinates)
+    if nearest_point is None: return
+    layer_name, point = nearest_point
+    source = self.layer_sources[layer_name]
+    [feature] = build_point_features(
+      longitudes = source.longitudes[[point]],
+      latitudes = source.latitudes[[point]],
+      ids = source.popup_properties.index[[point]].tolist(),
+      properties = source.popup_properties.iloc[[point]]
+    )["features"]
+    self.show_layer_popup_info(layer_name, feature, is_hover=is_hover)
 
   def update_basemap(self, event: dict) -> None:
     """
@@ -303,6 +1159,5 @@ class DataVisualizer:
     """
     newly_selected_basemap = event.new
     for basemap_name in self.basemaps:
-      basemap_tile_layer = self.all_layers[basemap_name]
-      if basemap_tile_layer.name == newly_selected_basemap: basemap_tile_layer.visible = True
-      else: basemap_tile_layer.visible = False
\ No newline at end of file
+      basemap_tile_layer = self.get_basemap_layer(basemap_name)
+      basemap_tile_layer.visible = basemap_tile_layer.name == newly_selected_basemap
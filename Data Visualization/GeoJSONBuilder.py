@@ -0,0 +1,167 @@
+# Standard library imports
+import sys
+
+# External dependencies imports
+import numpy as np
+
+# Constants
+# Number of features whose size is measured to estimate the size of a whole GeoJSON.
+max_sampled_features = 100
+# Radius in screen pixels of a cluster with one data point, and how much it grows every time the number of data points in a cluster is multiplied by 10.
+min_cluster_radius = 8
+cluster_radius_per_decade = 4
+
+def get_json_values(values: "pandas.Series") -> list:
+  """
+  Converts a column of values into a list of built-in Python values that can be sent as JSON.
+
+  Args:
+    values (pandas.Series): Column of values
+
+  Returns:
+    list: List of values, where missing values (NaN, NaT, etc.) are None
+  """
+  if values.isna().any():
+    return values.astype(object).where(values.notna(), None).tolist()
+  return values.tolist()
+
+def build_point_features(longitudes: "numpy.ndarray", latitudes: "numpy.ndarray", ids: list, properties: "pandas.DataFrame") -> dict:
+  """
+  Builds a GeoJSON FeatureCollection of points directly as a dictionary, without serializing it into a JSON string and parsing it again.
+
+  Args:
+    longitudes (numpy.ndarray): Longitude of each point
+    latitudes (numpy.ndarray): Latitude of each point
+    ids (list): ID of each point's feature, which can be used to look up more information about the point later
+    properties (pandas.DataFrame): Dataframe with one row of properties for each point, where column names are property names
+
+  Returns:
+    dict: GeoJSON FeatureCollection with one Point feature for each point
+  """
+  coordinates = np.column_stack((np.asarray(longitudes, dtype=np.float64), np.asarray(latitudes, dtype=np.float64))).tolist()
+  prop_names = list(properties.columns)
+  # Convert whole columns at once instead of converting values feature by feature.
+  prop_rows = zip(*[get_json_values(properties[prop_name]) for prop_name in prop_names]) if len(prop_names) > 0 else [()] * len(coordinates)
+  features = [
+    {
+      "type": "Feature",
+      "id": feature_id,
+      "geometry": {"type": "Point", "coordinates": point_coordinates},
+      "properties": dict(zip(prop_names, prop_values))
+    }
+    for feature_id, point_coordinates, prop_values in zip(ids, coordinates, prop_rows)
+  ]
+  return {"type": "FeatureCollection", "features": features}
+
+def build_cluster_features(longitudes: "numpy.ndarray", latitudes: "numpy.ndarray", ids: list, counts: "numpy.ndarray", bounds: tuple, means: dict) -> dict:
+  """
+  Builds a GeoJSON FeatureCollection of clusters of points, whose markers are larger for clusters with more points.
+
+  Args:
+    longitudes (numpy.ndarray): Longitude of each cluster
+    latitudes (numpy.ndarray): Latitude of each cluster
+    ids (list): ID of each cluster's feature
+    counts (numpy.ndarray): Number of points in each cluster
+    bounds (tuple): (south, west, north, east) tuple of arrays with the corners of the area containing each cluster's points
+    means (dict): Dictionary mapping labels (keys) to the mean of a statistic over each cluster's points (values), where NaN means that none of the points has a value
+
+  Returns:
+    dict: GeoJSON FeatureCollection with one Point feature for each cluster, whose properties have the cluster's number of points ("count"), bounds ([[south, west], [north, east]]), statistics (by label) and marker style
+  """
+  coordinates = np.column_stack((np.asarray(longitudes, dtype=np.float64), np.asarray(latitudes, dtype=np.float64))).tolist()
+  radii = (min_cluster_radius + cluster_radius_per_decade * np.log10(np.maximum(counts, 1))).round(1).tolist()
+  cluster_bounds = np.column_stack(bounds).tolist()
+  labels = list(means.keys())
+  mean_rows = zip(*[np.where(np.isnan(label_means), None, np.round(label_means, 3)).tolist() for label_means in means.values()]) if len(labels) > 0 else [()] * len(coordinates)
+  features = [
+    {
+      "type": "Feature",
+      "id": feature_id,
+      "geometry": {"type": "Point", "coordinates": point_coordinates},
+      "properties": dict(
+        zip(labels, mean_values),
+        cluster = True, count = count, bounds = [[south, west], [north, east]], style = {"radius": radius}
+      )
+    }
+    for feature_id, point_coordinates, count, (south, west, north, east), radius, mean_values in zip(ids, coordinates, np.asarray(counts).tolist(), cluster_bounds, radii, mean_rows)
+  ]
+  return {"type": "FeatureCollection", "features": features}
+
+def build_shape_features(geometry_types: list[str], ids: list, properties: "pandas.DataFrame", part_features: "numpy.ndarray", part_groups: "numpy.ndarray", part_starts: "numpy.ndarray", longitudes: "numpy.ndarray", latitudes: "numpy.ndarray") -> dict:
+  """
+  Builds a GeoJSON FeatureCollection of lines and polygons from the parts (lines and rings) of their geometries.
+
+  Args:
+    geometry_types (list[str]): Geometry type of each feature ("LineString", "MultiLineString", "Polygon" or "MultiPolygon")
+    ids (list): ID of each feature, which can be used to look up more information about the feature later
+    properties (pandas.DataFrame): Dataframe with one row of properties for each feature, where column names are property names
+    part_features (numpy.ndarray): Position of each part's feature in ids, where the parts of a feature are next to each other
+    part_groups (numpy.ndarray): Position of each part's line or polygon in its feature's geometry, where rings of the same polygon have the same group
+    part_starts (numpy.ndarray): Position of each part's first vertex, followed by the total number of vertices
+    longitudes (numpy.ndarray): Longitude of each vertex
+    latitudes (numpy.ndarray): Latitude of each vertex
+
+  Returns:
+    dict: GeoJSON FeatureCollection with one feature for each feature with parts, where lines that were split into several parts become MultiLineStrings
+  """
+  coordinates = np.column_stack((np.asarray(longitudes, dtype=np.float64), np.asarray(latitudes, dtype=np.float64))).tolist()
+  # Group the parts of every feature by their line or polygon.
+  feature_groups = [[] for _ in ids]
+  for feature_idx, group, start, end in zip(np.asarray(part_features).tolist(), np.asarray(part_groups).tolist(), part_starts[:-1].tolist(), part_starts[1:].tolist()):
+    groups = feature_groups[feature_idx]
+    if (len(groups) == 0) or (groups[-1][0] != group): groups.append((group, []))
+    groups[-1][1].append(coordinates[start:end])
+  prop_names = list(properties.columns)
+  prop_rows = zip(*[get_json_values(properties[prop_name]) for prop_name in prop_names]) if len(prop_names) > 0 else [()] * len(ids)
+  features = []
+  for feature_id, geometry_type, groups, prop_values in zip(ids, geometry_types, feature_groups, prop_rows):
+    if len(groups) == 0: continue
+    if geometry_type in ("Polygon", "MultiPolygon"):
+      polygons = [rings for _, rings in groups]
+      geometry = {"type": "Polygon", "coordinates": polygons[0]} if len(polygons) == 1 else {"type": "MultiPolygon", "coordinates": polygons}
+    else:
+      lines = [line for _, group_lines in groups for line in group_lines]
+      geometry = {"type": "LineString", "coordinates": lines[0]} if len(lines) == 1 else {"type": "MultiLineString", "coordinates": lines}
+    features.append({"type": "Feature", "id": feature_id, "geometry": geometry, "properties": dict(zip(prop_names, prop_values))})
+  return {"type": "FeatureCollection", "features": features}
+
+def get_geojson_memory_usage(geojson: dict) -> int:
+  """
+  Estimates the number of bytes that a GeoJSON FeatureCollection's Python objects take up in memory.
+  Only up to max_sampled_features evenly spaced features are measured, since measuring every object of every feature takes about as long as building them.
+
+  Args:
+    geojson (dict): GeoJSON FeatureCollection, e.g. from build_point_features
+
+  Returns:
+    int: Estimated size of the FeatureCollection, its features and everything they contain in bytes
+  """
+  features = geojson["features"]
+  sampled_features = features[::max(1, len(features) // max_sampled_features)]
+  # Measure every nested dictionary, list and value of the sampled features once.
+  sampled_bytes, measured_ids, objects = 0, set(), list(sampled_features)
+  while len(objects) > 0:
+    value = objects.pop()
+    if id(value) in measured_ids: continue
+    measured_ids.add(id(value))
+    sampled_bytes += sys.getsizeof(value)
+    if isinstance(value, dict): objects.extend(value.values())
+    elif isinstance(value, list): objects.extend(value)
+  feature_bytes = sampled_bytes * len(features) / len(sampled_features) if len(sampled_features) > 0 else 0
+  return sys.getsizeof(geojson) + sys.getsizeof(features) + int(feature_bytes)
+
+def get_feature_location(feature: "geojson.Feature") -> list[float]:
+  """
+  Gets the location that a popup about a GeoJSON feature points to.
+
+  Args:
+    feature (geojson.Feature): GeoJSON feature of a point, line or polygon
+
+  Returns:
+    list[float]: [latitude, longitude] list of the point, or of the middle vertex of the feature's first line or ring
+  """
+  coordinates = feature["geometry"]["coordinates"]
+  # Lines and polygons nest lists of coordinates, so find the first line or ring and its middle vertex.
+  while isinstance(coordinates[0], list):
+    coordinates = coordinates[0] if isinstance(coordinates[0][0], list) else coordinates[len(coordinates) // 2]
+  return [coordinates[1], coordinates[0]]
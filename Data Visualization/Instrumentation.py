@@ -0,0 +1,233 @@
+# Standard library imports
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+
+# Constants
+default_max_records = 1000
+default_logger_name = "DataVisualizer.instrumentation"
+
+def get_json_bytes(data: any) -> int:
+  """
+  Gets the number of bytes that some data takes up as JSON, e.g. GeoJSON data assigned to a layer.
+
+  Args:
+    data (any): JSON-serializable data
+
+  Returns:
+    int: Size of the data's JSON in bytes
+  """
+  return len(json.dumps(data, default=str).encode("utf-8"))
+
+def get_column_data_bytes(data: dict) -> int:
+  """
+  Gets the number of bytes that the columns of a Bokeh ColumnDataSource take up when they're sent to the browser.
+  ^ Bokeh sends numeric and datetime columns as binary arrays, and other columns as JSON lists.
+
+  Args:
+    data (dict): Dictionary mapping column names (keys) to column values (values)
+
+  Returns:
+    int: Size of the columns in bytes
+  """
+  total_bytes = 0
+  for values in data.values():
+    values = np.asarray(values)
+    if values.dtype.kind in "biufM": total_bytes += values.nbytes
+    else: total_bytes += get_json_bytes(values.tolist())
+  return total_bytes
+
+class Instrumentation:
+  def __init__(self, enabled: bool = True, max_records: int = default_max_records, logger_name: str = default_logger_name) -> None:
+    """
+    Creates a new instance of the Instrumentation class, which records how long each stage of a map or plot callback takes, how many bytes it sends to the browser and how many rows it handles.
+    Every finished callback is kept as a record, logged as one line of JSON and sent to all record callbacks (e.g. to update a diagnostics pane).
+
+    Args:
+      enabled (bool): Optional boolean that determines whether anything is recorded, default is True
+        ^ disabled instrumentation skips all measurements, so it doesn't slow callbacks down
+      max_records (int): Optional maximum number of recent records that are kept, default is 1000
+      logger_name (str): Optional name of the logger that records are logged to, default is "DataVisualizer.instrumentation"
+    """
+    # enabled = whether callbacks are recorded
+    self.enabled = enabled
+
+    # records = list of recently finished records, where the oldest record is first
+    # ^ e.g. {
+    #   "callback": "create layer", "attributes": {"layer": "ew16_july_kayak.txt"},
+    #   "started": 1700000000.0, "seconds": 0.12, "thread": "MainThread", "error": None,
+    #   "spans": [{"stage": "read data", "offset": 0.01, "seconds": 0.08, "depth": 0}, ...],
+    #   "bytes": {"layer.data": 34306}, "rows": {"file": 3865, "displayed": 200}
+    # }
+    self.records = deque(maxlen=max_records)
+
+    # record_callbacks = list of functions that get called with every finished record
+    # ^ they're called on the thread that ran the callback, which might be a background loading thread
+    self.record_callbacks = []
+
+    # logger = logger that every finished record is logged to as one line of JSON
+    self.logger = logging.getLogger(logger_name)
+
+    # lock = lock protecting the records, which are added by background threads too
+    self.lock = threading.Lock()
+
+    # active = thread-local stack of unfinished records and spans, since callbacks run in the main thread and in background loading threads
+    self.active = threading.local()
+
+  def get_active_record(self) -> dict:
+    """
+    Gets the record of the callback that is running in the current thread.
+
+    Returns:
+      dict: Unfinished record, or None if no callback is running in the current thread
+    """
+    return getattr(self.active, "record", None)
+
+  @contextmanager
+  def callback(self, name: str, **attributes) -> None:
+    """
+    Records a callback while the returned context is open.
+    Callbacks that are run inside another callback (e.g. creating a layer while filtering data) are recorded as a span of the outer callback.
+
+    Args:
+      name (str): Name of the callback, e.g. "create layer"
+      **attributes: Details about the callback that are saved in its record, e.g. the layer name
+    """
+    if not self.enabled:
+      yield
+      return
+    if self.get_active_record() is not None:
+      with self.span(name): yield
+      return
+    record = {
+      "callback": name, "attributes": attributes,
+      "started": time.time(), "seconds": None, "thread": threading.current_thread().name, "error": None,
+      "spans": [], "bytes": {}, "rows": {}
+    }
+    self.active.record, self.active.depth = record, 0
+    start_time = time.perf_counter()
+    self.active.start_time = start_time
+    try:
+      yield
+    except Exception as exception:
+      record["error"] = repr(exception)
+      raise
+    finally:
+      record["seconds"] = time.perf_counter() - start_time
+      self.active.record = None
+      self.finish_record(record)
+
+  @contextmanager
+  def span(self, stage: str) -> None:
+    """
+    Records a stage of the running callback while the returned context is open.
+
+    Args:
+      stage (str): Name of the stage, e.g. "read data"
+    """
+    record = self.get_active_record() if self.enabled else None
+    if record is None:
+      yield
+      return
+    span = {"stage": stage, "offset": time.perf_counter() - self.active.start_time, "seconds": None, "depth": self.active.depth}
+    record["spans"].append(span)
+    self.active.depth += 1
+    start_time = time.perf_counter()
+    try:
+      yield
+    finally:
+      span["seconds"] = time.perf_counter() - start_time
+      self.active.depth -= 1
+
+  def add_bytes(self, target: str, measure_bytes: "function") -> None:
+    """
+    Adds the number of bytes sent to the browser to the running callback's record.
+
+    Args:
+      target (str): Name of what the bytes were sent to, e.g. "layer.data"
+      measure_bytes (function): Function that returns the number of bytes, which is only called if the callback is recorded
+    """
+    record = self.get_active_record() if self.enabled else None
+    if record is not None: record["bytes"][target] = record["bytes"].get(target, 0) + measure_bytes()
+
+  def add_rows(self, stage: str, total_rows: int) -> None:
+    """
+    Adds a number of rows (e.g. before or after sampling) to the running callback's record.
+
+    Args:
+      stage (str): Name of the stage that the rows were counted at, e.g. "file" or "displayed"
+      total_rows (int): Number of rows
+    """
+    record = self.get_active_record() if self.enabled else None
+    if record is not None: record["rows"][stage] = record["rows"].get(stage, 0) + int(total_rows)
+
+  def on_record(self, callback: "function") -> None:
+    """
+    Adds a function that gets called with every finished record.
+
+    Args:
+      callback (function): Function that receives a record
+    """
+    self.record_callbacks.append(callback)
+
+  def finish_record(self, record: dict) -> None:
+    """
+    Keeps, logs and sends a finished record to all record callbacks.
+
+    Args:
+      record (dict): Finished record
+    """
+    with self.lock: self.records.append(record)
+    if self.logger.isEnabledFor(logging.INFO): self.logger.info(json.dumps(record, default=str))
+    for callback in self.record_callbacks: callback(record)
+
+  def get_logs(self) -> str:
+    """
+    Gets all kept records as structured logs, with one JSON record per line.
+
+    Returns:
+      str: Logs of all kept records, where the oldest record is first
+    """
+    with self.lock: records = list(self.records)
+    return "".join(json.dumps(record, default=str) + "\n" for record in records)
+
+  def export_logs(self, file_path: str) -> None:
+    """
+    Writes all kept records to a file as structured logs, with one JSON record per line.
+
+    Args:
+      file_path (str): Path to the log file, which is overwritten
+    """
+    with open(file_path, "w") as log_file: log_file.write(self.get_logs())
+
+  def get_summary(self, max_rows: int = 50) -> pd.DataFrame:
+    """
+    Gets a summary of the most recent records, e.g. for a diagnostics pane.
+
+    Args:
+      max_rows (int): Optional maximum number of records in the summary, default is 50
+
+    Returns:
+      pandas.DataFrame: One row per record with its callback, duration, slowest stages, bytes and rows, where the most recent record is first
+    """
+    with self.lock: records = list(self.records)[-max_rows:]
+    summary_rows = []
+    for record in reversed(records):
+      slowest_spans = sorted(record["spans"], key=lambda span: span["seconds"] or 0, reverse=True)[:3]
+      summary_rows.append({
+        "Time": time.strftime("%H:%M:%S", time.localtime(record["started"])),
+        "Callback": record["callback"] + "".join(" ({})".format(value) for value in record["attributes"].values()),
+        "Total (ms)": round(record["seconds"] * 1000, 1),
+        "Slowest stages (ms)": ", ".join("{} {:.1f}".format(span["stage"], span["seconds"] * 1000) for span in slowest_spans),
+        "Bytes": sum(record["bytes"].values()),
+        "Rows": ", ".join("{} {}".format(stage, total_rows) for stage, total_rows in record["rows"].items()),
+        "Error": record["error"] or ""
+      })
+    return pd.DataFrame(summary_rows, columns=["Time", "Callback", "Total (ms)", "Slowest stages (ms)", "Bytes", "Rows", "Error"])
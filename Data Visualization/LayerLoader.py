@@ -0,0 +1,287 @@
+# Standard library imports
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Constants
+default_max_workers = 2
+default_coalesce_delay = 0.25
+# Name of the data point details in the progress of all loads.
+details_load_name = "Data point details"
+
+class LoadCancelled(Exception):
+  """
+  Exception raised inside a background load when its result is no longer needed.
+  """
+  pass
+
+class LayerLoader:
+  def __init__(self, visualizer: "DataVisualizer", schedule: "function" = None, max_workers: int = default_max_workers, coalesce_delay: float = default_coalesce_delay) -> None:
+    """
+    Creates a new instance of the LayerLoader class, which reads data files and queries the data directory in background threads so that selecting layers, data points or filters never blocks the app.
+    Only reading data happens in background threads, while widgets and plots are updated by functions passed to schedule.
+    The background threads keep running until shutdown is called (e.g. when the app's session is destroyed).
+
+    Args:
+      visualizer (DataVisualizer): Visualizer whose layers and plots are loaded
+      schedule (function): Optional function that gets called with a function that updates widgets or plots, and calls it on the thread that owns them
+        ^ e.g. Panel apps should pass a function that calls pn.state.curdoc.add_next_tick_callback
+        ^ default is None for calling the function right away (e.g. in a notebook)
+      max_workers (int): Optional maximum number of layers that are loaded at the same time, default is 2
+      coalesce_delay (float): Optional number of seconds to wait for more layer requests before loading starts, default is 0.25 seconds
+        ^ dragging a slider fires many requests, and only the layers of the last one should be loaded
+    """
+    # visualizer = DataVisualizer whose layers and plots are loaded
+    self.visualizer = visualizer
+
+    # schedule = function that calls a function updating widgets or plots on the thread that owns them
+    self.schedule = schedule if schedule is not None else (lambda callback: callback())
+
+    # executor = background threads that load layers
+    self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="LayerLoader")
+    # details_executor = background thread that loads data point details, so that they don't wait for layers to load
+    self.details_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DetailsLoader")
+    # query_executor = background thread that runs queries of the data directory (e.g. finding data in a date range), so that they don't wait for layers to load either
+    self.query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="QueryLoader")
+
+    # coalesce_delay = number of seconds to wait for more layer requests before loading starts
+    self.coalesce_delay = coalesce_delay
+    # request_timer = timer that starts loading the requested layers once no more requests come in
+    self.request_timer = None
+
+    # lock = lock protecting the requested layers, loads and progress, which are changed by background threads too
+    self.lock = threading.RLock()
+
+    # requested_layers = {name1: args1, name2: args2, ...} dictionary mapping layers that should be displayed once loaded to the arguments of DataVisualizer.load_layer_source
+    self.requested_layers = {}
+
+    # prefetched_layers = {name1: args1, name2: args2, ...} dictionary mapping layers that are loaded ahead of time (without being displayed) to the arguments of DataVisualizer.load_layer_source
+    self.prefetched_layers = {}
+
+    # loading_layers = {name1: future1, name2: future2, ...} dictionary to store the future of every layer that is queued or being loaded
+    self.loading_layers = {}
+
+    # progress = {name1: fraction1, name2: fraction2, ...} dictionary mapping everything that is being loaded to the fraction (between 0 and 1) that has been loaded
+    self.progress = {}
+
+    # failed_loads = {name1: exception1, name2: exception2, ...} dictionary to store the exceptions of loads that failed
+    self.failed_loads = {}
+
+    # progress_callbacks = list of functions that get called with the progress whenever it changes
+    self.progress_callbacks = []
+
+    # details_generation = number of data point details that were requested, so that details of previously selected data points are never drawn
+    self.details_generation = 0
+
+    # query_generations = {name1: generation1, name2: generation2, ...} dictionary with the number of times each query was run, so that results of previous runs are never applied
+    self.query_generations = {}
+
+  def on_progress_change(self, callback: "function") -> None:
+    """
+    Adds a function that gets called (on the thread that owns the widgets) with a copy of the progress whenever it changes.
+
+    Args:
+      callback (function): Function that receives a dictionary mapping everything that is being loaded to the fraction (between 0 and 1) that has been loaded
+    """
+    self.progress_callbacks.append(callback)
+
+  def report_progress(self) -> None:
+    """
+    Sends the current progress to all progress callbacks.
+    """
+    with self.lock: progress = dict(self.progress)
+    def notify():
+      for callback in self.progress_callbacks: callback(progress)
+    if len(self.progress_callbacks) > 0: self.schedule(notify)
+
+  def is_needed(self, name: str) -> bool:
+    """
+    Checks whether a layer is still requested or prefetched.
+
+    Args:
+      name (str): Name of the layer
+
+    Returns:
+      bool: True if the layer's data is still needed, False otherwise
+    """
+    return (name in self.requested_layers) or (name in self.prefetched_layers)
+
+  def request_layers(self, layers: dict, prefetch_layers: dict = {}) -> None:
+    """
+    Loads layers in the background and displays each of them once it's loaded.
+    Layers from a previous request that aren't in this request anymore stop loading, unless they're already loaded.
+
+    Args:
+      layers (dict): Dictionary mapping names of layers that should be displayed (keys) to the arguments of DataVisualizer.load_layer_source (values)
+        ^ e.g. {"ew16_july_kayak.txt": {"data_path": "...", "popup_content": {...}, "longitude_col_names": [...], "latitude_col_names": [...]}}
+      prefetch_layers (dict): Optional dictionary with layers that are likely needed next (e.g. for an adjacent date range), in the same format as layers
+        ^ prefetched layers are loaded after the requested layers and aren't displayed
+    """
+    with self.lock:
+      self.requested_layers = dict(layers)
+      self.prefetched_layers = {name: args for name, args in prefetch_layers.items() if name not in layers}
+      # Drop queued loads that aren't needed anymore, while loads that already started stop at their next progress report.
+      for name, future in list(self.loading_layers.items()):
+        if (not self.is_needed(name)) and future.cancel():
+          self.loading_layers.pop(name, None)
+          self.progress.pop(name, None)
+      # Wait for more requests before loading, and only load the layers of the last request.
+      if self.request_timer is not None: self.request_timer.cancel()
+      self.request_timer = threading.Timer(self.coalesce_delay, self.start_loads)
+      self.request_timer.daemon = True
+      self.request_timer.start()
+    self.report_progress()
+
+  def start_loads(self) -> None:
+    """
+    Starts loading all requested and prefetched layers that aren't loaded or being loaded yet, starting with the requested ones.
+    """
+    with self.lock:
+      for layers in (self.requested_layers, self.prefetched_layers):
+        for name, args in layers.items():
+          if (name in self.loading_layers) or (name in self.visualizer.layer_sources): continue
+          self.failed_loads.pop(name, None)
+          self.progress[name] = 0.0
+          future = self.executor.submit(self.load_layer, name, args)
+          self.loading_layers[name] = future
+          future.add_done_callback(lambda future, name=name: self.finish_layer_load(name, future))
+    self.report_progress()
+
+  def load_layer(self, name: str, args: dict) -> dict:
+    """
+    Loads a layer's data points in a background thread.
+
+    Args:
+      name (str): Name of the layer
+      args (dict): Arguments of DataVisualizer.load_layer_source
+
+    Returns:
+      dict: Dictionary returned by DataVisualizer.load_layer_source
+    """
+    def on_progress(fraction: float) -> None:
+      if not self.is_needed(name): raise LoadCancelled(name)
+      with self.lock:
+        if name in self.loading_layers: self.progress[name] = fraction
+      self.report_progress()
+    # Loads that stop because they're not needed anymore are recorded with a LoadCancelled error.
+    with self.visualizer.instrumentation.callback("load layer", layer=name):
+      return self.visualizer.load_layer_source(on_progress=on_progress, **args)
+
+  def finish_layer_load(self, name: str, future: "concurrent.futures.Future") -> None:
+    """
+    Adds a loaded layer to the map on the thread that owns the map, and displays it if it's still requested.
+
+    Args:
+      name (str): Name of the layer
+      future (concurrent.futures.Future): Future of the layer's load
+    """
+    with self.lock:
+      if self.loading_layers.get(name) is future: self.loading_layers.pop(name)
+      self.progress.pop(name, None)
+    self.report_progress()
+    if future.cancelled() or isinstance(future.exception(), LoadCancelled):
+      # Load the layer again if it was requested again after it stopped loading.
+      if self.is_needed(name): self.start_loads()
+      return
+    if future.exception() is not None:
+      with self.lock: self.failed_loads[name] = future.exception()
+      self.report_progress()
+      return
+    source = future.result()
+    def add_layer():
+      if name in self.visualizer.layer_sources: return
+      # Keep layers that were deselected while loading, so that selecting them again doesn't load them again.
+      with self.visualizer.instrumentation.callback("add layer", layer=name):
+        self.visualizer.add_layer_source(name, source, display=name in self.requested_layers)
+    self.schedule(add_layer)
+
+  def load_data_point_details(self, details_args: dict, on_loaded: "function" = None) -> None:
+    """
+    Loads the plots of a data point's details in the background, and draws them once they're loaded unless another data point's details were requested since.
+
+    Args:
+      details_args (dict): Arguments of DataPlotter.load_data_point_details
+      on_loaded (function): Optional function that gets called (on the thread that owns the plots) after the plots are drawn
+    """
+    with self.lock:
+      self.details_generation += 1
+      generation = self.details_generation
+      self.failed_loads.pop(details_load_name, None)
+      self.progress[details_load_name] = 0.0
+    self.report_progress()
+    plotter = self.visualizer.get_plotter()
+    future = self.details_executor.submit(plotter.load_data_point_details, **details_args)
+    future.add_done_callback(lambda future: self.finish_details_load(generation, future, on_loaded))
+
+  def finish_details_load(self, generation: int, future: "concurrent.futures.Future", on_loaded: "function") -> None:
+    """
+    Draws loaded data point details on the thread that owns the plots.
+
+    Args:
+      generation (int): Number of the data point details request
+      future (concurrent.futures.Future): Future of the data point details' load
+      on_loaded (function): Function that gets called after the plots are drawn, or None
+    """
+    with self.lock:
+      # Details of previously selected data points are outdated.
+      if generation != self.details_generation: return
+      self.progress.pop(details_load_name, None)
+      # Loads that were cancelled (e.g. by shutdown) didn't fail and have nothing to draw.
+      if (not future.cancelled()) and (future.exception() is not None): self.failed_loads[details_load_name] = future.exception()
+    self.report_progress()
+    if future.cancelled() or (future.exception() is not None): return
+    details = future.result()
+    def draw_details():
+      if generation != self.details_generation: return
+      self.visualizer.get_plotter().draw_data_point_details(details)
+      if on_loaded is not None: on_loaded()
+    self.schedule(draw_details)
+
+  def run_query(self, name: str, query: "function", on_loaded: "function") -> None:
+    """
+    Runs a query in the background, and applies its result once it's done unless the same query was run again since.
+
+    Args:
+      name (str): Name of the query, which is shown in the progress while it runs
+      query (function): Function without arguments that returns the query's result, which must not modify any widgets
+      on_loaded (function): Function that gets called (on the thread that owns the widgets) with the query's result
+    """
+    with self.lock:
+      generation = self.query_generations.get(name, 0) + 1
+      self.query_generations[name] = generation
+      self.failed_loads.pop(name, None)
+      self.progress[name] = 0.0
+    self.report_progress()
+    future = self.query_executor.submit(query)
+    future.add_done_callback(lambda future: self.finish_query(name, generation, future, on_loaded))
+
+  def finish_query(self, name: str, generation: int, future: "concurrent.futures.Future", on_loaded: "function") -> None:
+    """
+    Applies a query's result on the thread that owns the widgets.
+
+    Args:
+      name (str): Name of the query
+      generation (int): Number of the query's run
+      future (concurrent.futures.Future): Future of the query's run
+      on_loaded (function): Function that gets called with the query's result
+    """
+    with self.lock:
+      # Results of previous runs of the query are outdated.
+      if generation != self.query_generations.get(name): return
+      self.progress.pop(name, None)
+      if (not future.cancelled()) and (future.exception() is not None): self.failed_loads[name] = future.exception()
+    self.report_progress()
+    if future.cancelled() or (future.exception() is not None): return
+    result = future.result()
+    def apply_result():
+      if generation == self.query_generations.get(name): on_loaded(result)
+    self.schedule(apply_result)
+
+  def shutdown(self) -> None:
+    """
+    Stops loading anything and stops the background threads once their current loads are done, which should be called when the loader isn't needed anymore (e.g. the app's session was destroyed).
+    """
+    with self.lock:
+      if self.request_timer is not None: self.request_timer.cancel()
+      self.requested_layers, self.prefetched_layers = {}, {}
+    for executor in (self.executor, self.details_executor, self.query_executor):
+      executor.shutdown(wait=False, cancel_futures=True)
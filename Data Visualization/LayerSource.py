@@ -0,0 +1,77 @@
+# External dependencies imports
+import numpy as np
+import pandas as pd
+
+# Constants
+# Text columns with at most this fraction of unique values are stored as categories, which keeps each unique value once instead of once per data point.
+max_category_fraction = 0.5
+
+def get_compact_properties(properties: "pandas.DataFrame") -> pd.DataFrame:
+  """
+  Converts text columns with many repeated values (e.g. survey dates) into categorical columns, which take up much less memory than a Python string per data point.
+
+  Args:
+    properties (pandas.DataFrame): Dataframe with one row of properties for each data point
+
+  Returns:
+    pandas.DataFrame: Dataframe with the same values and index, where repetitive text columns are categorical
+  """
+  compact_cols = {}
+  for col in properties.columns:
+    values = properties[col]
+    if (values.dtype == object) and (values.nunique(dropna=True) <= max_category_fraction * len(values.index)):
+      values = values.astype("category")
+    compact_cols[col] = values
+  return pd.DataFrame(compact_cols, index=properties.index, columns=properties.columns)
+
+class LayerSource:
+  # Sources are records with a fixed set of attributes, and can be weakly referenced so that a process-wide dictionary of sources doesn't keep them in memory.
+  __slots__ = ("data_path", "popup_content", "popup_properties", "longitudes", "latitudes", "pyramid", "clusters", "shapes", "__weakref__")
+
+  def __init__(self, data_path: str, popup_content: dict, popup_properties: "pandas.DataFrame", longitudes: "numpy.ndarray", latitudes: "numpy.ndarray", pyramid: "PointPyramid", clusters: "ClusterIndex" = None, shapes: "ShapePyramid" = None) -> None:
+    """
+    Creates a new instance of the LayerSource class, which stores all data points of a layer as compact arrays, so that GeoJSON only needs to be built for the data points that are displayed.
+    Sources can be shared between sessions, so they must never be modified after they're created.
+
+    Args:
+      data_path (str): Path to the file that contains the layer's data points
+      popup_content (dict): Content displayed in a popup when hovering or clicking on a data point
+      popup_properties (pandas.DataFrame): Dataframe with the properties displayed in the popup of each data point, whose index is each data point's row in the data file
+      longitudes (numpy.ndarray): Longitude of each data point, which is empty for line and polygon layers
+      latitudes (numpy.ndarray): Latitude of each data point, which is empty for line and polygon layers
+      pyramid (PointPyramid): Level-of-detail pyramid over all data points, or None for line and polygon layers
+      clusters (ClusterIndex): Optional clusters of all data points for every zoom level, default is None for a layer that isn't clustered
+      shapes (ShapePyramid): Optional simplified lines and polygons of a GeoJSON file, default is None for a layer of data points
+        ^ popup properties of line and polygon layers have one row per feature, whose index is each feature's position in the GeoJSON file
+    """
+    # data_path = path to the file that contains the layer's data points
+    self.data_path = data_path
+
+    # popup_content = content displayed in a popup when hovering or clicking on a data point
+    self.popup_content = popup_content
+
+    # popup_properties = dataframe with the popup properties of each data point, where repetitive text columns are categorical
+    self.popup_properties = get_compact_properties(popup_properties)
+
+    # longitudes, latitudes = float64 coordinates of each data point
+    self.longitudes = np.asarray(longitudes, dtype=np.float64)
+    self.latitudes = np.asarray(latitudes, dtype=np.float64)
+
+    # pyramid = level-of-detail pyramid that finds the data points representing a view of the map, or None for line and polygon layers
+    self.pyramid = pyramid
+
+    # clusters = clusters of the data points for every zoom level, which represent views with too many data points to display, or None if the layer isn't clustered
+    self.clusters = clusters
+
+    # shapes = simplified lines and polygons that find the vertices representing a view of the map, or None for layers of data points
+    self.shapes = shapes
+
+  def get_memory_usage(self) -> int:
+    """
+    Gets the number of bytes that the layer's data points take up in memory.
+
+    Returns:
+      int: Size of the coordinates, popup properties (including their text), pyramid, clusters and simplified lines and polygons in bytes
+    """
+    index_bytes = sum(index.get_memory_usage() for index in (self.pyramid, self.clusters, self.shapes) if index is not None)
+    return self.longitudes.nbytes + self.latitudes.nbytes + int(self.popup_properties.memory_usage(index=True, deep=True).sum()) + index_bytes
@@ -0,0 +1,288 @@
+# Standard library imports
+import math
+
+# External dependencies imports
+import numpy as np
+
+# Constants
+max_mercator_latitude = 85.0511287798
+tile_size = 256
+default_cell_size = 8
+# Seed for ranking data points, which is fixed so that the same view always shows the same data points.
+priority_seed = 0
+# Number of cells per side of the grid that a box is divided into to look up its data points, where larger grids look up fewer data points outside the box but take more lookups.
+box_cells_per_side = 16
+
+def to_mercator(latitudes: "numpy.ndarray", longitudes: "numpy.ndarray") -> tuple:
+  """
+  Converts latitudes and longitudes into Web Mercator coordinates, which is the projection used by the map's tiles.
+
+  Args:
+    latitudes (numpy.ndarray): Latitudes in degrees
+    longitudes (numpy.ndarray): Longitudes in degrees
+
+  Returns:
+    tuple: (x, y) tuple of coordinates between 0 and 1, where (0, 0) is the top left corner of the world at zoom level 0
+  """
+  latitudes = np.radians(np.clip(latitudes, -max_mercator_latitude, max_mercator_latitude))
+  x = (np.asarray(longitudes, dtype=np.float64) + 180) / 360
+  y = (1 - np.log(np.tan(latitudes) + 1 / np.cos(latitudes)) / math.pi) / 2
+  return x, y
+
+def interleave_bits(cell_x: "numpy.ndarray", cell_y: "numpy.ndarray") -> "numpy.ndarray":
+  """
+  Gets the Morton (Z-order) keys of grid cells by interleaving the bits of their column and row.
+  Every cell of a coarser grid then contains one range of keys of a finer grid, since a coarser cell's key is the first bits of its child cells' keys.
+
+  Args:
+    cell_x (numpy.ndarray): Column of each cell, with at most 31 bits
+    cell_y (numpy.ndarray): Row of each cell, with at most 31 bits
+
+  Returns:
+    numpy.ndarray: Key of each cell
+  """
+  def spread_bits(values):
+    values = np.asarray(values, dtype=np.int64) & 0xFFFFFFFF
+    values = (values | (values << 16)) & 0x0000FFFF0000FFFF
+    values = (values | (values << 8)) & 0x00FF00FF00FF00FF
+    values = (values | (values << 4)) & 0x0F0F0F0F0F0F0F0F
+    values = (values | (values << 2)) & 0x3333333333333333
+    return (values | (values << 1)) & 0x5555555555555555
+  return spread_bits(cell_x) | (spread_bits(cell_y) << 1)
+
+def get_range_positions(starts: "numpy.ndarray", ends: "numpy.ndarray") -> "numpy.ndarray":
+  """
+  Gets every position in a list of ranges.
+
+  Args:
+    starts (numpy.ndarray): First position of each range
+    ends (numpy.ndarray): Position after the last one of each range
+
+  Returns:
+    numpy.ndarray: Positions of all ranges in order
+  """
+  lengths = ends - starts
+  return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+
+class PointPyramid:
+  def __init__(self, latitudes: "numpy.ndarray", longitudes: "numpy.ndarray", max_zoom: int = 18, cell_size: int = default_cell_size) -> None:
+    """
+    Creates a new instance of the PointPyramid class, which is a grid pyramid over all data points of a data file.
+    Each level of the pyramid keeps at most one data point per grid cell, so a view of the map can be represented with a bounded number of data points that are spread out evenly.
+
+    Args:
+      latitudes (numpy.ndarray): Latitude of each data point
+      longitudes (numpy.ndarray): Longitude of each data point
+      max_zoom (int): Optional maximum zoom level of the map, default is 18
+      cell_size (int): Optional width and height of a grid cell in screen pixels, default is 8 pixels
+    """
+    # x, y = Web Mercator coordinates of every data point
+    self.x, self.y = to_mercator(np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+
+    # zoom_level_offset = difference between a map zoom level and the pyramid level with cells of cell_size pixels at that zoom
+    self.zoom_level_offset = int(round(math.log2(tile_size / cell_size)))
+
+    # max_level = finest pyramid level, which divides the world into 2^max_level by 2^max_level cells
+    self.max_level = int(max_zoom) + self.zoom_level_offset
+
+    # cell_keys, cell_points = sorted Morton keys of the finest level's cells that contain every data point, and the positions of their data points
+    # ^ Any cell of any level is one range of cell_keys, so the data points in a box are found with a few binary searches instead of checking every data point.
+    total_points = len(self.x)
+    position_type = np.int32 if total_points < 2 ** 31 else np.int64
+    cell_keys = self.get_cell_keys(self.x, self.y)
+    self.cell_points = np.argsort(cell_keys, kind="stable").astype(position_type)
+    self.cell_keys = cell_keys[self.cell_points]
+
+    # Rank data points in a fixed pseudo-random order, which spreads the highest priority data points evenly across the survey.
+    priority_order = np.random.default_rng(priority_seed).permutation(total_points)
+    # priorities = priority of the data point at every position of cell_points, where the highest priority data points (lowest numbers) appear in more views
+    self.priorities = np.empty(total_points, dtype=position_type)
+    self.priorities[priority_order] = np.arange(total_points, dtype=position_type)
+    self.priorities = self.priorities[self.cell_points]
+
+    # levels = [level 0 ranks, level 1 ranks, ...] list with the sorted positions in cell_points of the data points kept at each pyramid level
+    # ^ Level L divides the world into 2^L by 2^L cells, and keeps the highest priority data point of every cell.
+    self.levels = [None] * (self.max_level + 1)
+    # Start from the finest level, since a coarser cell's data point is one of its child cells' data points.
+    rank_of_priority = np.empty(total_points, dtype=position_type)
+    rank_of_priority[self.priorities] = np.arange(total_points, dtype=position_type)
+    level_ranks = np.arange(total_points, dtype=position_type)
+    for level in range(self.max_level, -1, -1):
+      level_keys = self.cell_keys[level_ranks] >> (2 * (self.max_level - level))
+      cell_starts = np.flatnonzero(np.r_[True, level_keys[1:] != level_keys[:-1]]) if len(level_ranks) > 0 else level_ranks
+      # Levels where every data point is still in its own cell share the finer level's array.
+      if len(cell_starts) < len(level_ranks): level_ranks = rank_of_priority[np.minimum.reduceat(self.priorities[level_ranks], cell_starts)]
+      self.levels[level] = level_ranks
+
+  def get_mercator_box(self, bounds: tuple) -> tuple:
+    """
+    Converts latitude-longitude bounds into a box of Web Mercator coordinates.
+
+    Args:
+      bounds (tuple): ((south, west), (north, east)) tuple with the latitudes and longitudes of the bounds' corners, or None for no bounds
+
+    Returns:
+      tuple: (min x, min y, max x, max y) tuple of Web Mercator coordinates, or None for no bounds
+    """
+    if not bounds: return None
+    ((south, west), (north, east)) = bounds
+    (min_x, max_x), (max_y, min_y) = to_mercator(np.array([south, north]), np.array([west, east]))
+    return (min_x, min_y, max_x, max_y)
+
+  def get_points_in_box(self, points: "numpy.ndarray", box: tuple) -> "numpy.ndarray":
+    """
+    Filters data points for the ones inside the given box.
+
+    Args:
+      points (numpy.ndarray): Positions of the data points to filter
+      box (tuple): (min x, min y, max x, max y) tuple of Web Mercator coordinates, or None for no filtering
+
+    Returns:
+      numpy.ndarray: Positions of the data points inside the box, in the same order as the given data points
+    """
+    if box is None: return points
+    (min_x, min_y, max_x, max_y) = box
+    x, y = self.x[points], self.y[points]
+    return points[(x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)]
+
+  def get_cell_keys(self, x: "numpy.ndarray", y: "numpy.ndarray", level: int = None) -> "numpy.ndarray":
+    """
+    Gets the Morton keys of a level's cells that contain the given Web Mercator coordinates.
+
+    Args:
+      x (numpy.ndarray): Web Mercator x-coordinates
+      y (numpy.ndarray): Web Mercator y-coordinates
+      level (int): Optional pyramid level of the cells, default is None for the finest level
+
+    Returns:
+      numpy.ndarray: Key of each coordinate's cell
+    """
+    cells_per_side = 2 ** (self.max_level if level is None else level)
+    cell_x = np.clip(np.floor(np.asarray(x) * cells_per_side), 0, cells_per_side - 1).astype(np.int64)
+    cell_y = np.clip(np.floor(np.asarray(y) * cells_per_side), 0, cells_per_side - 1).astype(np.int64)
+    return interleave_bits(cell_x, cell_y)
+
+  def get_box_ranges(self, box: tuple) -> tuple:
+    """
+    Gets the ranges of cell_points whose cells overlap a box, by dividing the box into a grid of at most box_cells_per_side cells per side.
+
+    Args:
+      box (tuple): (min x, min y, max x, max y) tuple of Web Mercator coordinates, or None for the whole survey
+
+    Returns:
+      tuple: (starts, ends) arrays with the first position and the position after the last one of each range, which can include data points slightly outside the box
+    """
+    if box is None: return np.array([0]), np.array([len(self.cell_keys)])
+    (min_x, min_y, max_x, max_y) = box
+    # Use the finest level whose cells are at least 1 / box_cells_per_side of the box's width and height.
+    box_size = max(max_x - min_x, max_y - min_y, 2.0 ** -self.max_level)
+    level = int(min(max(math.floor(math.log2(box_cells_per_side / box_size)), 0), self.max_level))
+    cells_per_side = 2 ** level
+    cell_x, cell_y = np.meshgrid(
+      np.arange(int(np.clip(math.floor(min_x * cells_per_side), 0, cells_per_side - 1)), int(np.clip(math.floor(max_x * cells_per_side), 0, cells_per_side - 1)) + 1, dtype=np.int64),
+      np.arange(int(np.clip(math.floor(min_y * cells_per_side), 0, cells_per_side - 1)), int(np.clip(math.floor(max_y * cells_per_side), 0, cells_per_side - 1)) + 1, dtype=np.int64)
+    )
+    # Every cell of the box's grid is one range of the finest level's keys.
+    level_shift = 2 * (self.max_level - level)
+    box_keys = np.sort(interleave_bits(cell_x.ravel(), cell_y.ravel()))
+    starts = np.searchsorted(self.cell_keys, box_keys << level_shift, side="left")
+    ends = np.searchsorted(self.cell_keys, (box_keys + 1) << level_shift, side="left")
+    return starts, ends
+
+  def get_points_near(self, x: float, y: float, distance: float) -> "numpy.ndarray":
+    """
+    Gets the data points in a square around a location by only looking up the cells that overlap the square.
+
+    Args:
+      x (float): Web Mercator x-coordinate of the location
+      y (float): Web Mercator y-coordinate of the location
+      distance (float): Half the width of the square in Web Mercator units
+
+    Returns:
+      numpy.ndarray: Positions of the data points in the square's cells, which can be slightly outside the square, or None if most data points are in the square
+    """
+    starts, ends = self.get_box_ranges((x - distance, y - distance, x + distance, y + distance))
+    # Checking every data point in order is faster than gathering most of them from the index.
+    if 2 * int((ends - starts).sum()) > len(self.cell_keys): return None
+    return self.cell_points[get_range_positions(starts, ends)]
+
+  def get_nearest_point(self, latitude: float, longitude: float, max_distance: float) -> tuple:
+    """
+    Finds the data point closest to a location.
+
+    Args:
+      latitude (float): Latitude of the location
+      longitude (float): Longitude of the location
+      max_distance (float): Maximum distance of the data point from the location in Web Mercator units
+
+    Returns:
+      tuple: (position, distance) tuple of the closest data point, or None if no data point is within max_distance of the location
+    """
+    x, y = to_mercator(np.array([latitude]), np.array([longitude]))
+    points = self.get_points_near(x[0], y[0], max_distance)
+    if points is None: (points, distances) = (None, np.hypot(self.x - x[0], self.y - y[0]))
+    else: distances = np.hypot(self.x[points] - x[0], self.y[points] - y[0])
+    if len(distances) == 0: return None
+    closest = int(np.argmin(distances))
+    if distances[closest] > max_distance: return None
+    return (closest if points is None else int(points[closest])), float(distances[closest])
+
+  def query(self, bounds: tuple, zoom: float, max_points: int) -> "numpy.ndarray":
+    """
+    Gets the data points that represent the given view of the map.
+    The same view always returns the same data points.
+
+    Args:
+      bounds (tuple): ((south, west), (north, east)) tuple with the latitudes and longitudes of the view's corners, or None for the whole survey
+      zoom (float): Zoom level of the map
+      max_points (int): Maximum number of returned data points
+
+    Returns:
+      numpy.ndarray: Sorted positions of the data points that represent the view
+    """
+    return self.query_box(self.get_mercator_box(bounds), zoom, max_points)
+
+  def query_box(self, box: tuple, zoom: float, max_points: int) -> "numpy.ndarray":
+    """
+    Gets the data points that represent a box of Web Mercator coordinates (e.g. a map tile) at the given zoom level.
+    Only the data points in the cells that overlap the box are looked at, so the cost depends on the size of the result instead of the size of the survey.
+
+    Args:
+      box (tuple): (min x, min y, max x, max y) tuple of Web Mercator coordinates, or None for the whole survey
+      zoom (float): Zoom level of the map
+      max_points (int): Maximum number of returned data points
+
+    Returns:
+      numpy.ndarray: Sorted positions of the data points that represent the box
+    """
+    starts, ends = self.get_box_ranges(box)
+    # Return every data point at full resolution if they fit in the point budget.
+    # ^ The box's cells can have some data points outside the box, so boxes with at most twice the point budget in their cells are checked exactly.
+    if int((ends - starts).sum()) <= 2 * max_points:
+      ranks = get_range_positions(starts, ends)
+      points_in_view = self.get_points_in_box(self.cell_points[ranks], box)
+      if len(points_in_view) <= max_points: return np.sort(points_in_view)
+    # Otherwise keep at most one data point per cell at the zoom level, and the highest priority ones if there are still too many.
+    level = int(min(max(math.floor(zoom) + self.zoom_level_offset, 0), self.max_level))
+    level_ranks = self.levels[level]
+    ranks = level_ranks[get_range_positions(np.searchsorted(level_ranks, starts), np.searchsorted(level_ranks, ends))]
+    points = self.cell_points[ranks]
+    if box is not None:
+      (min_x, min_y, max_x, max_y) = box
+      x, y = self.x[points], self.y[points]
+      in_box = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+      ranks, points = ranks[in_box], points[in_box]
+    if len(points) > max_points:
+      points = points[np.argpartition(self.priorities[ranks], max_points - 1)[:max_points]] if max_points > 0 else points[:0]
+    return np.sort(points)
+
+  def get_memory_usage(self) -> int:
+    """
+    Gets the number of bytes that the pyramid's arrays take up in memory.
+
+    Returns:
+      int: Size of the Web Mercator coordinates, the cell index, the priorities and the data points of every level in bytes
+    """
+    # Levels that share an array only count it once.
+    level_bytes = sum(level_ranks.nbytes for level_ranks in {id(level_ranks): level_ranks for level_ranks in self.levels}.values())
+    return self.x.nbytes + self.y.nbytes + self.cell_keys.nbytes + self.cell_points.nbytes + self.priorities.nbytes + level_bytes
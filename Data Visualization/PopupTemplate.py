@@ -0,0 +1,62 @@
+# Standard library imports
+from collections import OrderedDict
+
+# Constants
+max_cached_popups = 5000
+
+class PopupTemplate:
+  def __init__(self, popup_content: dict, dataframe_cols: list[str]) -> None:
+    """
+    Creates a new instance of the PopupTemplate class, which resolves a layer's popup content once so that rendering a popup only fills in the values of a GeoJSON feature.
+
+    Args:
+      popup_content (dict): Dictionary mapping labels that appear on the popup (keys) to lists containing dataframe column names or units that match the label (values)
+        ^ same format as the popup_content argument of DataVisualizer.display_popup_info
+      dataframe_cols (list[str]): List of column names existing in the layer's data file
+    """
+    # lines = [(label HTML, parts), ...] list with each popup label's HTML and its parts, where a part is either literal text (str) or a (column name, unit) tuple
+    self.lines = []
+    for label, values in popup_content.items():
+      parts = []
+      for val in values:
+        val_type = type(val)
+        # Lists contain a unit or some literal text.
+        if val_type is list:
+          parts.append("".join(val))
+        # Dictionaries contain all the possible column names and corresponding units for a label, so resolve the one that exists in the data file.
+        elif val_type is dict:
+          existing_props = [(prop_name, " " + prop_unit) for prop_name, prop_unit in val.items() if prop_name in dataframe_cols]
+          parts.append(existing_props[0] if len(existing_props) > 0 else "N/A")
+        # Strings are names of existing dataframe columns.
+        else:
+          parts.append((val, ""))
+      self.lines.append(("<b>{}</b> ".format(label), parts))
+
+    # rendered_popups = {feature ID: popup HTML, ...} dictionary of recently rendered popups, where the least recently used popup is first
+    self.rendered_popups = OrderedDict()
+
+  def render(self, feature: "geojson.Feature") -> str:
+    """
+    Gets the popup HTML for a GeoJSON feature, which is only rendered if it wasn't rendered recently.
+
+    Args:
+      feature (geojson.Feature): GeoJSON feature of a data point
+        ^ features without an ID are rendered every time
+
+    Returns:
+      str: HTML displayed in the popup
+    """
+    feature_id = feature.get("id")
+    if feature_id in self.rendered_popups:
+      self.rendered_popups.move_to_end(feature_id)
+      return self.rendered_popups[feature_id]
+
+    feature_info = feature["properties"]
+    popup_html = "".join(
+      label_html + "".join(part if type(part) is str else str(feature_info[part[0]]) + part[1] for part in parts) + "<br>"
+      for label_html, parts in self.lines
+    )
+    if feature_id is not None:
+      self.rendered_popups[feature_id] = popup_html
+      if len(self.rendered_popups) > max_cached_popups: self.rendered_popups.popitem(last=False)
+    return popup_html
@@ -0,0 +1,392 @@
+# Standard library imports
+import os
+import math
+import json
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+from PointPyramid import to_mercator, tile_size
+
+# Constants
+# Extensions of data files with line and polygon features (e.g. reference shorelines), which are displayed as shapes instead of data points.
+shape_file_extensions = (".geojson", ".json")
+# Vertices are stored as whole multiples of this many degrees (about 1 centimeter), which takes up half the memory of float64 coordinates.
+coordinate_resolution = 1e-7
+# Maximum distance in screen pixels between a simplified line and the vertices that were removed from it.
+default_simplify_tolerance = 1.0
+# Maximum number of times that the simplification tolerance of a view is raised to fit the vertex budget, before the smallest features are left out.
+max_simplify_attempts = 4
+
+# shape_file_columns = {(data file path, modification time, size): property names, ...} dictionary to store the names of the properties of every shape file that was read in this process
+shape_file_columns = {}
+
+def is_shape_file(data_path: str) -> bool:
+  """
+  Checks if a data file contains line and polygon features instead of rows of data points.
+
+  Args:
+    data_path (str): Path or name of the data file
+
+  Returns:
+    bool: True if the data file is a GeoJSON file, False otherwise
+  """
+  return os.path.splitext(data_path)[1].lower() in shape_file_extensions
+
+def get_shape_file_key(data_path: str) -> tuple:
+  """
+  Gets the key of a version of a shape file, which changes whenever the shape file is modified.
+
+  Args:
+    data_path (str): Path to the shape file
+
+  Returns:
+    tuple: (absolute path, modification time, size) tuple of the shape file
+  """
+  stat = os.stat(data_path)
+  return (os.path.abspath(data_path), stat.st_mtime_ns, stat.st_size)
+
+def read_shape_file(data_path: str, columns: "list[str] | function" = None) -> dict:
+  """
+  Reads the features of a GeoJSON file.
+
+  Args:
+    data_path (str): Path to the GeoJSON file
+    columns (list[str] | function): Optional list of property names to load, or a function that gets all property names of the file and returns the ones to load, default is None for loading all properties
+
+  Returns:
+    dict: Dictionary with the "geometries" (list with the geometry of every feature) and "properties" (dataframe with the properties of every feature, whose index is each feature's position in the file)
+  """
+  with open(data_path) as shape_file: feature_collection = json.load(shape_file)
+  features = feature_collection.get("features", []) if feature_collection.get("type") == "FeatureCollection" else [feature_collection]
+  all_properties = [feature.get("properties") or {} for feature in features]
+  file_cols = list(dict.fromkeys(prop_name for properties in all_properties for prop_name in properties))
+  shape_file_columns[get_shape_file_key(data_path)] = file_cols
+  if columns is None: columns = file_cols
+  elif callable(columns): columns = columns(file_cols)
+  columns = [col for col in columns if col in file_cols]
+  return {
+    "geometries": [feature.get("geometry") for feature in features],
+    "properties": pd.DataFrame({col: [properties.get(col) for properties in all_properties] for col in columns}, index=pd.RangeIndex(len(features)), columns=columns)
+  }
+
+def get_shape_file_columns(data_path: str) -> list[str]:
+  """
+  Gets the names of the properties of a GeoJSON file's features, which are only read the first time they're needed for every version of the file.
+
+  Args:
+    data_path (str): Path to the GeoJSON file
+
+  Returns:
+    list[str]: Names of all properties of the features, in the order they first appear
+  """
+  key = get_shape_file_key(data_path)
+  if key not in shape_file_columns: read_shape_file(data_path, columns=[])
+  return shape_file_columns[key]
+
+def get_geometry_parts(geometry: dict) -> tuple:
+  """
+  Splits a line or polygon geometry into its lines and rings.
+
+  Args:
+    geometry (dict): GeoJSON geometry
+
+  Returns:
+    tuple: (geometry type, parts) tuple, where parts is a list of (group, is ring, coordinates) tuples and a group is the position of a part's line or polygon in the geometry
+      ^ the geometry type is None for geometries that aren't lines or polygons (e.g. points), which have no parts
+  """
+  geometry_type = (geometry or {}).get("type")
+  coordinates = (geometry or {}).get("coordinates") or []
+  if geometry_type == "LineString": return geometry_type, [(0, False, coordinates)]
+  if geometry_type == "MultiLineString": return geometry_type, [(group, False, line) for group, line in enumerate(coordinates)]
+  if geometry_type == "Polygon": return geometry_type, [(0, True, ring) for ring in coordinates]
+  if geometry_type == "MultiPolygon": return geometry_type, [(group, True, ring) for group, polygon in enumerate(coordinates) for ring in polygon]
+  return None, []
+
+def get_ranges(starts: "numpy.ndarray", counts: "numpy.ndarray") -> tuple:
+  """
+  Gets the positions in several ranges of an array at once.
+
+  Args:
+    starts (numpy.ndarray): First position of each range
+    counts (numpy.ndarray): Number of positions in each range
+
+  Returns:
+    tuple: (positions, range IDs) tuple of arrays with every position of all ranges and the range that each position is in
+  """
+  range_ids = np.repeat(np.arange(len(starts)), counts)
+  offsets = np.cumsum(counts) - counts
+  return np.arange(int(np.sum(counts))) - offsets[range_ids] + starts[range_ids], range_ids
+
+def get_segment_distances(x: "numpy.ndarray", y: "numpy.ndarray", start_x: "numpy.ndarray", start_y: "numpy.ndarray", end_x: "numpy.ndarray", end_y: "numpy.ndarray") -> "numpy.ndarray":
+  """
+  Gets the distance between points and line segments.
+
+  Args:
+    x (numpy.ndarray): X coordinate of each point
+    y (numpy.ndarray): Y coordinate of each point
+    start_x, start_y (numpy.ndarray): Coordinates of the start of each point's segment
+    end_x, end_y (numpy.ndarray): Coordinates of the end of each point's segment
+
+  Returns:
+    numpy.ndarray: Distance between each point and the closest point of its segment
+  """
+  dx, dy = end_x - start_x, end_y - start_y
+  squared_lengths = dx * dx + dy * dy
+  fractions = np.clip(np.divide((x - start_x) * dx + (y - start_y) * dy, squared_lengths, out=np.zeros_like(x), where=squared_lengths > 0), 0, 1)
+  return np.hypot(x - (start_x + fractions * dx), y - (start_y + fractions * dy))
+
+def get_vertex_importance(x: "numpy.ndarray", y: "numpy.ndarray", part_starts: "numpy.ndarray", part_is_ring: "numpy.ndarray") -> "numpy.ndarray":
+  """
+  Runs the Douglas-Peucker algorithm on all lines and rings at once, and records the largest tolerance at which each vertex is kept.
+  ^ Simplifying with any tolerance then keeps the vertices whose importance is at least the tolerance, which is the same as running the Douglas-Peucker algorithm with that tolerance.
+
+  Args:
+    x (numpy.ndarray): Web Mercator x coordinate of every vertex
+    y (numpy.ndarray): Web Mercator y coordinate of every vertex
+    part_starts (numpy.ndarray): Position of the first vertex of every line or ring, followed by the total number of vertices
+    part_is_ring (numpy.ndarray): Whether every line or ring is a ring
+
+  Returns:
+    numpy.ndarray: Importance of every vertex in Web Mercator units, which is infinite for the vertices that are always kept
+      ^ the ends of every line are always kept so that neighboring lines stay connected, and rings always keep 4 distinct vertices so that polygons never collapse
+  """
+  importance = np.zeros(len(x), dtype=np.float64)
+  starts, ends = part_starts[:-1], part_starts[1:] - 1
+  importance[starts], importance[ends] = np.inf, np.inf
+  # Every range of vertices is split at its farthest vertex from the segment between its ends, level by level for all ranges at once.
+  # ^ limits = importance of the split that created each range, since a vertex is never more important than the vertex that it depends on
+  # ^ forced_splits = number of levels of splits that are always kept, which is 2 for rings
+  limits = np.full(len(starts), np.inf)
+  forced_splits = np.where(part_is_ring, 2, 0)
+  while len(starts) > 0:
+    has_interior = ends - starts > 1
+    starts, ends, limits, forced_splits = starts[has_interior], ends[has_interior], limits[has_interior], forced_splits[has_interior]
+    if len(starts) == 0: break
+    interior_counts = ends - starts - 1
+    positions, range_ids = get_ranges(starts + 1, interior_counts)
+    distances = get_segment_distances(x[positions], y[positions], x[starts][range_ids], y[starts][range_ids], x[ends][range_ids], y[ends][range_ids])
+    max_distances = np.maximum.reduceat(distances, np.cumsum(interior_counts) - interior_counts)
+    farthest_positions = np.flatnonzero(distances == max_distances[range_ids])
+    _, first_farthest = np.unique(range_ids[farthest_positions], return_index=True)
+    splits = positions[farthest_positions[first_farthest]]
+    split_importance = np.where(forced_splits > 0, np.inf, np.minimum(max_distances, limits))
+    importance[splits] = split_importance
+    starts, ends = np.concatenate((starts, splits)), np.concatenate((splits, ends))
+    limits = np.concatenate((split_importance, split_importance))
+    forced_splits = np.maximum(np.concatenate((forced_splits, forced_splits)) - 1, 0)
+  return importance
+
+class ShapePyramid:
+  def __init__(self, geometries: list[dict], simplify_tolerance: float = default_simplify_tolerance) -> None:
+    """
+    Creates a new instance of the ShapePyramid class, which simplifies all line and polygon features of a shape file for every zoom level of the map once, so that any view can be displayed with a bounded number of vertices.
+    Each vertex stores the largest tolerance at which it survives simplification, so every zoom level's simplification is a threshold on the vertices instead of a copy of them.
+
+    Args:
+      geometries (list[dict]): GeoJSON geometry of every feature, where geometries that aren't lines or polygons are left out
+      simplify_tolerance (float): Optional maximum distance in screen pixels between a simplified line and the vertices that were removed from it, default is 1 pixel
+    """
+    # simplify_tolerance = maximum distance in screen pixels between a simplified line and its removed vertices
+    self.simplify_tolerance = simplify_tolerance
+
+    # total_features = number of features in the shape file
+    self.total_features = len(geometries)
+
+    # geometry_types = type of every feature's geometry ("LineString", "MultiLineString", "Polygon", "MultiPolygon" or None if it isn't displayed)
+    self.geometry_types = []
+    part_features, part_groups, part_is_ring, part_coordinates = [], [], [], []
+    for feature_idx, geometry in enumerate(geometries):
+      geometry_type, parts = get_geometry_parts(geometry)
+      self.geometry_types.append(geometry_type)
+      for group, is_ring, coordinates in parts:
+        # Only keep the longitude and latitude of vertices, and close rings that don't end at their first vertex.
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(len(coordinates), -1)[:, :2]
+        if is_ring and (len(coordinates) > 0) and not np.array_equal(coordinates[0], coordinates[-1]): coordinates = np.vstack((coordinates, coordinates[:1]))
+        if len(coordinates) < (4 if is_ring else 2): continue
+        part_features.append(feature_idx)
+        part_groups.append(group)
+        part_is_ring.append(is_ring)
+        part_coordinates.append(coordinates)
+
+    # Store the parts (lines and rings) of all features in the same arrays, in the order of their features.
+    # ^ part_starts = position of every part's first vertex, followed by the total number of vertices
+    self.part_starts = np.cumsum([0] + [len(coordinates) for coordinates in part_coordinates]).astype(np.int64)
+    # part_features = position of every part's feature in the shape file
+    self.part_features = np.array(part_features, dtype=np.int64)
+    # part_groups = position of every part's line or polygon in its feature's geometry
+    self.part_groups = np.array(part_groups, dtype=np.int32)
+    # part_is_ring = whether every part is a polygon's ring (which is never clipped) or a line
+    self.part_is_ring = np.array(part_is_ring, dtype=bool)
+    # feature_part_starts = position of every feature's first part, followed by the total number of parts
+    self.feature_part_starts = np.searchsorted(self.part_features, np.arange(self.total_features + 1)).astype(np.int64)
+
+    all_coordinates = np.vstack(part_coordinates) if len(part_coordinates) > 0 else np.empty((0, 2))
+    # longitudes, latitudes = coordinates of every vertex as whole multiples of coordinate_resolution degrees
+    self.longitudes = np.round(all_coordinates[:, 0] / coordinate_resolution).astype(np.int32)
+    self.latitudes = np.round(all_coordinates[:, 1] / coordinate_resolution).astype(np.int32)
+    # importance = largest simplification tolerance (in Web Mercator units) at which every vertex is kept
+    x, y = to_mercator(all_coordinates[:, 1], all_coordinates[:, 0])
+    self.importance = get_vertex_importance(x, y, self.part_starts, self.part_is_ring).astype(np.float32)
+
+    # bounds = (south, west, north, east) tuple of arrays with the corners of every feature's bounding box, which are NaN for features without parts
+    # sizes = largest side of every feature's bounding box in Web Mercator units, which decides the features that are left out first when a view has too many vertices
+    vertex_features = np.repeat(self.part_features, np.diff(self.part_starts))
+    south, west, north, east = (np.full(self.total_features, np.nan) for _ in range(4))
+    min_x, min_y, max_x, max_y = (np.full(self.total_features, np.nan) for _ in range(4))
+    if len(vertex_features) > 0:
+      has_parts = np.diff(self.feature_part_starts) > 0
+      feature_starts = np.searchsorted(vertex_features, np.flatnonzero(has_parts))
+      for corner, function, values in ((south, np.minimum, all_coordinates[:, 1]), (west, np.minimum, all_coordinates[:, 0]), (north, np.maximum, all_coordinates[:, 1]), (east, np.maximum, all_coordinates[:, 0]), (min_x, np.minimum, x), (min_y, np.minimum, y), (max_x, np.maximum, x), (max_y, np.maximum, y)):
+        corner[has_parts] = function.reduceat(values, feature_starts)
+    self.bounds = (south, west, north, east)
+    self.sizes = np.fmax(max_x - min_x, max_y - min_y)
+
+    # Index the bounding boxes by their west side, so that the features in a view are among the features starting west of its east side.
+    # ^ west_order = positions of the features with parts, sorted by the west side of their bounding box
+    self.west_order = np.flatnonzero(np.isfinite(west))[np.argsort(west[np.isfinite(west)], kind="stable")]
+    # sorted_west = west side of the bounding box of every feature in west_order
+    self.sorted_west = west[self.west_order]
+
+  def get_features_in_bounds(self, bounds: tuple) -> "numpy.ndarray":
+    """
+    Finds the features whose bounding box overlaps the given bounds.
+
+    Args:
+      bounds (tuple): ((south, west), (north, east)) tuple with the latitudes and longitudes of the bounds' corners, or None for all features
+
+    Returns:
+      numpy.ndarray: Sorted positions of the features in the bounds
+    """
+    if not bounds: return np.sort(self.west_order)
+    ((south, west), (north, east)) = bounds
+    candidates = self.west_order[:np.searchsorted(self.sorted_west, east, side="right")]
+    (feature_south, _, feature_north, feature_east) = self.bounds
+    return np.sort(candidates[(feature_east[candidates] >= west) & (feature_south[candidates] <= north) & (feature_north[candidates] >= south)])
+
+  def get_clip_bounds(self, bounds: tuple, zoom: float) -> tuple:
+    """
+    Gets the area that lines are clipped to for a view of the map, which is the view expanded by half its size and snapped to the map's tiles.
+    ^ Snapping to tiles keeps the same area (and therefore the same vertices) while the map is panned by small amounts.
+
+    Args:
+      bounds (tuple): ((south, west), (north, east)) tuple with the latitudes and longitudes of the view's corners, or None for no clipping
+      zoom (float): Zoom level of the map
+
+    Returns:
+      tuple: ((south, west), (north, east)) tuple with the corners of the area, or None for no clipping
+    """
+    if not bounds: return None
+    ((south, west), (north, east)) = bounds
+    (min_x, max_x), (max_y, min_y) = to_mercator(np.array([south, north]), np.array([west, east]))
+    tiles_per_side = 2 ** max(math.floor(zoom), 0)
+    margin_x, margin_y = (max_x - min_x) / 2, (max_y - min_y) / 2
+    min_x, max_x = math.floor((min_x - margin_x) * tiles_per_side) / tiles_per_side, math.ceil((max_x + margin_x) * tiles_per_side) / tiles_per_side
+    min_y, max_y = max(math.floor((min_y - margin_y) * tiles_per_side) / tiles_per_side, 0.0), min(math.ceil((max_y + margin_y) * tiles_per_side) / tiles_per_side, 1.0)
+    to_latitude = lambda y: math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return ((to_latitude(max_y), min_x * 360 - 180), (to_latitude(min_y), max_x * 360 - 180))
+
+  def select_vertices(self, features: "numpy.ndarray", tolerance: float, clip_bounds: tuple) -> tuple:
+    """
+    Simplifies the given features with a tolerance, and clips their lines to an area.
+    ^ Lines keep the vertices in the area and their neighbors, and are split into several lines where they leave the area.
+
+    Args:
+      features (numpy.ndarray): Sorted positions of the features
+      tolerance (float): Simplification tolerance in Web Mercator units
+      clip_bounds (tuple): ((south, west), (north, east)) tuple with the corners of the area that lines are clipped to, or None for no clipping
+
+    Returns:
+      tuple: (vertices, vertex parts, starts new part) tuple of arrays with the positions of the kept vertices, the part that each of them is in and whether each of them starts a new (possibly clipped) part
+    """
+    parts, _ = get_ranges(self.feature_part_starts[features], np.diff(self.feature_part_starts)[features])
+    vertices, vertex_part_ids = get_ranges(self.part_starts[parts], np.diff(self.part_starts)[parts])
+    vertex_parts = parts[vertex_part_ids]
+    is_kept = self.importance[vertices] >= tolerance
+    vertices, vertex_parts = vertices[is_kept], vertex_parts[is_kept]
+    same_part = vertex_parts[1:] == vertex_parts[:-1]
+    if len(vertices) == 0: return vertices, vertex_parts, np.empty(0, dtype=bool)
+    if clip_bounds:
+      ((south, west), (north, east)) = clip_bounds
+      longitudes, latitudes = self.longitudes[vertices] * coordinate_resolution, self.latitudes[vertices] * coordinate_resolution
+      is_near = (longitudes >= west) & (longitudes <= east) & (latitudes >= south) & (latitudes <= north)
+      is_kept = is_near | self.part_is_ring[vertex_parts]
+      is_kept[1:] |= is_near[:-1] & same_part
+      is_kept[:-1] |= is_near[1:] & same_part
+      # A kept vertex starts a new line if the vertex before it in the same part was clipped.
+      starts_part = np.concatenate(([True], ~(same_part & is_kept[:-1])))[is_kept]
+      vertices, vertex_parts = vertices[is_kept], vertex_parts[is_kept]
+    else:
+      starts_part = np.concatenate(([True], ~same_part))
+    return vertices, vertex_parts, starts_part
+
+  def query(self, bounds: tuple, zoom: float, max_vertices: int) -> dict:
+    """
+    Gets the simplified and clipped features that represent the given view of the map, with at most max_vertices vertices.
+    ^ Views with too many vertices are simplified more, and the smallest features are left out if the view still has too many vertices.
+
+    Args:
+      bounds (tuple): ((south, west), (north, east)) tuple with the latitudes and longitudes of the view's corners, or None for all features
+      zoom (float): Zoom level of the map
+      max_vertices (int): Maximum number of returned vertices
+
+    Returns:
+      dict: Dictionary with the features in the view and their vertices
+        ^ "key": array that is the same for views that return the same features and vertices
+        ^ "features": sorted positions of the features in the shape file
+        ^ "part_features", "part_groups": position of every returned line or ring's feature in "features" and its line or polygon in the feature's geometry
+        ^ "part_starts": position of every returned line or ring's first vertex, followed by the number of returned vertices
+        ^ "longitudes", "latitudes": coordinates of every returned vertex, which are rounded to a fraction of a pixel at the zoom level
+    """
+    pixel_size = 1 / (tile_size * 2 ** zoom)
+    tolerance = self.simplify_tolerance * pixel_size
+    clip_bounds = self.get_clip_bounds(bounds, zoom)
+    features = self.get_features_in_bounds(clip_bounds)
+    # Simplify views with too many vertices more, by raising the tolerance to the importance of the vertex that is just over the vertex budget.
+    for _ in range(max_simplify_attempts):
+      vertices, vertex_parts, starts_part = self.select_vertices(features, tolerance, clip_bounds)
+      if len(vertices) <= max_vertices: break
+      importance = self.importance[vertices]
+      optional_importance = importance[np.isfinite(importance)]
+      optional_budget = max_vertices - (len(importance) - len(optional_importance))
+      if optional_budget < 0: break
+      tolerance = max(float(np.nextafter(np.partition(optional_importance, len(optional_importance) - optional_budget - 1)[len(optional_importance) - optional_budget - 1], np.float32(np.inf))), tolerance)
+    # Leave out the smallest features if the vertices that are always kept don't fit in the vertex budget.
+    if len(vertices) > max_vertices:
+      feature_vertices = np.bincount(np.searchsorted(features, self.part_features[vertex_parts]), minlength=len(features))
+      largest_first = np.argsort(-self.sizes[features], kind="stable")
+      kept_features = largest_first[np.cumsum(feature_vertices[largest_first]) <= max_vertices]
+      features = features[np.sort(kept_features)]
+      vertices, vertex_parts, starts_part = self.select_vertices(features, tolerance, clip_bounds)
+
+    # Round coordinates to a quarter of a pixel, and skip vertices that round to the same location as the vertex before them (except the last vertex of a line or ring).
+    decimals = int(min(max(math.ceil(-math.log10(360 * pixel_size / 4)), 0), -math.log10(coordinate_resolution)))
+    longitudes = np.round(self.longitudes[vertices] * coordinate_resolution, decimals)
+    latitudes = np.round(self.latitudes[vertices] * coordinate_resolution, decimals)
+    ends_part = np.concatenate((starts_part[1:], [True]))
+    is_repeated = np.concatenate(([False], (longitudes[1:] == longitudes[:-1]) & (latitudes[1:] == latitudes[:-1]))) & ~starts_part & ~ends_part
+    longitudes, latitudes, vertex_parts, starts_part = longitudes[~is_repeated], latitudes[~is_repeated], vertex_parts[~is_repeated], starts_part[~is_repeated]
+    first_vertices = np.flatnonzero(starts_part)
+    displayed_features = np.unique(self.part_features[vertex_parts[first_vertices]])
+    return {
+      "key": np.concatenate(([tolerance], np.ravel(clip_bounds) if clip_bounds else [], displayed_features)),
+      "features": displayed_features,
+      "part_features": np.searchsorted(displayed_features, self.part_features[vertex_parts[first_vertices]]),
+      "part_groups": self.part_groups[vertex_parts[first_vertices]],
+      "part_starts": np.append(first_vertices, len(longitudes)),
+      "longitudes": longitudes,
+      "latitudes": latitudes
+    }
+
+  def get_memory_usage(self) -> int:
+    """
+    Gets the number of bytes that the simplified features take up in memory.
+
+    Returns:
+      int: Size of the vertices, their importance, the parts and the bounding box index in bytes
+    """
+    return (
+      self.longitudes.nbytes + self.latitudes.nbytes + self.importance.nbytes
+      + self.part_starts.nbytes + self.part_features.nbytes + self.part_groups.nbytes + self.part_is_ring.nbytes + self.feature_part_starts.nbytes
+      + sum(corner.nbytes for corner in self.bounds) + self.sizes.nbytes + self.west_order.nbytes + self.sorted_west.nbytes
+    )
@@ -0,0 +1,300 @@
+# Standard library imports
+import os
+import json
+import math
+import hashlib
+import threading
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+from SurveyCache import get_survey_cache
+from StreamingReader import StreamingReader
+from DataCatalog import get_data_catalog
+
+# Optional dependencies imports
+# ^ pyarrow is needed to store each data file's index next to the converted data files, otherwise data files are indexed once per process.
+try:
+  import pyarrow as pa
+  import pyarrow.feather as feather
+except ImportError:
+  pa, feather = None, None
+
+# Constants
+meters_per_degree = 111320.0
+default_cell_size = 10.0
+# Offset added to a grid cell's y index so that (x index, y index) pairs can be packed into one sortable integer key.
+cell_key_offset = 2 ** 31
+index_file_extension = ".arrow"
+
+# spatial_indexes = {(data directory path, latitude column names, longitude column names): SpatialIndex} dictionary of indexes shared by everything in this process that searches the same data directory
+spatial_indexes = {}
+
+def get_spatial_index(data_dir_path: str, possible_lat_col_names: list[str], possible_long_col_names: list[str], cache: "SurveyCache") -> "SpatialIndex":
+  """
+  Gets the spatial index for a data directory, building it only if it was never built or its data files changed since it was built.
+
+  Args:
+    data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+    possible_lat_col_names (list[str]): List of column names containing the latitude of the collected data (because data from different files might have different column names)
+    possible_long_col_names (list[str]): List of column names containing the longitude of the collected data (because data from different files might have different column names)
+    cache (SurveyCache): Cache of converted data files to read coordinates through
+
+  Returns:
+    SpatialIndex: Up-to-date spatial index over all data files in the data directory
+  """
+  key = (os.path.abspath(data_dir_path), tuple(possible_lat_col_names), tuple(possible_long_col_names))
+  index = spatial_indexes.get(key)
+  if (index is None) or index.is_stale():
+    index = SpatialIndex(data_dir_path, possible_lat_col_names, possible_long_col_names, cache)
+    spatial_indexes[key] = index
+  return index
+
+def project(latitudes: "numpy.ndarray", longitudes: "numpy.ndarray", reference_latitude: float, reference_longitude: float) -> tuple:
+  """
+  Projects latitudes and longitudes onto a flat plane in meters around a reference point, which is accurate enough for the small areas covered by surveys.
+
+  Args:
+    latitudes (numpy.ndarray): Latitudes in degrees
+    longitudes (numpy.ndarray): Longitudes in degrees
+    reference_latitude (float): Latitude of the plane's origin
+    reference_longitude (float): Longitude of the plane's origin
+
+  Returns:
+    tuple: (x, y) tuple of distances in meters east and north of the reference point
+  """
+  x = (longitudes - reference_longitude) * meters_per_degree * math.cos(math.radians(reference_latitude))
+  y = (latitudes - reference_latitude) * meters_per_degree
+  return x, y
+
+def get_cell_keys(cell_x: "numpy.ndarray", cell_y: "numpy.ndarray") -> "numpy.ndarray":
+  """
+  Packs grid cell indexes into integer keys that sort by column first and then by row.
+
+  Args:
+    cell_x (numpy.ndarray): Column index of each grid cell
+    cell_y (numpy.ndarray): Row index of each grid cell
+
+  Returns:
+    numpy.ndarray: Integer key of each grid cell
+  """
+  return (cell_x << 32) + (cell_y + cell_key_offset)
+
+def get_index_path(cache: "SurveyCache", file_path: str, possible_lat_col_names: list[str], possible_long_col_names: list[str], cell_size: float) -> str:
+  """
+  Gets the path of the stored index for the current version of a data file.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files that indexes are stored next to
+    file_path (str): Path to the data file
+    possible_lat_col_names (list[str]): List of column names that latitudes are read from
+    possible_long_col_names (list[str]): List of column names that longitudes are read from
+    cell_size (float): Width and height of each grid cell in meters
+
+  Returns:
+    str: Path to the data file's stored index, or None if it can't be stored
+  """
+  if (not cache.enabled) or (feather is None): return None
+  # Other column names or cell sizes give other indexes, so a short hash of them is part of the stored index's file name.
+  settings_hash = hashlib.sha1(json.dumps([possible_lat_col_names, possible_long_col_names, cell_size]).encode("utf-8")).hexdigest()[:8]
+  cache_path = cache.get_cache_path(file_path)
+  return "{}.points_{}{}".format(cache_path[:-len(index_file_extension)], settings_hash, index_file_extension)
+
+def read_file_index(cache: "SurveyCache", file_path: str, possible_lat_col_names: list[str], possible_long_col_names: list[str], cell_size: float) -> dict:
+  """
+  Reads the stored index of a data file, or puts its data points into a grid of square cells and stores it if it wasn't stored since the data file was last modified.
+  Each data file's index is projected around the center of its own data points, so data files can be indexed independently of each other.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files to read coordinates through and store the index next to
+    file_path (str): Path to the data file
+    possible_lat_col_names (list[str]): List of column names containing the latitude of the collected data
+    possible_long_col_names (list[str]): List of column names containing the longitude of the collected data
+    cell_size (float): Width and height of each grid cell in meters
+
+  Returns:
+    dict: Dictionary with the projection's "reference" (latitude, longitude) tuple, and the "keys", "x", "y" and "rows" of the data file's data points sorted by the grid cell containing them,
+      or None if the data file has no coordinate columns
+  """
+  index_path = get_index_path(cache, file_path, possible_lat_col_names, possible_long_col_names, cell_size)
+  if (index_path is not None) and os.path.exists(index_path):
+    table = feather.read_table(index_path, memory_map=True)
+    file_index = {name: table.column(name).to_numpy() for name in ["keys", "x", "y", "rows"]}
+    file_index["reference"] = tuple(json.loads(table.schema.metadata[b"reference"]))
+    return file_index
+
+  file_cols = cache.get_columns(file_path)
+  lat_col_names = [col_name for col_name in possible_lat_col_names if col_name in file_cols]
+  long_col_names = [col_name for col_name in possible_long_col_names if col_name in file_cols]
+  # Skip files without coordinates (e.g. data from a category that uses different column names).
+  if (len(lat_col_names) == 0) or (len(long_col_names) == 0): return None
+  lat_col_name, long_col_name = lat_col_names[0], long_col_names[0]
+  # Read the latitude and longitude of every data point one chunk at a time, where the scan only keeps data points with both coordinates.
+  dataframe = StreamingReader(cache).scan(file_path, columns=[], latitude_col_name=lat_col_name, longitude_col_name=long_col_name)["data"]
+  rows = dataframe.index.to_numpy(dtype=np.int64)
+  latitudes = pd.to_numeric(dataframe[lat_col_name], errors="coerce").to_numpy(dtype=np.float64)
+  longitudes = pd.to_numeric(dataframe[long_col_name], errors="coerce").to_numpy(dtype=np.float64)
+  reference = (float(np.mean(latitudes)), float(np.mean(longitudes))) if len(latitudes) > 0 else (0.0, 0.0)
+  x, y = project(latitudes, longitudes, *reference)
+
+  # Sort the data points by the grid cell containing them, so that each column of cells is one contiguous block of points.
+  keys = get_cell_keys(np.floor(x / cell_size).astype(np.int64), np.floor(y / cell_size).astype(np.int64))
+  order = np.argsort(keys, kind="stable")
+  file_index = {"reference": reference, "keys": keys[order], "x": x[order], "y": y[order], "rows": rows[order]}
+  if index_path is not None:
+    table = pa.table({name: file_index[name] for name in ["keys", "x", "y", "rows"]}).replace_schema_metadata({"reference": json.dumps(reference)})
+    temp_index_path = "{}.{}.{}.tmp".format(index_path, os.getpid(), threading.get_ident())
+    feather.write_feather(table, temp_index_path, compression="uncompressed")
+    os.replace(temp_index_path, index_path)
+  return file_index
+
+def store_file_index(file_path: str, cache_dir: str, possible_lat_col_names: list[str], possible_long_col_names: list[str], cell_size: float) -> None:
+  """
+  Indexes a data file and stores its index next to the converted data file, which runs in a worker process of the data directory's catalog.
+
+  Args:
+    file_path (str): Path to the data file
+    cache_dir (str): Path to the cache directory that the data file was converted into
+    possible_lat_col_names (list[str]): List of column names containing the latitude of the collected data
+    possible_long_col_names (list[str]): List of column names containing the longitude of the collected data
+    cell_size (float): Width and height of each grid cell in meters
+  """
+  read_file_index(get_survey_cache(cache_dir), file_path, possible_lat_col_names, possible_long_col_names, cell_size)
+
+class SpatialIndex:
+  def __init__(self, data_dir_path: str, possible_lat_col_names: list[str], possible_long_col_names: list[str], cache: "SurveyCache", cell_size: float = default_cell_size) -> None:
+    """
+    Creates a new instance of the SpatialIndex class, which puts every data point of every data file into a grid of square cells so that points near a location can be found without reading the data files again.
+    Data files are indexed separately, and only once a search is within their bounds from the data directory's catalog, where data files that aren't indexed yet are indexed on the catalog's worker processes at the same time.
+
+    Args:
+      data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+      possible_lat_col_names (list[str]): List of column names containing the latitude of the collected data (because data from different files might have different column names)
+      possible_long_col_names (list[str]): List of column names containing the longitude of the collected data (because data from different files might have different column names)
+      cache (SurveyCache): Cache of converted data files to read coordinates through
+      cell_size (float): Optional width and height of each grid cell in meters, default is 10 meters
+    """
+    # root_data_dir_path = path to the root directory containing all category subfolders and their data files
+    self.root_data_dir_path = data_dir_path
+
+    # cache = cache of converted data files that coordinates are read through and indexes are stored next to
+    self.cache = cache
+
+    # possible_lat_col_names, possible_long_col_names = column names that coordinates are read from
+    self.possible_lat_col_names = possible_lat_col_names
+    self.possible_long_col_names = possible_long_col_names
+
+    # cell_size = width and height of each grid cell in meters
+    self.cell_size = cell_size
+
+    # file_stats = {file path: (modification time in nanoseconds, size)} dictionary used to check if any data file changed after the index was built
+    self.file_stats = {}
+
+    # files = [(category, file name), ...] list of all data files with coordinates, where a file's position in the list is its file ID
+    # ^ file_paths = path of each data file in files
+    self.files, self.file_paths = [], []
+
+    file_bounds = []
+    for summary in self.get_data_files():
+      self.file_stats[summary["path"]] = (summary["mtime_ns"], summary["size"])
+      # Skip files without coordinates (e.g. data from a category that uses different column names).
+      if summary["bounds"] is None: continue
+      self.files.append((summary["category"], summary["file"]))
+      self.file_paths.append(summary["path"])
+      file_bounds.append(summary["bounds"])
+
+    # file_bounds = (file ID, 4) array with the south, west, north and east bounds of each data file's data points
+    self.file_bounds = np.array(file_bounds, dtype=np.float64).reshape(-1, 4)
+
+    # file_indexes = {file ID: index} dictionary with the index of each data file that was searched, see read_file_index
+    self.file_indexes = {}
+    # lock = lock held while data files are indexed, since sessions search the index from background threads
+    self.lock = threading.Lock()
+
+  def get_data_catalog(self) -> "DataCatalog":
+    """
+    Gets the catalog of the root data directory, whose summaries have the bounds of every data file with the index's coordinate columns.
+
+    Returns:
+      DataCatalog: Catalog of the root data directory
+    """
+    return get_data_catalog(self.root_data_dir_path, self.cache, self.possible_lat_col_names, self.possible_long_col_names)
+
+  def get_data_files(self) -> list[dict]:
+    """
+    Gets the summaries of all data files in the root data directory's category subfolders (including nested subfolders) from the data directory's catalog.
+
+    Returns:
+      list[dict]: List of data file summaries, see DataCatalog.get_file_summaries
+    """
+    return self.get_data_catalog().get_file_summaries()
+
+  def is_stale(self) -> bool:
+    """
+    Checks if any data file was added, removed or modified after the index was built.
+
+    Returns:
+      bool: True if the index needs to be rebuilt, False otherwise
+    """
+    return {summary["path"]: (summary["mtime_ns"], summary["size"]) for summary in self.get_data_files()} != self.file_stats
+
+  def get_file_indexes(self, file_ids: "numpy.ndarray") -> list[dict]:
+    """
+    Gets the indexes of data files, where data files that were never indexed are indexed on the data directory catalog's worker processes at the same time.
+
+    Args:
+      file_ids (numpy.ndarray): IDs of the data files
+
+    Returns:
+      list[dict]: Index of each data file (see read_file_index), which is None for data files without coordinate columns
+    """
+    index_args = (self.possible_lat_col_names, self.possible_long_col_names, self.cell_size)
+    with self.lock:
+      unindexed_file_ids = [file_id for file_id in file_ids if file_id not in self.file_indexes]
+      # Only indexes that can be stored are built by worker processes, since this process reads the stored indexes afterwards.
+      unstored_file_paths = [
+        self.file_paths[file_id] for file_id in unindexed_file_ids
+        if (get_index_path(self.cache, self.file_paths[file_id], *index_args) is not None) and not os.path.exists(get_index_path(self.cache, self.file_paths[file_id], *index_args))
+      ]
+      if len(unstored_file_paths) > 1:
+        self.get_data_catalog().map_files(store_file_index, [(file_path, self.cache.cache_dir) + index_args for file_path in unstored_file_paths])
+      for file_id in unindexed_file_ids:
+        self.file_indexes[file_id] = read_file_index(self.cache, self.file_paths[file_id], *index_args)
+      return [self.file_indexes[file_id] for file_id in file_ids]
+
+  def query(self, latitude: float, longitude: float, radius: float) -> dict:
+    """
+    Finds all data points within the given distance of a location, which only searches data files whose bounds are within the distance.
+
+    Args:
+      latitude (float): Latitude of the location to search around
+      longitude (float): Longitude of the location to search around
+      radius (float): Search radius in meters
+
+    Returns:
+      dict: Dictionary mapping (category, file name) tuples (keys) to sorted arrays of row positions in that file's dataframe (values) for every data point within the search radius
+    """
+    latitude_margin = radius / meters_per_degree
+    longitude_margin = radius / (meters_per_degree * max(math.cos(math.radians(latitude)), 1e-6))
+    [south, west, north, east] = self.file_bounds.T
+    nearby_file_ids = np.flatnonzero(
+      (south - latitude_margin <= latitude) & (latitude <= north + latitude_margin) & (west - longitude_margin <= longitude) & (longitude <= east + longitude_margin)
+    )
+
+    matches = {}
+    for file_id, file_index in zip(nearby_file_ids, self.get_file_indexes(nearby_file_ids)):
+      if file_index is None: continue
+      [x], [y] = project(np.array([latitude]), np.array([longitude]), *file_index["reference"])
+      min_cell_x, max_cell_x = math.floor((x - radius) / self.cell_size), math.floor((x + radius) / self.cell_size)
+      min_cell_y, max_cell_y = math.floor((y - radius) / self.cell_size), math.floor((y + radius) / self.cell_size)
+      # Collect the points in every column of cells overlapping the search circle, then keep the points that are inside the circle.
+      candidates = []
+      for cell_x in range(min_cell_x, max_cell_x + 1):
+        [start_key, end_key] = get_cell_keys(np.array([cell_x, cell_x], dtype=np.int64), np.array([min_cell_y, max_cell_y], dtype=np.int64))
+        start, end = np.searchsorted(file_index["keys"], start_key, side="left"), np.searchsorted(file_index["keys"], end_key, side="right")
+        if end > start: candidates.append(np.arange(start, end))
+      if len(candidates) == 0: continue
+      candidates = np.concatenate(candidates)
+      candidates = candidates[np.hypot(file_index["x"][candidates] - x, file_index["y"][candidates] - y) <= radius]
+      if len(candidates) > 0: matches[self.files[file_id]] = np.sort(file_index["rows"][candidates])
+    return matches
@@ -0,0 +1,178 @@
+# External dependencies imports
+import numpy as np
+import pandas as pd
+
+# Constants
+# Maximum number of bytes that a scan keeps in memory, which is split between the chunk being read and the sampled rows.
+default_memory_budget = 256 * 1024 * 1024
+# Seed for sampling rows, which is fixed so that every scan of the same data file keeps the same rows.
+sample_seed = 0
+
+def get_column_statistics(values: "pandas.Series") -> dict:
+  """
+  Gets the statistics of a numeric column in one chunk of a data file.
+
+  Args:
+    values (pandas.Series): Values of the column in the chunk
+
+  Returns:
+    dict: Dictionary with the number of values, their minimum, maximum and sum, where missing and non-numeric values are ignored
+  """
+  values = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+  values = values[np.isfinite(values)]
+  if len(values) == 0: return {"count": 0, "min": None, "max": None, "sum": 0.0}
+  return {"count": len(values), "min": float(values.min()), "max": float(values.max()), "sum": float(values.sum())}
+
+def merge_column_statistics(statistics: dict, other_statistics: dict) -> dict:
+  """
+  Combines the statistics of a column in two chunks of a data file.
+
+  Args:
+    statistics (dict): Statistics returned by get_column_statistics (or this function) for some chunks
+    other_statistics (dict): Statistics returned by get_column_statistics for another chunk
+
+  Returns:
+    dict: Statistics of the column in all the chunks
+  """
+  if other_statistics["count"] == 0: return dict(statistics)
+  if statistics["count"] == 0: return dict(other_statistics)
+  return {
+    "count": statistics["count"] + other_statistics["count"],
+    "min": min(statistics["min"], other_statistics["min"]),
+    "max": max(statistics["max"], other_statistics["max"]),
+    "sum": statistics["sum"] + other_statistics["sum"]
+  }
+
+class StreamingReader:
+  def __init__(self, cache: "SurveyCache", memory_budget: int = default_memory_budget) -> None:
+    """
+    Creates a new instance of the StreamingReader class, which reads a data file one chunk at a time to sample, filter and summarize its rows in one pass.
+    The chunk being read and the sampled rows never take up more than the memory budget, so a data file's size never decides whether it can be read.
+
+    Args:
+      cache (SurveyCache): Cache of converted data files to read chunks through
+      memory_budget (int): Optional maximum number of bytes that a scan keeps in memory, default is 256 MiB
+    """
+    # cache = cache of converted data files, which reads chunks from memory-mapped files (or parses the data file in chunks if pyarrow isn't installed)
+    self.cache = cache
+
+    # memory_budget = maximum number of bytes that a scan keeps in memory
+    self.memory_budget = memory_budget
+
+  def iter_chunks(self, data_path: str, columns: list[str] = None) -> "generator":
+    """
+    Reads a data file one chunk at a time, where each chunk fits in a quarter of the memory budget.
+    ^ The rest of the budget is left for the sampled rows and for the keys and coordinates that scans compute for every row of a chunk.
+
+    Args:
+      data_path (str): Path to the data file
+      columns (list[str]): Optional list of column names to load, default is None for loading all columns
+
+    Returns:
+      generator: Generator of normalized dataframes, whose index is each row's position in the data file
+    """
+    return self.cache.iter_chunks(data_path, self.cache.get_rows_per_chunk(data_path, self.memory_budget // 4, columns), columns)
+
+  def get_sample_size(self, data_path: str, columns: list[str], sample_size: int) -> int:
+    """
+    Gets the number of rows that can be sampled from a data file, which is at most the number of rows that fit in half of the memory budget.
+
+    Args:
+      data_path (str): Path to the data file
+      columns (list[str]): List of column names that are sampled, or None for all columns
+      sample_size (int): Requested number of sampled rows, or None for keeping every matching row
+
+    Returns:
+      int: Number of rows that are sampled, or None for keeping every matching row
+    """
+    if sample_size is None: return None
+    return max(1, min(int(sample_size), self.cache.get_rows_per_chunk(data_path, self.memory_budget // 2, columns)))
+
+  def scan(self, data_path: str, columns: list[str] = None, sample_size: int = None, latitude_col_name: str = None, longitude_col_name: str = None, bounds: tuple = None, statistics_col_names: list[str] = None, on_progress: "function" = None) -> dict:
+    """
+    Reads a data file in one pass, keeping a uniform random sample of the rows that have coordinates inside the given bounds, and optionally computing statistics of some of their columns.
+    Rows are sampled with a reservoir of the rows with the smallest random keys, so every matching row is equally likely to be kept no matter how large the data file is.
+
+    Args:
+      data_path (str): Path to the data file
+      columns (list[str]): Optional list of column names to return for the kept rows, default is None for all columns
+        ^ the coordinate and statistics columns are always returned, and names that aren't columns of the data file are ignored
+      sample_size (int): Optional maximum number of rows to keep, default is None for keeping every matching row
+        ^ at most as many rows as fit in half of the memory budget are kept
+      latitude_col_name (str): Optional name of the column containing the latitude of each row, default is None for not filtering rows by coordinates
+      longitude_col_name (str): Optional name of the column containing the longitude of each row, default is None for not filtering rows by coordinates
+        ^ rows without both coordinates are skipped if both coordinate columns are given
+      bounds (tuple): Optional ((south, west), (north, east)) tuple with the corners of the area that kept rows must be in, default is None for any location
+      statistics_col_names (list[str]): Optional list of numeric columns to compute statistics of, default is None for not computing statistics
+      on_progress (function): Optional function that gets called with the fraction (between 0 and 1) of the data file that has been read
+        ^ raising an exception in this function stops the scan
+
+    Returns:
+      dict: Dictionary with the kept rows and what the scan found
+        ^ "data": dataframe of the kept rows in the order of the data file, whose index is each row's position in the data file
+        ^ "total_rows": number of rows in the data file
+        ^ "matched_rows": number of rows with coordinates inside the bounds, which is more than the number of kept rows if the rows were sampled
+        ^ "sampled": whether only a sample of the matching rows was kept
+        ^ "statistics": {column name: {"count", "min", "max", "mean"}} dictionary with the statistics of every statistics column over all matching rows
+    """
+    if on_progress is None: on_progress = lambda fraction: None
+    existing_cols = self.cache.get_columns(data_path)
+    coordinate_col_names = [latitude_col_name, longitude_col_name] if (latitude_col_name in existing_cols) and (longitude_col_name in existing_cols) else []
+    statistics_col_names = list(dict.fromkeys([col for col in (statistics_col_names or []) if col in existing_cols]))
+    # filter_col_names = columns that are read from every chunk to filter rows and compute statistics
+    filter_col_names = list(dict.fromkeys(coordinate_col_names + statistics_col_names))
+    if columns is None: columns = list(existing_cols)
+    columns = list(dict.fromkeys([col for col in columns if col in existing_cols] + filter_col_names))
+    sample_size = self.get_sample_size(data_path, columns, sample_size)
+    total_rows = self.cache.get_total_rows(data_path)
+    # Converted data files only read the filtered columns in every chunk, and read the other columns of the kept rows at the end.
+    # ^ Data files that are parsed from text keep the kept rows' columns while they're read, since reading them again means parsing the data file again.
+    deferred_read = self.cache.enabled
+    chunk_col_names = filter_col_names if deferred_read else columns
+
+    random_generator = np.random.default_rng(sample_seed)
+    kept_keys, kept_rows, kept_data = np.empty(0), np.empty(0, dtype=np.int64), None
+    scan_result = {"total_rows": 0, "matched_rows": 0}
+    statistics = {col: {"count": 0, "min": None, "max": None, "sum": 0.0} for col in statistics_col_names}
+    for chunk in self.iter_chunks(data_path, chunk_col_names):
+      matches = np.ones(len(chunk.index), dtype=bool)
+      if len(coordinate_col_names) > 0:
+        latitudes = pd.to_numeric(chunk[latitude_col_name], errors="coerce").to_numpy(dtype=np.float64)
+        longitudes = pd.to_numeric(chunk[longitude_col_name], errors="coerce").to_numpy(dtype=np.float64)
+        matches = np.isfinite(latitudes) & np.isfinite(longitudes)
+        if bounds:
+          ((south, west), (north, east)) = bounds
+          matches &= (latitudes >= south) & (latitudes <= north) & (longitudes >= west) & (longitudes <= east)
+      matching_chunk = chunk[matches]
+      for col in statistics_col_names: statistics[col] = merge_column_statistics(statistics[col], get_column_statistics(matching_chunk[col]))
+      scan_result["total_rows"] += len(chunk.index)
+      scan_result["matched_rows"] += len(matching_chunk.index)
+
+      # Every matching row gets a random key, and the rows with the smallest keys are kept.
+      keys = random_generator.random(len(matching_chunk.index))
+      if (sample_size is not None) and (len(kept_keys) >= sample_size):
+        # Rows whose keys are larger than every kept key can never be kept.
+        is_candidate = keys < kept_keys.max()
+        keys, matching_chunk = keys[is_candidate], matching_chunk[is_candidate]
+      kept_keys = np.concatenate([kept_keys, keys])
+      kept_rows = np.concatenate([kept_rows, matching_chunk.index.to_numpy(dtype=np.int64)])
+      if not deferred_read: kept_data = matching_chunk if kept_data is None else pd.concat([kept_data, matching_chunk])
+      if (sample_size is not None) and (len(kept_keys) > sample_size):
+        kept_positions = np.argpartition(kept_keys, sample_size - 1)[:sample_size]
+        kept_keys, kept_rows = kept_keys[kept_positions], kept_rows[kept_positions]
+        if not deferred_read: kept_data = kept_data.iloc[kept_positions]
+      if total_rows: on_progress(min(scan_result["total_rows"] / total_rows, 1.0))
+
+    # Keep the rows in the order of the data file.
+    order = np.argsort(kept_rows, kind="stable")
+    if deferred_read: data = self.cache.read_rows(data_path, kept_rows[order], columns)
+    elif kept_data is not None: data = kept_data.iloc[order]
+    else: data = self.cache.read_rows(data_path, kept_rows, columns)
+    scan_result["data"] = data
+    scan_result["sampled"] = len(data.index) < scan_result["matched_rows"]
+    scan_result["statistics"] = {
+      col: {"count": col_statistics["count"], "min": col_statistics["min"], "max": col_statistics["max"], "mean": col_statistics["sum"] / col_statistics["count"] if col_statistics["count"] > 0 else None}
+      for col, col_statistics in statistics.items()
+    }
+    on_progress(1.0)
+    return scan_result
@@ -0,0 +1,427 @@
+# Standard library imports
+import os
+import glob
+import hashlib
+import threading
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+
+# Optional dependencies imports
+# ^ pyarrow is needed to store data files in the Arrow columnar format, otherwise data files are parsed every time they're read.
+try:
+  import pyarrow as pa
+  import pyarrow.feather as feather
+  import pyarrow.ipc as ipc
+except ImportError:
+  pa, feather, ipc = None, None, None
+
+# Constants
+cache_file_extension = ".arrow"
+# Maximum number of bytes that the rows of one chunk take up in memory while a data file is converted, so that converting a data file never needs the whole file in memory.
+default_chunk_memory_budget = 64 * 1024 * 1024
+# Number of rows at the start of a data file used to estimate how many bytes each row takes up in memory.
+row_bytes_sample_size = 1000
+# Parsed data takes up at most about this many times its size as text or Arrow columns once it's in a dataframe (e.g. short text values become Python strings of about 50 bytes).
+# ^ Data files that are this much smaller than a memory budget are read in one chunk without estimating the size of their rows.
+max_dataframe_expansion = 32
+
+# survey_caches = {cache directory path: SurveyCache} dictionary of caches shared by every session and background thread in this process that reads from the same cache directory
+survey_caches = {}
+survey_caches_lock = threading.Lock()
+
+def get_survey_cache(cache_dir: str) -> "SurveyCache":
+  """
+  Gets the cache for a cache directory, which is only created the first time it's needed in this process.
+  ^ Sharing the cache between sessions means every converted data file is only mapped into memory once per process.
+
+  Args:
+    cache_dir (str): Path to the directory where converted data files are stored
+
+  Returns:
+    SurveyCache: Cache shared by everything in this process that uses the same cache directory
+  """
+  with survey_caches_lock:
+    key = os.path.abspath(cache_dir)
+    if key not in survey_caches: survey_caches[key] = SurveyCache(cache_dir)
+    return survey_caches[key]
+
+def get_promoted_schema(schema: "pyarrow.Schema", other_schema: "pyarrow.Schema") -> "pyarrow.Schema":
+  """
+  Gets a schema that can store the values of two chunks of the same data file, whose columns were parsed as different types (e.g. integers in one chunk and decimals or text in another).
+
+  Args:
+    schema (pyarrow.Schema): Schema of the chunks that were already converted
+    other_schema (pyarrow.Schema): Schema of the next chunk
+
+  Returns:
+    pyarrow.Schema: Schema with the columns of both schemas, where columns with incompatible types are stored as text
+  """
+  fields = {field.name: field for field in schema}
+  for other_field in other_schema:
+    field = fields.get(other_field.name)
+    if field is None: fields[other_field.name] = other_field
+    elif field.type != other_field.type:
+      try: fields[field.name] = pa.unify_schemas([pa.schema([field]), pa.schema([other_field])], promote_options="permissive").field(0)
+      except (pa.ArrowInvalid, pa.ArrowTypeError): fields[field.name] = pa.field(field.name, pa.string())
+  return pa.schema(list(fields.values()))
+
+class SurveyCache:
+  def __init__(self, cache_dir: str, chunk_memory_budget: int = default_chunk_memory_budget) -> None:
+    """
+    Creates a new instance of the SurveyCache class, which converts each data file into a columnar binary file once so that later reads only load the needed columns instead of parsing text again.
+
+    Args:
+      cache_dir (str): Path to the directory where converted data files are stored (created if it doesn't exist)
+      chunk_memory_budget (int): Optional maximum number of bytes that the rows of one chunk take up in memory while a data file is converted, default is 64 MiB
+    """
+    # cache_dir = path to the directory where converted data files are stored
+    self.cache_dir = cache_dir
+
+    # enabled = whether data files can be converted into a columnar format (False if the optional pyarrow dependency isn't installed)
+    self.enabled = feather is not None
+    if self.enabled: os.makedirs(cache_dir, exist_ok=True)
+
+    # tables = {converted file path: table} dictionary to store the memory-mapped Arrow table of every converted data file that was read
+    # ^ memory-mapped files are backed by the operating system's page cache, so all sessions and worker processes (e.g. panel serve --num-procs) share one copy of each data file in memory
+    self.tables = {}
+
+    # lock = lock protecting the tables, which are opened by background loading threads too
+    self.lock = threading.Lock()
+
+    # chunk_memory_budget = maximum number of bytes that the rows of one chunk take up in memory while a data file is converted
+    self.chunk_memory_budget = chunk_memory_budget
+
+  def normalize_dataframe(self, dataframe: "pandas.DataFrame", drop_empty_cols: bool = True) -> pd.DataFrame:
+    """
+    Normalizes a dataframe that was just parsed from a data file.
+    Removes whitespace around column names and text values, and removes empty unnamed columns that were created by trailing commas.
+
+    Args:
+      dataframe (pandas.DataFrame): Dataframe parsed from a data file
+      drop_empty_cols (bool): Optional boolean that determines whether empty unnamed columns are removed, default is True
+        ^ chunks of a data file keep them, since a column can be empty in one chunk but not in another
+
+    Returns:
+      pandas.DataFrame: Normalized dataframe
+    """
+    dataframe.columns = [str(col).strip() for col in dataframe.columns]
+    for col in dataframe.columns:
+      # Text values that are only whitespace are missing values.
+      if dataframe[col].dtype == object:
+        stripped_col = dataframe[col].str.strip()
+        dataframe[col] = stripped_col.mask(stripped_col == "")
+    if not drop_empty_cols: return dataframe
+    empty_unnamed_cols = [col for col in dataframe.columns if col.startswith("Unnamed:") and dataframe[col].isna().all()]
+    return dataframe.drop(columns=empty_unnamed_cols)
+
+  def get_row_bytes(self, data_path: str, columns: list[str] = None) -> float:
+    """
+    Estimates how many bytes each row of a data file takes up in memory once it's read into a dataframe, using the rows at the start of the data file.
+
+    Args:
+      data_path (str): Path to the data file
+      columns (list[str]): Optional list of column names that are read, default is None for all columns
+
+    Returns:
+      float: Estimated number of bytes per row (including its index and the text of text columns)
+    """
+    # Data files that weren't converted yet are estimated with their text, which is also how they're converted.
+    if self.enabled and os.path.exists(self.get_cache_path(data_path)): sample = self.table_to_dataframe(self.get_table(data_path).slice(0, row_bytes_sample_size))
+    else: sample = self.read_csv_sample(data_path)
+    if columns is not None: sample = sample[[col for col in dict.fromkeys(columns) if col in sample.columns]]
+    if len(sample.index) == 0: return float(np.dtype(np.int64).itemsize)
+    # Every row also has its position in the data file as the dataframe's index.
+    return sample.memory_usage(index=False, deep=True).sum() / len(sample.index) + np.dtype(np.int64).itemsize
+
+  def get_rows_per_chunk(self, data_path: str, memory_budget: int, columns: list[str] = None) -> int:
+    """
+    Gets the number of rows of a data file that fit in a memory budget.
+
+    Args:
+      data_path (str): Path to the data file
+      memory_budget (int): Maximum number of bytes that the rows can take up in memory
+      columns (list[str]): Optional list of column names that are read, default is None for all columns
+
+    Returns:
+      int: Number of rows per chunk, which is at least 1
+    """
+    if self.enabled and os.path.exists(self.get_cache_path(data_path)):
+      table = self.get_table(data_path)
+      if columns is not None: table = table.select([col for col in dict.fromkeys(columns) if col in table.column_names])
+      if table.nbytes * max_dataframe_expansion <= memory_budget: return max(1, table.num_rows)
+    # ^ Every row of a data file's text takes up at least one byte.
+    elif os.path.getsize(data_path) * max_dataframe_expansion <= memory_budget: return max(1, os.path.getsize(data_path))
+    return max(1, int(memory_budget // self.get_row_bytes(data_path, columns)))
+
+  def read_csv_sample(self, data_path: str) -> pd.DataFrame:
+    """
+    Parses the rows at the start of a data file.
+
+    Args:
+      data_path (str): Path to the data file
+
+    Returns:
+      pandas.DataFrame: Normalized dataframe with at most row_bytes_sample_size rows
+    """
+    return self.normalize_dataframe(pd.read_csv(data_path, nrows=row_bytes_sample_size), drop_empty_cols=False)
+
+  def iter_csv_chunks(self, data_path: str, rows_per_chunk: int, columns: list[str] = None) -> "generator":
+    """
+    Parses a data file one chunk of rows at a time, so that only one chunk is in memory at once.
+
+    Args:
+      data_path (str): Path to the data file
+      rows_per_chunk (int): Number of rows in each chunk
+      columns (list[str]): Optional list of (normalized) column names to parse, default is None for all columns
+
+    Returns:
+      generator: Generator of normalized dataframes, whose index is each row's position in the data file
+    """
+    usecols = None if columns is None else (lambda col: str(col).strip() in columns)
+    with pd.read_csv(data_path, chunksize=rows_per_chunk, usecols=usecols, low_memory=False) as chunks:
+      for chunk in chunks: yield self.normalize_dataframe(chunk, drop_empty_cols=False)
+
+  def get_cache_path(self, data_path: str) -> str:
+    """
+    Gets the path of the converted file for the current version of a data file.
+    The modification time and size of the data file are part of the path, so a changed data file never matches an old converted file.
+
+    Args:
+      data_path (str): Path to the data file
+
+    Returns:
+      str: Path to the data file's converted file
+    """
+    stat = os.stat(data_path)
+    return "{}/{}_{}_{}{}".format(self.cache_dir, self.get_path_hash(data_path), stat.st_mtime_ns, stat.st_size, cache_file_extension)
+
+  def get_path_hash(self, data_path: str) -> str:
+    """
+    Gets a short hash identifying a data file's location, which prefixes the names of all of its converted files.
+
+    Args:
+      data_path (str): Path to the data file
+
+    Returns:
+      str: Hash of the data file's absolute path
+    """
+    return hashlib.sha1(os.path.abspath(data_path).encode("utf-8")).hexdigest()[:16]
+
+  def ingest(self, data_path: str) -> str:
+    """
+    Converts a data file into the columnar format if it wasn't converted since it was last modified.
+
+    Args:
+      data_path (str): Path to the data file
+
+    Returns:
+      str: Path to the data file's converted file
+    """
+    cache_path = self.get_cache_path(data_path)
+    if not os.path.exists(cache_path):
+      # Remove converted files of older versions of the data file.
+      for outdated_cache_path in glob.glob("{}/{}_*{}".format(self.cache_dir, self.get_path_hash(data_path), cache_file_extension)):
+        # ^ Another thread or session may have removed it already.
+        try: os.remove(outdated_cache_path)
+        except FileNotFoundError: pass
+      # Write to a temporary file first so that other sessions and background loading threads never read a partially written file.
+      temp_cache_path = "{}.{}.{}.tmp".format(cache_path, os.getpid(), threading.get_ident())
+      self.write_chunks(data_path, temp_cache_path)
+      os.replace(temp_cache_path, cache_path)
+    return cache_path
+
+  def write_chunks(self, data_path: str, arrow_path: str) -> None:
+    """
+    Converts a data file into the columnar format one chunk at a time, so that converting it only needs one chunk of rows in memory.
+    Each chunk is one record batch, so data files that fit in one chunk have one contiguous chunk per column, which reads use without copying it.
+
+    Args:
+      data_path (str): Path to the data file
+      arrow_path (str): Path to the converted file that is written
+    """
+    writer, schema = None, None
+    try:
+      for chunk in self.iter_csv_chunks(data_path, self.get_rows_per_chunk(data_path, self.chunk_memory_budget)):
+        chunk_table = pa.Table.from_pandas(chunk, preserve_index=False).replace_schema_metadata(None)
+        if writer is None:
+          schema = chunk_table.schema
+          writer = ipc.new_file(arrow_path, schema)
+        elif chunk_table.schema != schema:
+          # Columns whose type changed (e.g. a column with text after many rows of numbers) are promoted, and the chunks that were already written are converted again.
+          promoted_schema = get_promoted_schema(schema, chunk_table.schema)
+          if promoted_schema != schema:
+            writer.close()
+            writer, schema = self.rewrite_chunks(arrow_path, promoted_schema), promoted_schema
+          chunk_table = chunk_table.cast(schema)
+        writer.write_table(chunk_table)
+      if writer is None:
+        # Data files without any rows still store their columns.
+        writer = ipc.new_file(arrow_path, pa.Table.from_pandas(self.read_csv_sample(data_path), preserve_index=False).replace_schema_metadata(None).schema)
+    finally:
+      if writer is not None: writer.close()
+
+  def rewrite_chunks(self, arrow_path: str, schema: "pyarrow.Schema") -> "pyarrow.ipc.RecordBatchFileWriter":
+    """
+    Converts the chunks of a partially written converted file to a new schema, one chunk at a time.
+
+    Args:
+      arrow_path (str): Path to the partially written converted file, which must be closed
+      schema (pyarrow.Schema): Schema that every chunk is converted to
+
+    Returns:
+      pyarrow.ipc.RecordBatchFileWriter: Open writer of the converted file, which the remaining chunks are written to
+    """
+    old_arrow_path = arrow_path + ".old"
+    os.replace(arrow_path, old_arrow_path)
+    writer = ipc.new_file(arrow_path, schema)
+    with pa.memory_map(old_arrow_path) as source:
+      reader = ipc.open_file(source)
+      for batch_index in range(reader.num_record_batches):
+        batch_table = pa.Table.from_batches([reader.get_batch(batch_index)])
+        # Columns that the old chunks didn't have (e.g. unnamed columns that were empty until now) are missing values.
+        for field in schema:
+          if field.name not in batch_table.column_names: batch_table = batch_table.append_column(field.name, pa.nulls(batch_table.num_rows, field.type))
+        writer.write_table(batch_table.select(schema.names).cast(schema))
+    os.remove(old_arrow_path)
+    return writer
+
+  def get_columns(self, data_path: str) -> list[str]:
+    """
+    Gets the normalized column names of a data file without loading any of its data.
+
+    Args:
+      data_path (str): Path to the data file
+
+    Returns:
+      list[str]: List of the data file's column names
+    """
+    if not self.enabled:
+      return [col for col in self.normalize_dataframe(pd.read_csv(data_path, nrows=0)).columns]
+    return self.get_table(data_path).column_names
+
+  def get_table(self, data_path: str) -> "pyarrow.Table":
+    """
+    Gets the memory-mapped Arrow table of a data file's converted file, which is only opened the first time it's read in this process.
+
+    Args:
+      data_path (str): Path to the data file
+
+    Returns:
+      pyarrow.Table: Read-only table whose columns point into the memory-mapped converted file
+    """
+    cache_path = self.ingest(data_path)
+    with self.lock:
+      if cache_path not in self.tables:
+        # Stop sharing tables of older versions of the data file.
+        path_hash = os.path.basename(cache_path).split("_")[0]
+        for outdated_cache_path in [path for path in self.tables if os.path.basename(path).split("_")[0] == path_hash]:
+          self.tables.pop(outdated_cache_path)
+        with ipc.open_file(pa.memory_map(cache_path)) as reader:
+          table = reader.read_all()
+        # Unnamed columns that were empty in every chunk were created by trailing commas.
+        self.tables[cache_path] = table.drop_columns([col for col in table.column_names if col.startswith("Unnamed:") and (table.column(col).null_count == table.num_rows)])
+      return self.tables[cache_path]
+
+  def get_total_rows(self, data_path: str) -> int:
+    """
+    Gets the number of rows in a data file without reading any of its data.
+
+    Args:
+      data_path (str): Path to the data file
+
+    Returns:
+      int: Number of rows, or None if it's unknown without parsing the whole data file (e.g. if pyarrow isn't installed)
+    """
+    return self.get_table(data_path).num_rows if self.enabled else None
+
+  def table_to_dataframe(self, table: "pyarrow.Table", columns: list[str] = None, index: "numpy.ndarray" = None) -> pd.DataFrame:
+    """
+    Converts (part of) a memory-mapped table into a dataframe.
+    Numeric columns without missing values are read-only views of the memory-mapped file, while other columns (e.g. text) are converted into new arrays.
+
+    Args:
+      table (pyarrow.Table): Table or slice of a table from get_table
+      columns (list[str]): Optional list of existing column names to convert, default is None for all columns
+      index (numpy.ndarray): Optional row positions in the data file that are the dataframe's index, default is None for a range index
+
+    Returns:
+      pandas.DataFrame: Dataframe with the table's columns
+    """
+    if columns is None: columns = table.column_names
+    return pd.DataFrame({
+      col: table.column(col).chunk(0).to_numpy(zero_copy_only=False) if table.column(col).num_chunks == 1 else table.column(col).to_pandas().to_numpy()
+      for col in columns
+    }, index=index, columns=columns, copy=False)
+
+  def iter_chunks(self, data_path: str, rows_per_chunk: int, columns: list[str] = None) -> "generator":
+    """
+    Reads a data file through the cache one chunk of rows at a time, so that only one chunk is in memory at once.
+
+    Args:
+      data_path (str): Path to the data file
+      rows_per_chunk (int): Number of rows in each chunk
+      columns (list[str]): Optional list of column names to load, default is None for loading all columns
+        ^ names that aren't columns of the data file and repeated names are ignored
+
+    Returns:
+      generator: Generator of normalized dataframes, whose index is each row's position in the data file
+    """
+    if columns is not None:
+      existing_cols = self.get_columns(data_path)
+      columns = [col for col in dict.fromkeys(columns) if col in existing_cols]
+    if not self.enabled:
+      for chunk in self.iter_csv_chunks(data_path, rows_per_chunk, columns):
+        yield chunk if columns is None else chunk[columns]
+      return
+    table = self.get_table(data_path)
+    for start_row in range(0, table.num_rows, rows_per_chunk):
+      chunk_table = table.slice(start_row, rows_per_chunk)
+      yield self.table_to_dataframe(chunk_table, columns, index=np.arange(start_row, start_row + chunk_table.num_rows))
+
+  def read_rows(self, data_path: str, rows: "numpy.ndarray", columns: list[str] = None) -> pd.DataFrame:
+    """
+    Reads some rows of a data file through the cache, which only loads those rows instead of whole columns.
+
+    Args:
+      data_path (str): Path to the data file
+      rows (numpy.ndarray): Positions of the rows in the data file
+      columns (list[str]): Optional list of column names to load, default is None for loading all columns
+        ^ names that aren't columns of the data file and repeated names are ignored
+
+    Returns:
+      pandas.DataFrame: Normalized data of the rows, in the given order and whose index is each row's position in the data file
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if columns is not None:
+      existing_cols = self.get_columns(data_path)
+      columns = [col for col in dict.fromkeys(columns) if col in existing_cols]
+    if not self.enabled:
+      # Parse the data file in chunks and only keep the requested rows.
+      row_chunks = [chunk[chunk.index.isin(rows)] for chunk in self.iter_csv_chunks(data_path, self.get_rows_per_chunk(data_path, self.chunk_memory_budget), columns)]
+      dataframe = pd.concat(row_chunks) if len(row_chunks) > 0 else self.read_csv_sample(data_path).iloc[:0]
+      return dataframe.reindex(rows) if columns is None else dataframe.reindex(rows)[columns]
+    table = self.get_table(data_path)
+    if columns is None: columns = table.column_names
+    return self.table_to_dataframe(table.select(columns).take(pa.array(rows)), columns, index=rows)
+
+  def read(self, data_path: str, columns: list[str] = None) -> pd.DataFrame:
+    """
+    Reads a data file through the cache.
+
+    Args:
+      data_path (str): Path to the data file
+      columns (list[str]): Optional list of column names to load, default is None for loading all columns
+        ^ names that aren't columns of the data file and repeated names are ignored
+
+    Returns:
+      pandas.DataFrame: Normalized data from the data file
+    """
+    if columns is not None:
+      existing_cols = self.get_columns(data_path)
+      columns = [col for col in dict.fromkeys(columns) if col in existing_cols]
+    if not self.enabled:
+      dataframe = self.normalize_dataframe(pd.read_csv(data_path))
+      return dataframe if columns is None else dataframe[columns]
+    return self.table_to_dataframe(self.get_table(data_path), columns)
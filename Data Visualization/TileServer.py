@@ -0,0 +1,244 @@
+# Standard library imports
+import os
+import re
+import socket
+import threading
+from urllib.parse import quote, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# External dependencies imports
+import numpy as np
+
+# Constants
+tile_extent = 4096
+default_max_points_per_tile = 4096
+# Name of the layer inside every vector tile, which is used to style the tile's data points.
+tile_layer_name = "points"
+tile_path_pattern = re.compile(r"^/tiles/(?P<source>[^/]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf")
+raster_tile_path_pattern = re.compile(r"^/rasters/(?P<source>[^/]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.png")
+# Host names that make the server listen on every network interface, which browsers can't connect to by name.
+wildcard_hosts = ("", "0.0.0.0")
+# Environment variables that configure the shared tile server when the app is served to browsers on other machines (e.g. `DATA_VISUALIZER_TILE_HOST=0.0.0.0 DATA_VISUALIZER_TILE_PORT=5007 panel serve elwha.ipynb`).
+# ^ DATA_VISUALIZER_TILE_URL is the base URL that browsers request tiles from, which is needed behind a proxy and can contain {port} for the server's port (e.g. "https://hub.example.org/user/me/proxy/{port}").
+tile_host_variable = "DATA_VISUALIZER_TILE_HOST"
+tile_port_variable = "DATA_VISUALIZER_TILE_PORT"
+tile_url_variable = "DATA_VISUALIZER_TILE_URL"
+
+# tile_server = TileServer shared by every DataVisualizer in this process, which is only started when a DataVisualizer needs it
+tile_server = None
+
+def get_tile_server() -> "TileServer":
+  """
+  Gets the tile server shared by every DataVisualizer in this process, starting it the first time it's needed.
+  The server listens on localhost and any free port unless the DATA_VISUALIZER_TILE_HOST, DATA_VISUALIZER_TILE_PORT and DATA_VISUALIZER_TILE_URL environment variables are set.
+
+  Returns:
+    TileServer: Running tile server
+  """
+  global tile_server
+  if tile_server is None:
+    tile_server = TileServer(
+      host = os.environ.get(tile_host_variable, "localhost"),
+      port = int(os.environ.get(tile_port_variable, 0)),
+      public_url = os.environ.get(tile_url_variable) or None
+    )
+  return tile_server
+
+def encode_varint(value: int) -> bytes:
+  """
+  Encodes a non-negative integer as a Protocol Buffers variable-length integer.
+
+  Args:
+    value (int): Non-negative integer
+
+  Returns:
+    bytes: Encoded integer
+  """
+  encoded = bytearray()
+  while value > 0x7F:
+    encoded.append((value & 0x7F) | 0x80)
+    value >>= 7
+  encoded.append(value)
+  return bytes(encoded)
+
+def encode_field(field_number: int, value: bytes) -> bytes:
+  """
+  Encodes a length-delimited Protocol Buffers field (e.g. a string, a nested message or packed integers).
+
+  Args:
+    field_number (int): Number of the field in its message
+    value (bytes): Encoded value of the field
+
+  Returns:
+    bytes: Encoded field
+  """
+  return encode_varint((field_number << 3) | 2) + encode_varint(len(value)) + value
+
+def encode_point_tile(tile_x: "numpy.ndarray", tile_y: "numpy.ndarray", ids: "numpy.ndarray") -> bytes:
+  """
+  Encodes data points into a Mapbox Vector Tile (https://github.com/mapbox/vector-tile-spec) with one layer of Point features.
+
+  Args:
+    tile_x (numpy.ndarray): Horizontal position of each data point inside the tile, between 0 and the tile extent
+    tile_y (numpy.ndarray): Vertical position of each data point inside the tile, between 0 and the tile extent
+    ids (numpy.ndarray): Feature ID of each data point
+
+  Returns:
+    bytes: Encoded vector tile
+  """
+  features = bytearray()
+  # Every Point feature's geometry is one MoveTo command (id 1, count 1) followed by its zigzag-encoded position.
+  move_to = encode_varint((1 & 0x7) | (1 << 3))
+  for x, y, feature_id in zip(tile_x.tolist(), tile_y.tolist(), ids.tolist()):
+    geometry = move_to + encode_varint((x << 1) ^ (x >> 31)) + encode_varint((y << 1) ^ (y >> 31))
+    # Feature fields: 1 = id, 3 = geometry type (1 = Point), 4 = geometry.
+    feature = b"\x08" + encode_varint(feature_id) + b"\x18\x01" + encode_field(4, geometry)
+    features += encode_field(2, feature)
+  # Layer fields: 15 = version, 1 = name, 2 = features, 5 = extent.
+  layer = b"\x78\x02" + encode_field(1, tile_layer_name.encode("utf-8")) + bytes(features) + b"\x28" + encode_varint(tile_extent)
+  # Tile fields: 3 = layers.
+  return encode_field(3, layer)
+
+class TileServer:
+  def __init__(self, host: str = "localhost", port: int = 0, max_points_per_tile: int = default_max_points_per_tile, public_url: str = None) -> None:
+    """
+    Creates a new instance of the TileServer class, which serves data points as binary vector tiles (and rasters as PNG tiles) from a local HTTP endpoint in a background thread.
+    Vector tiles let the browser load only the tiles in view instead of receiving a whole dataset as JSON over the websocket.
+
+    Args:
+      host (str): Optional host name that the server listens on, default is "localhost"
+      port (int): Optional port that the server listens on, default is 0 for any free port
+      max_points_per_tile (int): Optional maximum number of data points in a tile, default is 4096
+      public_url (str): Optional base URL that browsers request tiles from, which can contain {port} for the port that the server listens on
+        ^ default is None for "http://<host>:<port>", where servers listening on every network interface use this machine's name as the host
+    """
+    # sources = {source name: (pyramid, ids), ...} dictionary to store the level-of-detail pyramid and feature IDs of every dataset that tiles can be requested for
+    self.sources = {}
+
+    # raster_sources = {source name: get_tile, ...} dictionary to store the function that renders the PNG tile (bytes) of a zoom level, column and row for every raster
+    self.raster_sources = {}
+
+    # max_points_per_tile = maximum number of data points in a tile
+    self.max_points_per_tile = max_points_per_tile
+
+    parent_server = self
+    class TileRequestHandler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        path_match = tile_path_pattern.match(self.path)
+        raster_path_match = raster_tile_path_pattern.match(self.path)
+        if path_match is not None:
+          tile = parent_server.get_tile(unquote(path_match["source"]), int(path_match["z"]), int(path_match["x"]), int(path_match["y"]))
+          content_type = "application/x-protobuf"
+        elif (raster_path_match is not None) and (unquote(raster_path_match["source"]) in parent_server.raster_sources):
+          tile = parent_server.raster_sources[unquote(raster_path_match["source"])](int(raster_path_match["z"]), int(raster_path_match["x"]), int(raster_path_match["y"]))
+          content_type = "image/png"
+        else:
+          self.send_error(404)
+          return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(tile)))
+        # Tiles are requested by the map in the browser, which is on a different origin than this server.
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(tile)
+
+      def log_message(self, format, *args):
+        # Don't print every tile request.
+        pass
+
+    # server = HTTP server handling tile requests in a background thread
+    self.server = ThreadingHTTPServer((host, port), TileRequestHandler)
+    self.server.daemon_threads = True
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    # url = base URL that browsers request tiles from
+    server_port = self.server.server_address[1]
+    if public_url is not None: self.url = public_url.rstrip("/").replace("{port}", str(server_port))
+    else: self.url = "http://{}:{}".format(socket.getfqdn() if host in wildcard_hosts else host, server_port)
+
+  def get_tile_url(self, source_name: str) -> str:
+    """
+    Gets the tile URL template of a dataset, which is used by a map's vector tile layer.
+
+    Args:
+      source_name (str): Name of the dataset
+
+    Returns:
+      str: URL with {z}, {x} and {y} placeholders for the tile's zoom level and position
+    """
+    return "{}/tiles/{}/{{z}}/{{x}}/{{y}}.pbf".format(self.url, quote(source_name, safe=""))
+
+  def get_raster_tile_url(self, source_name: str) -> str:
+    """
+    Gets the tile URL template of a raster, which is used by a map's tile layer.
+
+    Args:
+      source_name (str): Name of the raster
+
+    Returns:
+      str: URL with {z}, {x} and {y} placeholders for the tile's zoom level and position
+    """
+    return "{}/rasters/{}/{{z}}/{{x}}/{{y}}.png".format(self.url, quote(source_name, safe=""))
+
+  def add_raster_source(self, source_name: str, get_tile: "function") -> None:
+    """
+    Adds or replaces a raster that PNG tiles can be requested for.
+
+    Args:
+      source_name (str): Name of the raster, which is part of its tile URL
+      get_tile (function): Function that gets called with a tile's zoom level, column and row, and returns the tile's PNG image (bytes)
+        ^ tiles are requested from several background threads at once
+    """
+    self.raster_sources[source_name] = get_tile
+
+  def remove_raster_source(self, source_name: str) -> None:
+    """
+    Removes a raster, so that its tiles aren't found anymore.
+
+    Args:
+      source_name (str): Name of the raster
+    """
+    self.raster_sources.pop(source_name, None)
+
+  def add_source(self, source_name: str, pyramid: "PointPyramid", ids: "numpy.ndarray") -> None:
+    """
+    Adds or replaces a dataset that tiles can be requested for.
+
+    Args:
+      source_name (str): Name of the dataset, which is part of its tile URL
+      pyramid (PointPyramid): Level-of-detail pyramid of the dataset's data points
+      ids (numpy.ndarray): Feature ID of each data point
+    """
+    self.sources[source_name] = (pyramid, np.asarray(ids, dtype=np.int64))
+
+  def remove_source(self, source_name: str) -> None:
+    """
+    Removes a dataset, so that its tiles become empty.
+
+    Args:
+      source_name (str): Name of the dataset
+    """
+    self.sources.pop(source_name, None)
+
+  def get_tile(self, source_name: str, z: int, x: int, y: int) -> bytes:
+    """
+    Gets a vector tile with the data points that represent the tile's area at the tile's zoom level.
+
+    Args:
+      source_name (str): Name of the dataset
+      z (int): Zoom level of the tile
+      x (int): Column of the tile
+      y (int): Row of the tile
+
+    Returns:
+      bytes: Encoded vector tile, which has no data points if the dataset doesn't exist
+    """
+    if source_name not in self.sources: return encode_point_tile(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    pyramid, ids = self.sources[source_name]
+    tiles_per_side = 2 ** z
+    points = pyramid.query_box((x / tiles_per_side, y / tiles_per_side, (x + 1) / tiles_per_side, (y + 1) / tiles_per_side), z, self.max_points_per_tile)
+    # Convert Web Mercator coordinates into positions inside the tile.
+    tile_x = np.floor((pyramid.x[points] * tiles_per_side - x) * tile_extent).astype(np.int64)
+    tile_y = np.floor((pyramid.y[points] * tiles_per_side - y) * tile_extent).astype(np.int64)
+    return encode_point_tile(tile_x, tile_y, ids[points])
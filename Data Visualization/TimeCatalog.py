@@ -0,0 +1,320 @@
+# Standard library imports
+import os
+import json
+import hashlib
+import threading
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+from StreamingReader import StreamingReader
+
+# Optional dependencies imports
+# ^ pyarrow is needed to store parsed timestamps next to the converted data files, otherwise timestamps are parsed once per process.
+try:
+  import pyarrow as pa
+  import pyarrow.feather as feather
+except ImportError:
+  pa, feather = None, None
+
+# Constants
+# Columns with the date (and often the time) that a data point was collected, in order of preference.
+default_datetime_col_names = ["datetime_utc", "Survey_Date", "Date Collected"]
+# Columns with the time of day that a data point was collected, which is added to dates without a time.
+default_time_col_names = ["Time_GMT", "Time (GMT)"]
+# Formats that date columns are parsed with, in the order they're tried.
+datetime_formats = ["%Y-%b-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y", "%Y-%m-%d"]
+# Formats that time of day columns are parsed with, in the order they're tried.
+time_formats = ["%H:%M:%S", "%H:%M"]
+# Number of unique values used to find the formats of a column.
+format_sample_size = 1000
+times_file_extension = ".arrow"
+
+# time_catalogs = {(data directory path, datetime column names, time column names): TimeCatalog} dictionary of catalogs shared by everything in this process that filters the same data directory by time
+time_catalogs = {}
+
+def get_time_catalog(data_dir_path: str, cache: "SurveyCache", possible_datetime_col_names: list[str] = default_datetime_col_names, possible_time_col_names: list[str] = default_time_col_names) -> "TimeCatalog":
+  """
+  Gets the time catalog for a data directory, building it only if it was never built or its data files changed since it was built.
+
+  Args:
+    data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+    cache (SurveyCache): Cache of converted data files to read timestamps through
+    possible_datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected, default is the Elwha data's date columns
+    possible_time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected, default is the Elwha data's time columns
+
+  Returns:
+    TimeCatalog: Up-to-date time catalog over all data files in the data directory
+  """
+  key = (os.path.abspath(data_dir_path), tuple(possible_datetime_col_names), tuple(possible_time_col_names))
+  catalog = time_catalogs.get(key)
+  if (catalog is None) or catalog.is_stale():
+    catalog = TimeCatalog(data_dir_path, cache, possible_datetime_col_names, possible_time_col_names)
+    time_catalogs[key] = catalog
+  return catalog
+
+def parse_datetimes(values: "pandas.Series", formats: list[str]) -> tuple:
+  """
+  Parses a column of dates or times with explicit formats, since some data files mix formats (e.g. times with and without seconds).
+  Formats that parse a sample of the column's unique values are tried first on all values, and the other formats are only tried on values that are still unparsed.
+
+  Args:
+    values (pandas.Series): Column of dates or times
+    formats (list[str]): List of formats to try, in order of preference
+
+  Returns:
+    tuple: (parsed values, used formats, date-only mask) tuple with a datetime64 pandas.Series (NaT for missing or unparseable values), the list of formats that parsed any value
+      and a boolean pandas.Series that is True for values parsed with a format without a time of day
+  """
+  text = values.astype(str).where(values.notna())
+  sample = pd.Series(text.dropna().unique()[:format_sample_size])
+  sample_formats = [datetime_format for datetime_format in formats if pd.to_datetime(sample, format=datetime_format, errors="coerce").notna().any()]
+  parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+  is_date_only = pd.Series(False, index=values.index)
+  used_formats = []
+  for datetime_format in sample_formats + [datetime_format for datetime_format in formats if datetime_format not in sample_formats]:
+    unparsed = parsed.isna() & text.notna()
+    if not unparsed.any(): break
+    parsed_values = pd.to_datetime(text[unparsed], format=datetime_format, errors="coerce")
+    if parsed_values.notna().any():
+      parsed[unparsed] = parsed_values
+      if "%H" not in datetime_format: is_date_only[parsed_values.index[parsed_values.notna()]] = True
+      used_formats.append(datetime_format)
+  return parsed, used_formats, is_date_only
+
+def get_times_path(cache: "SurveyCache", file_path: str, possible_datetime_col_names: list[str], possible_time_col_names: list[str]) -> str:
+  """
+  Gets the path of the stored timestamps for the current version of a data file.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files that timestamps are stored next to
+    file_path (str): Path to the data file
+    possible_datetime_col_names (list[str]): List of column names that timestamps are parsed from
+    possible_time_col_names (list[str]): List of column names that times of day are parsed from
+
+  Returns:
+    str: Path to the data file's stored timestamps, or None if they can't be stored
+  """
+  if (not cache.enabled) or (feather is None): return None
+  # Other column names can give other timestamps, so a short hash of the column names is part of the stored timestamps' file name.
+  columns_hash = hashlib.sha1(json.dumps([possible_datetime_col_names, possible_time_col_names]).encode("utf-8")).hexdigest()[:8]
+  cache_path = cache.get_cache_path(file_path)
+  return "{}.times_{}{}".format(cache_path[:-len(times_file_extension)], columns_hash, times_file_extension)
+
+def read_file_times(cache: "SurveyCache", file_path: str, possible_datetime_col_names: list[str], possible_time_col_names: list[str]) -> tuple:
+  """
+  Reads the stored timestamps of a data file, or parses and stores them if they weren't stored since the data file was last modified.
+  Data catalogs parse the timestamps of new data files on their worker processes, so time catalogs usually only read them.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files to read timestamps through and store them next to
+    file_path (str): Path to the data file
+    possible_datetime_col_names (list[str]): List of column names containing the date or time that the data was collected
+    possible_time_col_names (list[str]): List of column names containing only the time of day that the data was collected
+
+  Returns:
+    tuple: (timestamps, formats) tuple with the datetime64 timestamp of every row in the data file and the columns and formats that they were parsed with, or (None, None) if the data file has no parseable date column
+  """
+  times_path = get_times_path(cache, file_path, possible_datetime_col_names, possible_time_col_names)
+  if (times_path is not None) and os.path.exists(times_path):
+    table = feather.read_table(times_path, memory_map=True)
+    return table.column("time").to_numpy().view("datetime64[ns]"), json.loads(table.schema.metadata[b"formats"])
+  times, formats = parse_file_times(cache, file_path, possible_datetime_col_names, possible_time_col_names)
+  if (times is None) or (times_path is None): return times, formats
+  # Store timestamps as integers so that reading them again doesn't need to convert missing timestamps.
+  table = pa.table({"time": times.view(np.int64)}).replace_schema_metadata({"formats": json.dumps(formats)})
+  temp_times_path = "{}.{}.{}.tmp".format(times_path, os.getpid(), threading.get_ident())
+  feather.write_feather(table, temp_times_path, compression="uncompressed")
+  os.replace(temp_times_path, times_path)
+  return times, formats
+
+def parse_file_times(cache: "SurveyCache", file_path: str, possible_datetime_col_names: list[str], possible_time_col_names: list[str]) -> tuple:
+  """
+  Parses the timestamp of every row in a data file with the formats of its date and time columns, one chunk of rows at a time.
+
+  Args:
+    cache (SurveyCache): Cache of converted data files to read the date and time columns through
+    file_path (str): Path to the data file
+    possible_datetime_col_names (list[str]): List of column names containing the date or time that the data was collected
+    possible_time_col_names (list[str]): List of column names containing only the time of day that the data was collected
+
+  Returns:
+    tuple: (timestamps, formats) tuple with the datetime64 timestamp of every row in the data file and a dictionary with the "datetime_col", "datetime_formats", "time_col" and "time_formats" that they were parsed with,
+      or (None, None) if the data file has no parseable date column
+  """
+  # Date and time columns are read one chunk at a time, so that parsing a data file's timestamps never needs its whole text in memory.
+  reader = StreamingReader(cache)
+  file_cols = cache.get_columns(file_path)
+  time_col_names = [col_name for col_name in possible_time_col_names if col_name in file_cols]
+  # Use the first date column that has a known format, since some possible date columns only contain times in some data files.
+  for datetime_col_name in [col_name for col_name in possible_datetime_col_names if col_name in file_cols]:
+    formats = {"datetime_col": datetime_col_name, "datetime_formats": [], "time_col": None, "time_formats": []}
+    chunk_times = []
+    for chunk in reader.iter_chunks(file_path, [datetime_col_name] + time_col_names[:1]):
+      times, used_datetime_formats, is_date_only = parse_datetimes(chunk[datetime_col_name], datetime_formats)
+      formats["datetime_formats"] += [datetime_format for datetime_format in used_datetime_formats if datetime_format not in formats["datetime_formats"]]
+      # Add the time of day from a separate column to dates that were parsed without a time, but not to timestamps at midnight.
+      if is_date_only.any() and (len(time_col_names) > 0):
+        times_of_day, used_time_formats, _ = parse_datetimes(chunk[time_col_names[0]], time_formats)
+        if len(used_time_formats) > 0:
+          times = times + (times_of_day - pd.Timestamp(1900, 1, 1)).fillna(pd.Timedelta(0)).where(is_date_only, pd.Timedelta(0))
+          formats.update(time_col=time_col_names[0], time_formats=formats["time_formats"] + [time_format for time_format in used_time_formats if time_format not in formats["time_formats"]])
+      chunk_times.append(times.to_numpy(dtype="datetime64[ns]"))
+    if len(formats["datetime_formats"]) == 0: continue
+    return np.concatenate(chunk_times), formats
+  return None, None
+
+class TimeCatalog:
+  def __init__(self, data_dir_path: str, cache: "SurveyCache", possible_datetime_col_names: list[str] = default_datetime_col_names, possible_time_col_names: list[str] = default_time_col_names) -> None:
+    """
+    Creates a new instance of the TimeCatalog class, which finds the data collected within a time range without parsing any data again.
+    Timestamps are parsed once per data file with explicit formats by the data directory's catalog (on its worker processes) and stored next to the converted data files.
+    The catalog's summaries give the first and last timestamp of every data file, so a data file's timestamps are only read once a query's time range overlaps it.
+
+    Args:
+      data_dir_path (str): Path to the root directory containing all category subfolders and their data files
+      cache (SurveyCache): Cache of converted data files to read timestamps through
+      possible_datetime_col_names (list[str]): Optional list of column names containing the date or time that the data was collected (because data from different files might have different column names)
+      possible_time_col_names (list[str]): Optional list of column names containing only the time of day that the data was collected, which is added to dates without a time
+    """
+    # root_data_dir_path = path to the root directory containing all category subfolders and their data files
+    self.root_data_dir_path = data_dir_path
+
+    # cache = cache of converted data files that timestamps are read through and stored next to
+    self.cache = cache
+
+    # possible_datetime_col_names, possible_time_col_names = column names that timestamps are parsed from
+    self.possible_datetime_col_names = possible_datetime_col_names
+    self.possible_time_col_names = possible_time_col_names
+
+    # file_stats = {file path: (modification time in nanoseconds, size)} dictionary used to check if any data file changed after the catalog was built
+    self.file_stats = {}
+
+    # file_paths = {(category, file name): file path} dictionary with the path of every data file with timestamps
+    self.file_paths = {}
+
+    # file_formats = {(category, file name): {"datetime_col": ..., "datetime_formats": [...], "time_col": ..., "time_formats": [...]}} dictionary with the columns and formats that each read data file's timestamps were parsed with
+    self.file_formats = {}
+
+    # times = {(category, file name): timestamps} dictionary with the datetime64 timestamp of every row of each read data file (NaT if it has none)
+    self.times = {}
+
+    # sorted_rows = {(category, file name): rows} dictionary with the rows of each read data file that have a timestamp, sorted by timestamp
+    self.sorted_rows = {}
+
+    # sorted_times = {(category, file name): timestamps} dictionary with the sorted timestamps of the rows in sorted_rows
+    self.sorted_times = {}
+
+    # lock = lock held while a data file's timestamps are read, since sessions query the catalog from background threads
+    self.lock = threading.Lock()
+
+    time_ranges = {}
+    for summary in self.get_data_files():
+      self.file_stats[summary["path"]] = (summary["mtime_ns"], summary["size"])
+      # Skip files without timestamps (e.g. data from a category that uses different column names).
+      if summary["time_range"] is None: continue
+      key = (summary["category"], summary["file"])
+      self.file_paths[key] = summary["path"]
+      time_ranges[key] = [pd.Timestamp(time).to_datetime64() for time in summary["time_range"]]
+
+    # files = [(category, file name), ...] list of data files with timestamps, sorted by their first timestamp
+    # ^ file_start_times and file_end_times = first and last timestamp of each data file in files
+    self.files = sorted(time_ranges.keys(), key=lambda key: time_ranges[key][0])
+    self.file_start_times = np.array([time_ranges[key][0] for key in self.files], dtype="datetime64[ns]")
+    self.file_end_times = np.array([time_ranges[key][1] for key in self.files], dtype="datetime64[ns]")
+
+  def get_data_files(self) -> list[dict]:
+    """
+    Gets the summaries of all data files in the root data directory's category subfolders (including nested subfolders) from the data directory's catalog.
+
+    Returns:
+      list[dict]: List of data file summaries, see DataCatalog.get_file_summaries
+    """
+    # The catalog summarizes data files with read_file_times, so it's only imported when it's needed.
+    from DataCatalog import get_data_catalog
+    return get_data_catalog(self.root_data_dir_path, self.cache, datetime_col_names=self.possible_datetime_col_names, time_col_names=self.possible_time_col_names).get_file_summaries()
+
+  def is_stale(self) -> bool:
+    """
+    Checks if any data file was added, removed or modified after the catalog was built.
+
+    Returns:
+      bool: True if the catalog needs to be rebuilt, False otherwise
+    """
+    return {summary["path"]: (summary["mtime_ns"], summary["size"]) for summary in self.get_data_files()} != self.file_stats
+
+  def read_times(self, key: tuple) -> bool:
+    """
+    Reads the stored timestamps of a data file the first time they're needed, and sorts its rows by timestamp.
+
+    Args:
+      key (tuple): (category, file name) tuple of the data file
+
+    Returns:
+      bool: True if the data file has timestamps, False otherwise
+    """
+    with self.lock:
+      if key in self.times: return True
+      if key not in self.file_paths: return False
+      times, formats = read_file_times(self.cache, self.file_paths[key], self.possible_datetime_col_names, self.possible_time_col_names)
+      if times is None: return False
+      rows = np.flatnonzero(~np.isnat(times))
+      sorted_rows = rows[np.argsort(times[rows], kind="stable")]
+      self.file_formats[key] = formats
+      self.sorted_rows[key] = sorted_rows
+      self.sorted_times[key] = times[sorted_rows]
+      self.times[key] = times
+      return True
+
+  def get_times(self, category: str, file: str) -> "numpy.ndarray":
+    """
+    Gets the timestamp of every row in a data file.
+
+    Args:
+      category (str): Name of the data file's category
+      file (str): Name of the data file
+
+    Returns:
+      numpy.ndarray: datetime64 timestamp of every row in the data file (NaT if it has none), or None if the data file has no timestamps
+    """
+    if not self.read_times((category, file)): return None
+    return self.times[(category, file)]
+
+  def get_file_time_range(self, category: str, file: str) -> tuple:
+    """
+    Gets the first and last timestamp in a data file.
+
+    Args:
+      category (str): Name of the data file's category
+      file (str): Name of the data file
+
+    Returns:
+      tuple: (first timestamp, last timestamp) tuple of pandas.Timestamp, or None if the data file has no timestamps
+    """
+    if (category, file) not in self.file_paths: return None
+    file_idx = self.files.index((category, file))
+    return pd.Timestamp(self.file_start_times[file_idx]), pd.Timestamp(self.file_end_times[file_idx])
+
+  def query(self, start_time: "datetime.datetime", end_time: "datetime.datetime") -> dict:
+    """
+    Finds all rows of all data files that were collected within a time range, which only reads the timestamps of data files whose time range overlaps it.
+
+    Args:
+      start_time (datetime.datetime): Start of the time range (inclusive)
+      end_time (datetime.datetime): End of the time range (inclusive)
+
+    Returns:
+      dict: Dictionary mapping (category, file name) tuples of data files with rows in the time range (keys) to arrays of those rows in ascending order (values)
+    """
+    start_time, end_time = np.datetime64(pd.Timestamp(start_time), "ns"), np.datetime64(pd.Timestamp(end_time), "ns")
+    # Only files that start before the time range ends can have rows in it.
+    files_starting_before_end = np.searchsorted(self.file_start_times, end_time, side="right")
+    rows_in_range = {}
+    for file_idx in range(files_starting_before_end):
+      if self.file_end_times[file_idx] < start_time: continue
+      key = self.files[file_idx]
+      if not self.read_times(key): continue
+      sorted_times = self.sorted_times[key]
+      first, last = np.searchsorted(sorted_times, start_time, side="left"), np.searchsorted(sorted_times, end_time, side="right")
+      if last > first: rows_in_range[key] = np.sort(self.sorted_rows[key][first:last])
+    return rows_in_range
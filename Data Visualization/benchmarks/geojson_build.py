@@ -0,0 +1,94 @@
+# Compares how long it takes to build a GeoJSON layer's data and how large its payload is, before and after DataVisualizer switched to the vectorized feature builder.
+# Run from the "Data Visualization" folder: python benchmarks/geojson_build.py
+
+# Standard library imports
+import os
+import sys
+import json
+import time
+
+# Make the Data Visualization modules importable when running this script from any folder.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# External dependencies imports
+import geopandas
+from SurveyCache import SurveyCache
+from GeoJSONBuilder import build_point_features
+
+# Constants
+data_dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "Elwha")
+repeats = 5
+benchmarked_files = {
+  "Topography/ew18_july_topo.csv": {
+    "longitude": "longitude", "latitude": "latitude",
+    "popup_cols": ["datetime_utc", "ortho_ht_m"]
+  },
+  "Surface-Sediment Grain-Size Distributions/ew17_july_grainsize.csv": {
+    "longitude": "Longitude (deg. E)", "latitude": "Latitude (deg. N)",
+    "popup_cols": ["Date Collected", "Time (GMT)", "Sample Type", "Wt. percent in -2.00 phi bin", "Percent Gravel", "Percent Sand", "Percent Silt", "Percent Clay", "Percent Mud"]
+  }
+}
+
+def build_with_geopandas(dataframe: "pandas.DataFrame", longitude_col: str, latitude_col: str, popup_cols: list[str]) -> dict:
+  """
+  Builds GeoJSON data the way create_geojson used to: every column is a property, and the GeoDataFrame is serialized into a string and parsed again.
+
+  Args:
+    dataframe (pandas.DataFrame): Data points to build GeoJSON data for
+    longitude_col (str): Name of the column containing the longitude of each data point
+    latitude_col (str): Name of the column containing the latitude of each data point
+    popup_cols (list[str]): Unused, since every column becomes a property
+
+  Returns:
+    dict: GeoJSON FeatureCollection
+  """
+  geodataframe = geopandas.GeoDataFrame(
+    dataframe,
+    geometry = geopandas.points_from_xy(dataframe[longitude_col], dataframe[latitude_col], crs = "EPSG:4326")
+  )
+  return json.loads(geodataframe.to_json())
+
+def build_with_feature_builder(dataframe: "pandas.DataFrame", longitude_col: str, latitude_col: str, popup_cols: list[str]) -> dict:
+  """
+  Builds GeoJSON data the way create_geojson does now: only popup properties are included and no JSON string is created.
+
+  Args:
+    dataframe (pandas.DataFrame): Data points to build GeoJSON data for
+    longitude_col (str): Name of the column containing the longitude of each data point
+    latitude_col (str): Name of the column containing the latitude of each data point
+    popup_cols (list[str]): Names of the columns displayed in the popup
+
+  Returns:
+    dict: GeoJSON FeatureCollection
+  """
+  return build_point_features(dataframe[longitude_col].to_numpy(), dataframe[latitude_col].to_numpy(), dataframe.index.tolist(), dataframe[popup_cols])
+
+def time_build(build, *args) -> tuple:
+  """
+  Builds GeoJSON data several times.
+
+  Args:
+    build (function): Function that builds GeoJSON data
+    *args: Arguments passed to the build function
+
+  Returns:
+    tuple: (fastest build time in milliseconds, payload size in bytes) tuple
+  """
+  fastest = float("inf")
+  for _ in range(repeats):
+    start = time.perf_counter()
+    geojson = build(*args)
+    fastest = min(fastest, time.perf_counter() - start)
+  return fastest * 1000, len(json.dumps(geojson))
+
+if __name__ == "__main__":
+  cache = SurveyCache(os.path.join(data_dir_path, ".cache"))
+  print("{:<45} {:>7} {:>22} {:>22}".format("File", "Points", "geopandas (ms, bytes)", "builder (ms, bytes)"))
+  for file, cols in benchmarked_files.items():
+    dataframe = cache.read(os.path.join(data_dir_path, file))
+    for total_points in sorted({min(200, len(dataframe.index)), len(dataframe.index)}):
+      sample = dataframe.iloc[:total_points]
+      args = (sample, cols["longitude"], cols["latitude"], cols["popup_cols"])
+      old_ms, old_bytes = time_build(build_with_geopandas, *args)
+      new_ms, new_bytes = time_build(build_with_feature_builder, *args)
+      print("{:<45} {:>7} {:>12.1f} {:>9} {:>12.1f} {:>9}".format(os.path.basename(file), len(sample.index), old_ms, old_bytes, new_ms, new_bytes))
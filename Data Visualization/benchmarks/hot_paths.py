@@ -0,0 +1,198 @@
+# Measures how the hot paths of the app (creating a layer, opening a popup and plotting a data point's details) scale with the size of the data archive.
+# Every scenario generates a synthetic data directory with survey_generator.py, and results are saved as JSON so that they can be compared between commits.
+# Run from the "Data Visualization" folder: python benchmarks/hot_paths.py --rows 10000 100000 --files 1 10
+# Compare with earlier results: python benchmarks/hot_paths.py --compare benchmarks/results/hot_paths_<commit>.json
+
+# Standard library imports
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+import datetime as dt
+
+# Make the Data Visualization modules importable when running this script from any folder.
+benchmarks_dir_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(benchmarks_dir_path, ".."))
+
+# External dependencies imports
+from bokeh.embed import json_item
+import SpatialIndex
+import TimeCatalog
+import DataVisualizer as DataVisualizerModule
+from DataVisualizer import DataVisualizer
+from survey_generator import generate_survey_directory, topography_category, center_latitude, center_longitude
+
+# Constants
+default_rows = [10000, 100000]
+default_files = [1, 10]
+default_repeats = 3
+# Results that are this much slower than the compared results are reported as regressions.
+regression_ratio = 1.2
+results_dir_path = os.path.join(benchmarks_dir_path, "results")
+latitude_col_names = ["latitude", "Latitude", "Latitude (deg. N)"]
+longitude_col_names = ["longitude", "Longitude", "Longitude (deg. E)"]
+datetime_col_names = ["Survey_Date", "datetime_utc", "Time_GMT", "Date Collected"]
+y_axis_col_names = ["Ortho_Ht_m", "Ortho_ht_m", "ortho_ht_m", "Wt. percent in -2.00 phi bin"]
+# Same popup content as the topography layers of elwha.ipynb.
+topography_popup_content = {
+  "Date & Time Collected": [{"Survey_Date": "", "datetime_utc": "UTC"}],
+  "Orthometric Height": [{"Ortho_Ht_m": "meters", "Ortho_ht_m": "meters", "ortho_ht_m": "meters"}]
+}
+
+def get_commit() -> str:
+  """
+  Gets the commit that the benchmarked code is at.
+
+  Returns:
+    str: Hash of the current commit, or "unknown" if it can't be found
+  """
+  try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=benchmarks_dir_path, capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError): return "unknown"
+
+def measure(run: "function", repeats: int, setup: "function" = None) -> dict:
+  """
+  Measures a hot path's wall time, peak memory and payload size.
+  Peak memory is measured in a separate run, since tracing memory allocations slows the hot path down.
+
+  Args:
+    run (function): Function that runs the hot path once and returns the number of bytes it sends to the browser
+    repeats (int): Number of timed runs
+    setup (function): Optional function that gets called before every run (e.g. to clear caches for cold runs)
+
+  Returns:
+    dict: Dictionary with the fastest and median wall time in seconds, the peak memory in bytes and the payload size in bytes
+  """
+  times = []
+  for _ in range(repeats):
+    if setup is not None: setup()
+    start_time = time.perf_counter()
+    payload_bytes = run()
+    times.append(time.perf_counter() - start_time)
+  if setup is not None: setup()
+  tracemalloc.start()
+  run()
+  peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return {"seconds": min(times), "median_seconds": statistics.median(times), "peak_memory_bytes": peak_memory_bytes, "payload_bytes": payload_bytes}
+
+def benchmark_scenario(data_dir_path: str, repeats: int) -> dict:
+  """
+  Measures every hot path on a generated data directory.
+
+  Args:
+    data_dir_path (str): Path to the generated data directory
+    repeats (int): Number of timed runs of every hot path
+
+  Returns:
+    dict: Dictionary mapping names of hot paths (keys) to their measurements (values)
+  """
+  cache_dir_path = os.path.join(data_dir_path, ".cache")
+  visualizer = DataVisualizer(data_dir_path, map_center=(center_latitude, center_longitude), cache_dir=cache_dir_path)
+  plotter = visualizer.get_plotter()
+  # Display the whole survey area, so that layers display as many data points as they can.
+  visualizer.map.set_trait("bounds", ((center_latitude - 0.02, center_longitude - 0.04), (center_latitude + 0.02, center_longitude + 0.04)))
+  topography_dir_path = os.path.join(data_dir_path, topography_category)
+  data_path = os.path.join(topography_dir_path, sorted(os.listdir(topography_dir_path))[0])
+  layer_name = os.path.basename(data_path)
+
+  def create_geojson() -> int:
+    visualizer.create_geojson(data_path, layer_name, topography_popup_content, longitude_col_names, latitude_col_names)
+    return len(json.dumps(visualizer.all_layers[layer_name].data))
+  def clear_cache() -> None:
+    for cache_file in os.listdir(cache_dir_path): os.remove(os.path.join(cache_dir_path, cache_file))
+    visualizer.cache.tables.clear()
+    DataVisualizerModule.shared_layer_sources.clear()
+    visualizer.displayed_points.clear()
+
+  results = {}
+  results["create_geojson_cold"] = measure(create_geojson, repeats, setup=clear_cache)
+  # Warm runs reuse the layer source that was loaded before, like sessions that open a layer another session already loaded.
+  results["create_geojson"] = measure(create_geojson, repeats, setup=visualizer.displayed_points.clear)
+
+  feature = visualizer.geojsons[layer_name]["features"][0]
+  popup_html = visualizer.popup.child.children[0]
+  def display_popup_info() -> int:
+    visualizer.display_popup_info(topography_popup_content, feature, data_path)
+    return len(popup_html.value)
+  results["display_popup_info"] = measure(display_popup_info, repeats)
+
+  [longitude, latitude] = feature["geometry"]["coordinates"]
+  def plot_time_series() -> int:
+    plotter.plot_time_series(latitude, longitude, latitude_col_names, longitude_col_names, datetime_col_names, y_axis_col_names, "Orthometric Height (meters)")
+    return len(json.dumps(json_item(plotter.time_series)))
+  # Cold runs include building the spatial index and time catalog of the data directory.
+  def clear_indexes() -> None:
+    SpatialIndex.spatial_indexes.clear()
+    TimeCatalog.time_catalogs.clear()
+  results["plot_time_series_cold"] = measure(plot_time_series, repeats, setup=clear_indexes)
+  results["plot_time_series"] = measure(plot_time_series, repeats)
+
+  data_cols = visualizer.cache.get_columns(data_path)
+  [latitude_col_name] = [col_name for col_name in latitude_col_names if col_name in data_cols]
+  [longitude_col_name] = [col_name for col_name in longitude_col_names if col_name in data_cols]
+  def plot_original_dataset() -> int:
+    plotter.plot_original_dataset(data_path, latitude_col_name, longitude_col_name)
+    return len(json.dumps(json_item(plotter.original_dataset)))
+  results["plot_original_dataset"] = measure(plot_original_dataset, repeats)
+  return results
+
+def compare_results(results: dict, baseline: dict) -> None:
+  """
+  Prints how much faster or slower every hot path is than in the baseline results.
+
+  Args:
+    results (dict): Results of this run
+    baseline (dict): Results of an earlier run, e.g. at another commit
+  """
+  baseline_measurements = {(tuple(sorted(result["scenario"].items())), result["hot_path"]): result for result in baseline["results"]}
+  print("\nCompared to commit {} ({}):".format(baseline["commit"], baseline["created"]))
+  print("{:<24} {:>10} {:>6} {:>12} {:>12} {:>8}".format("Hot path", "Rows", "Files", "Before (ms)", "After (ms)", "Ratio"))
+  for result in results["results"]:
+    key = (tuple(sorted(result["scenario"].items())), result["hot_path"])
+    if key not in baseline_measurements: continue
+    before, after = baseline_measurements[key]["seconds"], result["seconds"]
+    ratio = after / before if before > 0 else float("inf")
+    print("{:<24} {:>10} {:>6} {:>12.1f} {:>12.1f} {:>7.2f}x{}".format(
+      result["hot_path"], result["scenario"]["rows"], result["scenario"]["files"],
+      before * 1000, after * 1000, ratio, "  REGRESSION" if ratio > regression_ratio else ""
+    ))
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmarks the hot paths of the app on synthetic data directories.")
+  parser.add_argument("--rows", type=int, nargs="+", default=default_rows, help="numbers of topography and bathymetry data points per category (e.g. 10000 to 10000000)")
+  parser.add_argument("--files", type=int, nargs="+", default=default_files, help="numbers of data files per category (e.g. 1 to 200)")
+  parser.add_argument("--repeats", type=int, default=default_repeats, help="number of timed runs of every hot path")
+  parser.add_argument("--output", default=None, help="path to the JSON file that results are saved in, default is benchmarks/results/hot_paths_<commit>.json")
+  parser.add_argument("--compare", default=None, help="path to results of an earlier run to compare with")
+  args = parser.parse_args()
+
+  commit = get_commit()
+  results = {
+    "commit": commit,
+    "created": dt.datetime.now().isoformat(timespec="seconds"),
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "results": []
+  }
+  print("{:<24} {:>10} {:>6} {:>10} {:>12} {:>14}".format("Hot path", "Rows", "Files", "Time (ms)", "Peak memory", "Payload bytes"))
+  for total_rows in args.rows:
+    for total_files in args.files:
+      with tempfile.TemporaryDirectory() as data_dir_path:
+        generate_survey_directory(data_dir_path, total_rows, total_files)
+        for hot_path, measurements in benchmark_scenario(data_dir_path, args.repeats).items():
+          results["results"].append(dict(hot_path=hot_path, scenario={"rows": total_rows, "files": total_files}, **measurements))
+          print("{:<24} {:>10} {:>6} {:>10.1f} {:>12} {:>14}".format(hot_path, total_rows, total_files, measurements["seconds"] * 1000, measurements["peak_memory_bytes"], measurements["payload_bytes"]))
+
+  output_path = args.output if args.output is not None else os.path.join(results_dir_path, "hot_paths_{}.json".format(commit))
+  os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+  with open(output_path, "w") as output_file: json.dump(results, output_file, indent=2)
+  print("\nSaved results to " + output_path)
+
+  if args.compare is not None:
+    with open(args.compare) as baseline_file: compare_results(results, json.load(baseline_file))
@@ -0,0 +1,53 @@
+# Measures how long it takes for a new session's map to be ready (importing DataVisualizer and creating it), with and without lazy initialization.
+# Run from the "Data Visualization" folder: python benchmarks/startup.py
+# ^ Every measurement runs in a new Python process, so that it includes a cold import like the first session of `panel serve`.
+
+# Standard library imports
+import os
+import sys
+import json
+import subprocess
+
+# Constants
+visualization_dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+data_dir_path = os.path.join(visualization_dir_path, "..", "data", "Elwha")
+repeats = 3
+# Script run in a new process, which prints the import time, the time of every startup stage and the time of a second session in the same process.
+startup_script = """
+import sys, json, time
+sys.path.insert(0, {visualization_dir_path!r})
+start_time = time.perf_counter()
+from DataVisualizer import DataVisualizer
+import_time = time.perf_counter() - start_time
+first_session = DataVisualizer({data_dir_path!r}, lazy={lazy!r})
+second_session = DataVisualizer({data_dir_path!r}, lazy={lazy!r})
+print(json.dumps({{"import": import_time, "first": first_session.startup_timings, "second": second_session.startup_timings}}))
+"""
+
+def measure_startup(lazy: bool) -> dict:
+  """
+  Measures the startup of a DataVisualizer in a new Python process.
+
+  Args:
+    lazy (bool): Whether the DataVisualizer uses lazy initialization
+
+  Returns:
+    dict: Dictionary with the import time and the startup timings of a first and second session, in seconds
+  """
+  script = startup_script.format(visualization_dir_path=visualization_dir_path, data_dir_path=data_dir_path, lazy=lazy)
+  output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+  return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+  print("{:<6} {:>10} {:>14} {:>15} {:>16}".format("Mode", "Import (ms)", "1st total (ms)", "2nd total (ms)", "time to map (ms)"))
+  for lazy in [False, True]:
+    # Keep the fastest run, since the other runs include noise from the machine.
+    timings = min((measure_startup(lazy) for _ in range(repeats)), key=lambda timing: timing["import"] + timing["first"]["total"])
+    print("{:<6} {:>10.0f} {:>14.0f} {:>15.0f} {:>16.0f}".format(
+      "lazy" if lazy else "eager",
+      timings["import"] * 1000,
+      timings["first"]["total"] * 1000,
+      timings["second"]["total"] * 1000,
+      (timings["import"] + timings["first"]["total"]) * 1000
+    ))
+    print("       first session stages (ms): " + ", ".join("{} {:.0f}".format(stage, seconds * 1000) for stage, seconds in timings["first"].items() if stage != "total"))
@@ -0,0 +1,203 @@
+# Generates synthetic data directories shaped like the Elwha data (same categories, file names and column names), so that the app can be benchmarked with much larger archives.
+# Run from the "Data Visualization" folder: python benchmarks/survey_generator.py OUTPUT_DIR --rows 100000 --files 10
+
+# Standard library imports
+import os
+import argparse
+import datetime as dt
+
+# External dependencies imports
+import numpy as np
+import pandas as pd
+
+# Constants
+topography_category = "Topography"
+bathymetry_kayak_category = "Nearshore Bathymetry - Kayak"
+grainsize_category = "Surface-Sediment Grain-Size Distributions"
+# Month names used in the Elwha file names (e.g. "ew16_july_kayak.txt").
+month_names = ["jan", "feb", "mar", "apr", "may", "june", "july", "aug", "sept", "oct", "nov", "dec"]
+first_survey_date = dt.datetime(2010, 9, 1)
+# Surveys from this year on use the newer column names.
+new_format_year = 2018
+# Area around the Elwha River mouth that synthetic data points are in.
+center_latitude, center_longitude = 48.148, -123.553
+survey_area_meters = 4000
+meters_per_degree = 111320.0
+# Grain-size samples are much sparser than topo-bathy surveys.
+grainsize_rows_fraction = 0.01
+phi_bins = ["-2.00", "-1.00"] + ["{:.2f}".format(phi) for phi in np.arange(-0.75, 11.75, 0.25)] + ["12.00", "13.00"]
+grainsize_statistics_cols = ["D5 Phi", " D10 Phi", " D16 Phi", " D25 Phi", " D50 Phi", " D75 Phi", " D84 Phi", " D90 Phi", " D95 Phi", " F-W Median", " F-W Mean", " F-W Sorting"]
+rows_per_chunk = 1000000
+
+def get_survey_date(file_idx: int) -> dt.datetime:
+  """
+  Gets the date of a synthetic survey, which is one month after the previous survey.
+
+  Args:
+    file_idx (int): Index of the survey's file in its category
+
+  Returns:
+    datetime.datetime: Date of the survey
+  """
+  months = first_survey_date.month - 1 + file_idx
+  return dt.datetime(first_survey_date.year + months // 12, months % 12 + 1, 1)
+
+def get_file_name(survey_date: dt.datetime, category: str) -> str:
+  """
+  Gets the name of a survey's file in the same format as the Elwha data files.
+
+  Args:
+    survey_date (datetime.datetime): Date of the survey
+    category (str): Data category of the survey
+
+  Returns:
+    str: Name of the file, e.g. "ew16_july_kayak.txt"
+  """
+  new_format = survey_date.year >= new_format_year
+  kind, extension = {
+    topography_category: ("topo", ".csv"),
+    bathymetry_kayak_category: ("kayak", ".csv" if new_format else ".txt"),
+    grainsize_category: ("grainsize", ".csv")
+  }[category]
+  return "ew{:02d}_{}_{}{}".format(survey_date.year % 100, month_names[survey_date.month - 1], kind, extension)
+
+def get_survey_lines(total_rows: int, seed: int) -> tuple:
+  """
+  Gets the positions of data points along survey lines, which are the same for every survey of a category so that surveys overlap like repeated field surveys do.
+
+  Args:
+    total_rows (int): Number of data points
+    seed (int): Seed of the random number generator
+
+  Returns:
+    tuple: (latitudes, longitudes, easting, northing) tuple of arrays
+  """
+  rng = np.random.default_rng(seed)
+  # Survey lines are cross-shore transects spaced evenly along the shore, with data points spaced evenly along each line.
+  total_lines = max(1, int(np.sqrt(total_rows / 4)))
+  points_per_line = int(np.ceil(total_rows / total_lines))
+  line_length = survey_area_meters / 4
+  easting = (np.arange(total_rows) % total_lines) / total_lines * survey_area_meters - survey_area_meters / 2 + rng.normal(0, 1, total_rows)
+  northing = (np.arange(total_rows) // total_lines) / points_per_line * line_length - line_length / 2 + rng.normal(0, 1, total_rows)
+  latitudes = center_latitude + northing / meters_per_degree
+  longitudes = center_longitude + easting / (meters_per_degree * np.cos(np.radians(center_latitude)))
+  return latitudes, longitudes, easting + 297000, northing + 130800
+
+def generate_topobathy_chunk(survey_date: dt.datetime, latitudes: "numpy.ndarray", longitudes: "numpy.ndarray", easting: "numpy.ndarray", northing: "numpy.ndarray", rng: "numpy.random.Generator") -> pd.DataFrame:
+  """
+  Generates topography or bathymetry data points with the column names that were used at the survey's date.
+
+  Args:
+    survey_date (datetime.datetime): Date of the survey
+    latitudes (numpy.ndarray): Latitude of each data point
+    longitudes (numpy.ndarray): Longitude of each data point
+    easting (numpy.ndarray): Easting of each data point in meters
+    northing (numpy.ndarray): Northing of each data point in meters
+    rng (numpy.random.Generator): Random number generator
+
+  Returns:
+    pandas.DataFrame: Data points
+  """
+  total_rows = len(latitudes)
+  # Heights slope down towards the water and change a little between surveys.
+  ortho_heights = np.round(3 - (northing - northing.min()) / 100 + rng.normal(0, 0.05, total_rows), 3)
+  if survey_date.year >= new_format_year:
+    seconds = np.sort(rng.integers(0, 6 * 3600, total_rows))
+    datetimes = pd.Timestamp(survey_date) + pd.Timedelta(hours=14) + pd.to_timedelta(seconds, unit="s")
+    return pd.DataFrame({
+      "datetime_utc": datetimes.strftime("%Y-%b-%d %H:%M:%S.000"),
+      "longitude": np.round(longitudes, 7), "latitude": np.round(latitudes, 7),
+      "easting_m": np.round(easting, 2), "northing_m": np.round(northing, 2),
+      "ortho_ht_m": ortho_heights
+    })
+  return pd.DataFrame({
+    "Survey_Date": survey_date.strftime("%m/%d/%Y"),
+    "Longitude": np.round(longitudes, 6), "Latitude": np.round(latitudes, 6),
+    "X": np.round(easting, 3), "Y": np.round(northing, 3),
+    "Ellip_Ht_m": np.round(ortho_heights - 20.11, 3), "Ortho_Ht_m": ortho_heights
+  })
+
+def generate_grainsize_chunk(survey_date: dt.datetime, latitudes: "numpy.ndarray", longitudes: "numpy.ndarray", rng: "numpy.random.Generator") -> pd.DataFrame:
+  """
+  Generates grain-size samples with the column names that were used at the survey's date.
+
+  Args:
+    survey_date (datetime.datetime): Date of the survey
+    latitudes (numpy.ndarray): Latitude of each sample
+    longitudes (numpy.ndarray): Longitude of each sample
+    rng (numpy.random.Generator): Random number generator
+
+  Returns:
+    pandas.DataFrame: Samples
+  """
+  total_rows = len(latitudes)
+  new_format = survey_date.year >= new_format_year
+  sample_ids = ["TW{}_{}".format(idx // 2 + 1, "AB"[idx % 2]) for idx in range(total_rows)]
+  lab_ids = ["{:02d}-{}FA_{:02d}".format(survey_date.year % 100, 600 + survey_date.month, idx % 100) for idx in range(total_rows)]
+  times = pd.Timestamp(survey_date) + pd.Timedelta(hours=16) + pd.to_timedelta(np.sort(rng.integers(0, 4 * 3600, total_rows)), unit="s")
+  samples = {
+    "FACS ID" if new_format else "FACS/FAN I.D.": "{}-{}-FA".format(survey_date.year, 600 + survey_date.month),
+    "Sample ID": sample_ids
+  }
+  if not new_format: samples["Sample Recovered"] = "Yes"
+  samples["Date Collected"] = "{}/{}/{}".format(survey_date.month, survey_date.day, survey_date.year)
+  samples["Time_GMT" if new_format else "Time (GMT)"] = times.strftime("%H:%M:%S")
+  samples["Latitude" if new_format else "Latitude (deg. N)"] = np.round(latitudes, 6)
+  samples["Longitude" if new_format else "Longitude (deg. E)"] = np.round(longitudes, 6)
+  samples["Sample Type"] = "Grab"
+  samples["Lab ID"] = lab_ids
+  # Weight percentages of every phi bin add up to 100%.
+  weights = rng.dirichlet(np.ones(len(phi_bins)), total_rows) * 100
+  for bin_idx, phi in enumerate(phi_bins): samples["Wt. percent in {} phi bin".format(phi)] = np.round(weights[:, bin_idx], 6)
+  # Gravel is coarser than -1 phi, sand is between -1 and 4 phi, silt is between 4 and 8 phi and clay is finer than 8 phi.
+  gravel, sand = weights[:, :2].sum(axis=1), weights[:, 2:22].sum(axis=1)
+  silt, clay = weights[:, 22:38].sum(axis=1), weights[:, 38:].sum(axis=1)
+  samples.update({"Percent Gravel": np.round(gravel, 2), "Percent Sand": np.round(sand, 2), "Percent Silt": np.round(silt, 2), "Percent Clay": np.round(clay, 2), "Percent Mud": np.round(silt + clay, 2)})
+  for col_name in grainsize_statistics_cols: samples[col_name] = np.round(rng.uniform(-1, 8, total_rows), 2)
+  return pd.DataFrame(samples)
+
+def generate_survey_directory(output_dir_path: str, rows_per_category: int, files_per_category: int, seed: int = 0) -> dict:
+  """
+  Writes a data directory with a Topography, a kayak bathymetry and a grain-size category subfolder, in the same layout as the Elwha data directory.
+
+  Args:
+    output_dir_path (str): Path to the data directory, which is created if it doesn't exist
+    rows_per_category (int): Number of topography and bathymetry data points in each category, which are split evenly between its files
+      ^ grain-size categories get 1% as many samples (at least one per file), since samples are much sparser than survey data points
+    files_per_category (int): Number of data files (one per monthly survey) in each category
+    seed (int): Optional seed of the random number generator, default is 0
+
+  Returns:
+    dict: Dictionary mapping names of data categories (keys) to lists of paths to their generated data files (values)
+  """
+  rng = np.random.default_rng(seed)
+  generated_files = {}
+  for category_idx, category in enumerate([topography_category, bathymetry_kayak_category, grainsize_category]):
+    category_path = os.path.join(output_dir_path, category)
+    os.makedirs(category_path, exist_ok=True)
+    category_rows = rows_per_category if category != grainsize_category else max(files_per_category, int(rows_per_category * grainsize_rows_fraction))
+    rows_per_file = max(1, category_rows // files_per_category)
+    # Every survey of a category covers the same survey lines.
+    latitudes, longitudes, easting, northing = get_survey_lines(rows_per_file, seed + category_idx)
+    generated_files[category] = []
+    for file_idx in range(files_per_category):
+      survey_date = get_survey_date(file_idx)
+      file_path = os.path.join(category_path, get_file_name(survey_date, category))
+      # Write large files in chunks, so that generating 10 million rows doesn't need all of them in memory.
+      for chunk_start in range(0, rows_per_file, rows_per_chunk):
+        chunk = slice(chunk_start, min(rows_per_file, chunk_start + rows_per_chunk))
+        if category == grainsize_category: dataframe = generate_grainsize_chunk(survey_date, latitudes[chunk], longitudes[chunk], rng)
+        else: dataframe = generate_topobathy_chunk(survey_date, latitudes[chunk], longitudes[chunk], easting[chunk], northing[chunk], rng)
+        dataframe.to_csv(file_path, index=False, mode="w" if chunk_start == 0 else "a", header=chunk_start == 0)
+      generated_files[category].append(file_path)
+  return generated_files
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Generates a synthetic data directory shaped like the Elwha data.")
+  parser.add_argument("output_dir_path", help="path to the generated data directory")
+  parser.add_argument("--rows", type=int, default=100000, help="number of topography and bathymetry data points per category")
+  parser.add_argument("--files", type=int, default=10, help="number of data files per category")
+  parser.add_argument("--seed", type=int, default=0, help="seed of the random number generator")
+  args = parser.parse_args()
+  for category, files in generate_survey_directory(args.output_dir_path, args.rows, args.files, args.seed).items():
+    print("{}: {} files".format(category, len(files)))